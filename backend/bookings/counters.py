@@ -0,0 +1,133 @@
+# bookings/counters.py
+"""
+Incremental maintenance of the denormalized rating and session counters on
+Skill and UserProfile. Every Review or SessionBooking change issues at most one
+`UPDATE ... SET x = x + delta` per affected row, so the cost does not grow with
+the number of reviews or sessions. The skill's best-match rank_score is then
+recomputed from the new counters (skills.ranking); a new booking only moves
+the skill's active_at. `manage.py rebuild_counters` recomputes the same values
+from scratch.
+"""
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db.models import Case, DecimalField, F, FloatField, Value, When
+from django.db.models.functions import Cast
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from profiles.models import UserProfile
+from skills.caching import invalidate_catalogue
+from skills.models import Skill
+from skills.ranking import refresh_rank_scores
+from .models import Review, SessionBooking
+
+COMPLETED = 'completed'
+_MISSING = object()
+
+
+def average_rating(rating_sum, rating_count):
+    """Python counterpart of the avg_rating expression below, for full rebuilds."""
+    if not rating_count:
+        return None
+    return (Decimal(rating_sum) / Decimal(rating_count)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+def _rating_changes(sum_delta, count_delta):
+    new_sum = F('rating_sum') + sum_delta
+    new_count = F('rating_count') + count_delta
+    return {
+        'rating_sum': new_sum,
+        'rating_count': new_count,
+        # F() reads the pre-update values, so the average is taken over the new totals
+        'avg_rating': Case(
+            When(rating_count__lte=-count_delta, then=Value(None)),
+            default=Cast(Cast(new_sum, FloatField()) / new_count, DecimalField(max_digits=3, decimal_places=2)),
+            output_field=DecimalField(max_digits=3, decimal_places=2),
+        ),
+    }
+
+
+def apply_rating(skill_id, mentor_profile_id, sum_delta, count_delta):
+    if not sum_delta and not count_delta:
+        return
+    changes = _rating_changes(sum_delta, count_delta)
+    if skill_id:
+        Skill.objects.filter(pk=skill_id).update(**changes)
+        refresh_rank_scores([skill_id])
+    if mentor_profile_id:
+        UserProfile.objects.filter(pk=mentor_profile_id).update(**changes)
+    # update() sends no signals, and public listings show these counters
+    invalidate_catalogue()
+
+
+def apply_completed_sessions(skill_id, mentor_profile_id, delta):
+    if not delta:
+        return
+    Skill.objects.filter(pk=skill_id).update(sessions_completed=F('sessions_completed') + delta)
+    refresh_rank_scores([skill_id])
+    UserProfile.objects.filter(pk=mentor_profile_id).update(sessions_completed=F('sessions_completed') + delta)
+    invalidate_catalogue()
+
+
+# --- Reviews ---
+
+@receiver(pre_save, sender=Review)
+def remember_review_counters(sender, instance, raw=False, **kwargs):
+    # Instances not loaded through from_db (or with deferred fields) read the stored row once
+    if raw or instance._state.adding or getattr(instance, '_loaded_counters', _MISSING) is not _MISSING:
+        return
+    stored = Review.objects.filter(pk=instance.pk).values_list('rating', 'skill_id', 'mentor_profile_id').first()
+    instance._loaded_counters = stored or (None, None, None)
+
+
+@receiver(post_save, sender=Review)
+def update_review_counters(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    current = (instance.rating, instance.skill_id, instance.mentor_profile_id)
+    previous = None if created else instance._loaded_counters
+    if previous != current:
+        if previous and previous[0] is not None:
+            old_rating, old_skill_id, old_mentor_id = previous
+            if (old_skill_id, old_mentor_id) == current[1:]:
+                # Rating edited in place: adjust the sum only
+                apply_rating(old_skill_id, old_mentor_id, instance.rating - old_rating, 0)
+                instance._loaded_counters = current
+                return
+            apply_rating(old_skill_id, old_mentor_id, -old_rating, -1)
+        apply_rating(instance.skill_id, instance.mentor_profile_id, instance.rating, 1)
+    instance._loaded_counters = current
+
+
+@receiver(post_delete, sender=Review)
+def remove_review_counters(sender, instance, **kwargs):
+    apply_rating(instance.skill_id, instance.mentor_profile_id, -instance.rating, -1)
+
+
+# --- Session bookings ---
+
+@receiver(pre_save, sender=SessionBooking)
+def remember_booking_status(sender, instance, raw=False, **kwargs):
+    if raw or instance._state.adding or getattr(instance, '_loaded_status', None) is not None:
+        return
+    instance._loaded_status = SessionBooking.objects.filter(pk=instance.pk).values_list('status', flat=True).first()
+
+
+@receiver(post_save, sender=SessionBooking)
+def update_session_counters(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = None if created else instance._loaded_status
+    delta = (instance.status == COMPLETED) - (previous == COMPLETED)
+    apply_completed_sessions(instance.skill_id, instance.mentor_id, delta)
+    if created:
+        # Recent activity for the best-match ranking. The score itself catches up on the next
+        # update_rank_scores run, so a booking does not invalidate every cached listing
+        Skill.objects.filter(pk=instance.skill_id, active_at__lt=instance.created_at).update(active_at=instance.created_at)
+    instance._loaded_status = instance.status
+
+
+@receiver(post_delete, sender=SessionBooking)
+def remove_session_counters(sender, instance, **kwargs):
+    if instance.status == COMPLETED:
+        apply_completed_sessions(instance.skill_id, instance.mentor_id, -1)
@@ -0,0 +1,63 @@
+# bookings/management/commands/rebuild_booking_stats.py
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from profiles.models import UserProfile
+from bookings.models import MentorWeeklyStats, SessionBooking
+from bookings.stats import compute_rollups
+
+ROW_KEY = ('skill_id', 'week', 'status')
+
+
+def _rows_by_mentor(rows):
+    by_mentor = {}
+    for row in rows:
+        if row.sessions:
+            key = tuple(getattr(row, field) for field in ROW_KEY)
+            by_mentor.setdefault(row.mentor_id, {})[key] = (row.sessions, row.minutes)
+    return by_mentor
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes the MentorWeeklyStats rollup behind /api/bookings/stats/ from "
+        "SessionBooking, in batches of mentor profiles."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help="Mentor profiles per transaction.")
+        parser.add_argument(
+            '--verify', action='store_true',
+            help="Only report mentors whose rollup rows are wrong; exit non-zero if any are found.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError("--batch-size must be positive.")
+        verify = options['verify']
+
+        mentors = UserProfile.objects.filter(role='mentor').order_by('pk').values_list('pk', flat=True)
+        mismatches = 0
+        last_pk = 0
+        while True:
+            with transaction.atomic():
+                ids = list(mentors.filter(pk__gt=last_pk)[:batch_size])
+                if not ids:
+                    break
+                last_pk = ids[-1]
+                expected_rows = compute_rollups(SessionBooking.objects.filter(mentor_id__in=ids))
+                expected = _rows_by_mentor(expected_rows)
+                stored = _rows_by_mentor(MentorWeeklyStats.objects.filter(mentor_id__in=ids))
+                stale = {mentor_id for mentor_id in ids if expected.get(mentor_id) != stored.get(mentor_id)}
+                mismatches += len(stale)
+                if stale and not verify:
+                    MentorWeeklyStats.objects.filter(mentor_id__in=stale).delete()
+                    MentorWeeklyStats.objects.bulk_create(
+                        [row for row in expected_rows if row.mentor_id in stale], batch_size=1000,
+                    )
+
+        verb = "Found" if verify else "Fixed"
+        self.stdout.write(f"{verb} {mismatches} mentor(s) with stale booking stats.")
+        if verify and mismatches:
+            raise CommandError("Booking stats are out of date; run rebuild_booking_stats without --verify.")
@@ -0,0 +1,100 @@
+# bookings/management/commands/rebuild_counters.py
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from profiles.models import UserProfile
+from skills.caching import invalidate_catalogue
+from skills.models import Skill
+from skills.ranking import RANK_FIELDS, RANK_SCORE_TOLERANCE, rank_score
+from bookings.counters import COMPLETED, average_rating
+from bookings.models import Review, SessionBooking
+
+COUNTER_FIELDS = ['rating_sum', 'rating_count', 'avg_rating', 'sessions_completed']
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes the denormalized rating and session counters on skills and "
+        "mentor profiles from Review and SessionBooking, in batches of primary keys, "
+        "along with each skill's best-match rank score."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--verify', action='store_true',
+            help="Only report rows whose stored counters are wrong; exit non-zero if any are found.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError("--batch-size must be positive.")
+        verify = options['verify']
+
+        skill_mismatches = self.rebuild(Skill.objects.all(), 'skill_id', 'skill_id', batch_size, verify)
+        profile_mismatches = self.rebuild(
+            UserProfile.objects.filter(role='mentor'), 'mentor_profile_id', 'mentor_id', batch_size, verify,
+        )
+
+        total = skill_mismatches + profile_mismatches
+        verb = "Found" if verify else "Fixed"
+        self.stdout.write(f"{verb} {skill_mismatches} skill(s) and {profile_mismatches} profile(s) with stale counters.")
+        if total and not verify:
+            invalidate_catalogue()
+        if verify and total:
+            raise CommandError("Counters are out of date; run rebuild_counters without --verify.")
+
+    def rebuild(self, queryset, review_key, booking_key, batch_size, verify):
+        model = queryset.model
+        fields = COUNTER_FIELDS + ['rank_score'] if model is Skill else COUNTER_FIELDS
+        loaded = {*fields, *RANK_FIELDS} if model is Skill else fields
+        mismatches = 0
+        last_pk = 0
+        while True:
+            with transaction.atomic():
+                batch = list(
+                    queryset.filter(pk__gt=last_pk).order_by('pk').select_for_update()
+                    .only('pk', *loaded)[:batch_size]
+                )
+                if not batch:
+                    break
+                last_pk = batch[-1].pk
+                ids = [row.pk for row in batch]
+
+                ratings = {
+                    row[review_key]: (row['total'], row['count'])
+                    for row in Review.objects.filter(**{f'{review_key}__in': ids})
+                    .values(review_key).annotate(total=Sum('rating'), count=Count('id')).order_by()
+                }
+                sessions = dict(
+                    SessionBooking.objects.filter(**{f'{booking_key}__in': ids}, status=COMPLETED)
+                    .values(booking_key).annotate(count=Count('id')).values_list(booking_key, 'count').order_by()
+                )
+
+                stale = []
+                for row in batch:
+                    rating_sum, rating_count = ratings.get(row.pk, (0, 0))
+                    expected = {
+                        'rating_sum': rating_sum,
+                        'rating_count': rating_count,
+                        'avg_rating': average_rating(rating_sum, rating_count),
+                        'sessions_completed': sessions.get(row.pk, 0),
+                    }
+                    if model is Skill:
+                        expected['rank_score'] = rank_score(
+                            rating_sum, rating_count, expected['sessions_completed'], row.price, row.active_at,
+                        )
+                    if model is Skill and abs(row.rank_score - expected['rank_score']) <= RANK_SCORE_TOLERANCE:
+                        # Recency ages between update_rank_scores runs; only counter-driven drift counts
+                        expected['rank_score'] = row.rank_score
+                    if any(getattr(row, field) != value for field, value in expected.items()):
+                        for field, value in expected.items():
+                            setattr(row, field, value)
+                        stale.append(row)
+
+                mismatches += len(stale)
+                if stale and not verify:
+                    model.objects.bulk_update(stale, fields)
+        return mismatches
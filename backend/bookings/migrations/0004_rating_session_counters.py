@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0003_remove_sessionbooking_is_confirmed_and_more'),
+        ('skills', '0005_rating_session_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='review',
+            name='skill',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reviews', to='skills.skill'),
+        ),
+        migrations.AlterField(
+            model_name='sessionbooking',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('accepted', 'Accepted'), ('declined', 'Declined'), ('rescheduled', 'Rescheduled'), ('completed', 'Completed')], default='pending', max_length=15),
+        ),
+    ]
@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_session_interval(apps, schema_editor):
+    SessionBooking = apps.get_model('bookings', 'SessionBooking')
+    batch = []
+    for booking in SessionBooking.objects.only('session_date', 'session_time', 'duration').iterator(chunk_size=2000):
+        booking.session_start = timezone.make_aware(datetime.combine(booking.session_date, booking.session_time))
+        booking.session_end = booking.session_start + timedelta(minutes=booking.duration)
+        batch.append(booking)
+        if len(batch) >= 2000:
+            SessionBooking.objects.bulk_update(batch, ['session_start', 'session_end'])
+            batch = []
+    if batch:
+        SessionBooking.objects.bulk_update(batch, ['session_start', 'session_end'])
+
+
+def create_overlap_constraint(apps, schema_editor):
+    # Exclusion constraints are Postgres-only. Wrapping mentor_id in a
+    # single-point int8range lets GiST's built-in range_ops handle the equality
+    # part, so no btree_gist extension is required.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("""
+        ALTER TABLE bookings_sessionbooking ADD CONSTRAINT booking_no_mentor_overlap
+        EXCLUDE USING gist (
+            int8range(mentor_id, mentor_id, '[]') WITH =,
+            tstzrange(session_start, session_end, '[)') WITH &&
+        ) WHERE (status IN ('accepted', 'completed'))
+    """)
+
+
+def drop_overlap_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('ALTER TABLE bookings_sessionbooking DROP CONSTRAINT IF EXISTS booking_no_mentor_overlap')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0004_rating_session_counters'),
+        ('profiles', '0002_rating_session_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sessionbooking',
+            name='session_start',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='sessionbooking',
+            name='session_end',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_session_interval, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='sessionbooking',
+            name='session_start',
+            field=models.DateTimeField(editable=False),
+        ),
+        migrations.AlterField(
+            model_name='sessionbooking',
+            name='session_end',
+            field=models.DateTimeField(editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='sessionbooking',
+            index=models.Index(condition=models.Q(('status__in', ('accepted', 'completed'))), fields=['mentor', 'session_start'], name='booking_mentor_start_idx'),
+        ),
+        migrations.RunPython(create_overlap_constraint, drop_overlap_constraint),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncWeek
+
+
+def backfill_weekly_stats(apps, schema_editor):
+    SessionBooking = apps.get_model('bookings', 'SessionBooking')
+    MentorWeeklyStats = apps.get_model('bookings', 'MentorWeeklyStats')
+    rows = (
+        SessionBooking.objects.annotate(week=TruncWeek('session_date'))
+        .values('mentor_id', 'skill_id', 'week', 'status')
+        .annotate(sessions=Count('id'), minutes=Sum('duration'))
+        .order_by()
+    )
+    MentorWeeklyStats.objects.bulk_create((MentorWeeklyStats(**row) for row in rows), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0005_sessionbooking_session_interval'),
+        ('profiles', '0004_userprofile_token_version'),
+        ('skills', '0005_rating_session_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MentorWeeklyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('week', models.DateField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('accepted', 'Accepted'), ('declined', 'Declined'), ('rescheduled', 'Rescheduled'), ('completed', 'Completed')], max_length=15)),
+                ('sessions', models.IntegerField(default=0)),
+                ('minutes', models.IntegerField(default=0)),
+                ('mentor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='profiles.userprofile')),
+                ('skill', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='skills.skill')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('mentor', 'week', 'skill', 'status'), name='mentor_weekly_stats_key')],
+            },
+        ),
+        migrations.RunPython(backfill_weekly_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0006_mentor_weekly_stats'),
+        ('profiles', '0004_userprofile_token_version'),
+        ('skills', '0005_rating_session_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['created_at', 'id'], name='review_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sessionbooking',
+            index=models.Index(fields=['created_at', 'id'], name='booking_created_idx'),
+        ),
+    ]
@@ -1,9 +1,20 @@
 from django.db import models
 from skills.models import Skill
-from skills.models import Availability
 from profiles.models import CustomUser, UserProfile
 from django.core.validators import MinValueValidator
 from django.core.exceptions import ValidationError
+from django.utils import timezone
+from datetime import datetime, timedelta
+
+# Statuses that occupy a slot on the mentor's calendar
+BLOCKING_STATUSES = ('accepted', 'completed')
+# Upper bound on `duration`; lets overlap checks scan a bounded index range
+MAX_SESSION_MINUTES = 8 * 60
+
+def session_bounds(session_date, session_time, duration):
+    """Aware [start, end) datetimes of a session, in the project time zone."""
+    start = timezone.make_aware(datetime.combine(session_date, session_time))
+    return start, start + timedelta(minutes=duration)
 
 class SessionBooking(models.Model):
     STATUS_CHOICES = (
@@ -11,6 +22,7 @@ class SessionBooking(models.Model):
         ('accepted', 'Accepted'),
         ('declined', 'Declined'),
         ('rescheduled', 'Rescheduled'),
+        ('completed', 'Completed'),
     )
 
     mentor = models.ForeignKey(
@@ -42,51 +54,90 @@ class SessionBooking(models.Model):
     duration = models.PositiveIntegerField(default=60) # In minutes
     skill_level = models.CharField(max_length=50, blank=True, null=True)
     message = models.TextField(blank=True, null=True)
+    # Absolute session interval derived from session_date/session_time/duration on save,
+    # used for overlap checks and the Postgres exclusion constraint
+    session_start = models.DateTimeField(editable=False)
+    session_end = models.DateTimeField(editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['mentor', 'session_start'],
+                condition=models.Q(status__in=BLOCKING_STATUSES),
+                name='booking_mentor_start_idx',
+            ),
+            # Watermark scans of reports.rollups
+            models.Index(fields=['created_at', 'id'], name='booking_created_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored status so counters can react to transitions without re-reading the row
+        loaded = dict(zip(field_names, values))
+        instance._loaded_status = loaded.get('status')
+        if STATS_FIELDS.issubset(loaded):
+            # Rollup bucket this row was counted in (see bookings.stats)
+            instance._loaded_stats = tuple(loaded[field] for field in STATS_KEY_FIELDS)
+        return instance
 
     def clean(self):
         super().clean()
-        # Temporarily disable validation to debug the issue
-        return
-        # if self.learner.profile.role != 'learner':
-        #     raise ValidationError("Only users with 'learner' role can book sessions.")
-        # if self.skill.profile != self.mentor:
-        #     raise ValidationError("The selected mentor does not offer this skill.")
-        
-        # try:
-        #     mentor_profile_for_availability = self.mentor
-        #     day_of_week = self.session_date.strftime('%A').lower()
-        #     availability = Availability.objects.filter(
-        #         mentor=mentor_profile_for_availability,
-        #         day_of_week__iexact=day_of_week,
-        #         start_time__lte=self.session_time,
-        #         end_time__gte=self.session_time
-        #     ).exists()
-        #     if not availability:
-        #         raise ValidationError(f"The mentor is not available on {self.session_date.strftime('%A')} at {self.session_time}.")
-        #     if self.status == 'accepted':
-        #         conflicting_bookings = SessionBooking.objects.filter(
-        #             mentor=self.mentor,
-        #             session_date=self.session_date,
-        #             session_time=self.session_time,
-        #             status='accepted'
-        #         ).exclude(pk=self.pk).exists()
-        #         if conflicting_bookings:
-        #         raise ValidationError(f"This mentor is already booked on {self.session_date} at {self.session_time}.")
-        # except AttributeError as e:
-        #     raise ValidationError(f"Configuration error: Missing mentor profile linked to skill or booking. Detail: {e}")
-        # except Exception as e:
-        #     raise ValidationError(f"An unexpected error occurred during availability check: {e}")
-    
+        from .scheduling import check_slot
+
+        if self.learner_id and self.learner.profile.role != 'learner':
+            raise ValidationError("Only users with 'learner' role can book sessions.")
+        if self.skill_id and self.skill.profile_id != self.mentor_id:
+            raise ValidationError("The selected mentor does not offer this skill.")
+        if self.mentor_id and self.session_date and self.session_time:
+            check_slot(self.mentor_id, self.session_date, self.session_time, self.duration, exclude_pk=self.pk)
+
+    def save(self, *args, **kwargs):
+        self.session_start, self.session_end = session_bounds(self.session_date, self.session_time, self.duration)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'session_date', 'session_time', 'duration'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'session_start', 'session_end'}
+        super().save(*args, **kwargs)
+
     def __str__(self):
         mentor_username = self.mentor.user.username if self.mentor and hasattr(self.mentor, 'user') else 'N/A Mentor'
         learner_username = self.learner.username if self.learner else 'N/A Learner'
         skill_name = self.skill.name if self.skill else 'N/A Skill'
         return f"{learner_username} booked {skill_name} with {mentor_username}"
 
+# SessionBooking fields that decide which MentorWeeklyStats row a booking counts towards
+STATS_KEY_FIELDS = ('mentor_id', 'skill_id', 'session_date', 'status', 'duration')
+STATS_FIELDS = frozenset(STATS_KEY_FIELDS)
+# Review columns the rating counters depend on (see bookings.counters)
+REVIEW_COUNTER_FIELDS = ('rating', 'skill_id', 'mentor_profile_id')
+
+class MentorWeeklyStats(models.Model):
+    """
+    Booking totals per mentor, skill, week (the Monday of session_date) and
+    status. Kept up to date by bookings.stats on every booking change so the
+    dashboard reads a few rows per week instead of every session.
+    """
+    mentor = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name='+')
+    skill = models.ForeignKey(Skill, on_delete=models.CASCADE, related_name='+')
+    week = models.DateField()
+    status = models.CharField(max_length=15, choices=SessionBooking.STATUS_CHOICES)
+    sessions = models.IntegerField(default=0)
+    minutes = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['mentor', 'week', 'skill', 'status'], name='mentor_weekly_stats_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.mentor_id} / {self.skill_id} / {self.week} / {self.status}: {self.sessions}"
+
 class Review(models.Model):
     mentor_profile = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name='received_reviews', limit_choices_to={'role': 'mentor'}, null=True,
     blank=True )
     student = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='given_reviews')
+    # Optional: the skill the review is about, so ratings can be tracked per skill as well as per mentor
+    skill = models.ForeignKey(Skill, on_delete=models.SET_NULL, related_name='reviews', null=True, blank=True)
     rating = models.PositiveSmallIntegerField(validators=[MinValueValidator(1)], help_text="Rating out of 5 stars")
     comment = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
@@ -96,6 +147,19 @@ class Review(models.Model):
         # Temporarily commenting out unique_together here if it causes issues with null=True
         # Will need to re-add it or adjust if null reviews are allowed for the same mentor/student
         unique_together = ('mentor_profile', 'student')
+        indexes = [
+            # Watermark scans of reports.rollups
+            models.Index(fields=['created_at', 'id'], name='review_created_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        loaded = dict(zip(field_names, values))
+        if all(field in loaded for field in REVIEW_COUNTER_FIELDS):
+            # Counted values of this row; with any of them deferred, bookings.counters re-reads the row on save
+            instance._loaded_counters = tuple(loaded[field] for field in REVIEW_COUNTER_FIELDS)
+        return instance
 
     def __str__(self):
         mentor_username = self.mentor_profile.user.username if self.mentor_profile and hasattr(self.mentor_profile, 'user') else "N/A Mentor"
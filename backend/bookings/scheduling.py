@@ -0,0 +1,84 @@
+# bookings/scheduling.py
+"""
+Slot checks for session bookings. A booking occupies [session_start,
+session_end) on its mentor's calendar; only confirmed bookings (see
+BLOCKING_STATUSES) block a slot. On Postgres the same rule is enforced by the
+`booking_no_mentor_overlap` exclusion constraint, so concurrent requests that
+slip past the check still cannot both be stored.
+"""
+from datetime import datetime, timedelta
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError
+from django.db.models import Exists, OuterRef, Value
+
+from profiles.models import UserProfile
+from skills.models import Availability
+from .models import BLOCKING_STATUSES, MAX_SESSION_MINUTES, SessionBooking, session_bounds
+
+# Name of the Postgres exclusion constraint created in migration 0005
+OVERLAP_CONSTRAINT = 'booking_no_mentor_overlap'
+
+
+def check_slot(mentor_id, session_date, session_time, duration, exclude_pk=None, lock=False, require_window=True):
+    """
+    Raises ValidationError unless the mentor's availability windows, merged
+    where they touch or overlap, cover the whole session (skipped when
+    require_window is False) and no confirmed booking overlaps it. Both
+    conditions are answered by one query. With lock=True a row lock on the
+    mentor's profile is taken first, in a query of its own, so concurrent
+    bookings for the same mentor are checked one at a time (call inside
+    transaction.atomic()).
+    """
+    if not 0 < duration <= MAX_SESSION_MINUTES:
+        raise ValidationError(f"Session duration must be between 1 and {MAX_SESSION_MINUTES} minutes.")
+    start, end = session_bounds(session_date, session_time, duration)
+    if end.date() != start.date() and end.time() != datetime.min.time():
+        raise ValidationError("Sessions cannot run past midnight.")
+
+    # The session must lie within the union of the day's windows, which is how
+    # the slot index (skills.slots) merges them: a window holds its start, and
+    # every window that ends before the session does is continued by another.
+    day_windows = Availability.objects.filter(is_available=True, day_of_week__iexact=start.strftime('%A'))
+    last_minute = (end - timedelta(microseconds=1)).time()
+    windows = day_windows.filter(mentor_id=OuterRef('pk'), start_time__lte=start.time(), end_time__gt=start.time())
+    continued = day_windows.filter(
+        mentor_id=OuterRef('mentor_id'), start_time__lte=OuterRef('end_time'), end_time__gt=OuterRef('end_time'),
+    )
+    gaps = day_windows.filter(mentor_id=OuterRef('pk'), end_time__gte=start.time(), end_time__lte=last_minute).exclude(
+        Exists(continued),
+    )
+    # Bounding session_start from below keeps this a short range scan on
+    # booking_mentor_start_idx: no session is longer than MAX_SESSION_MINUTES.
+    conflicts = SessionBooking.objects.filter(
+        mentor_id=OuterRef('pk'),
+        status__in=BLOCKING_STATUSES,
+        session_start__gt=start - timedelta(minutes=MAX_SESSION_MINUTES),
+        session_start__lt=end,
+        session_end__gt=start,
+    )
+    if exclude_pk is not None:
+        conflicts = conflicts.exclude(pk=exclude_pk)
+
+    mentor = UserProfile.objects.filter(pk=mentor_id)
+    # On Postgres a statement that waited for a lock still reads with the snapshot it started
+    # with, so the checks run as a second statement that sees what the lock holder committed
+    if lock and mentor.select_for_update().values_list('pk', flat=True).first() is None:
+        raise ValidationError("Mentor not found.")
+    in_window = Exists(windows) & ~Exists(gaps) if require_window else Value(True)
+    row = mentor.annotate(in_window=in_window, overlaps=Exists(conflicts)).values_list('in_window', 'overlaps').first()
+
+    if row is None:
+        raise ValidationError("Mentor not found.")
+    in_window, overlaps = row
+    if not in_window:
+        raise ValidationError(
+            f"The mentor is not available on {start.strftime('%A')} from {start.time():%H:%M} to {end.time():%H:%M}."
+        )
+    if overlaps:
+        raise ValidationError(f"This mentor is already booked on {session_date} at {session_time:%H:%M}.")
+
+
+def is_overlap_violation(error):
+    """True if an IntegrityError was raised by the mentor overlap exclusion constraint."""
+    return isinstance(error, IntegrityError) and OVERLAP_CONSTRAINT in str(error)
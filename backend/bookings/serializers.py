@@ -1,7 +1,12 @@
+import logging
+
 from rest_framework import serializers
 from .models import SessionBooking, Review
 from profiles.models import CustomUser, UserProfile
 from skills.models import Skill
+from config.serialization import ValuesSerializer
+
+logger = logging.getLogger(__name__)
 
 class SessionBookingSerializer(serializers.ModelSerializer):
     learner_username = serializers.CharField(source='learner.username', read_only=True)
@@ -22,12 +27,8 @@ class SessionBookingSerializer(serializers.ModelSerializer):
             'learner_username', 'mentor_username', 'skill_title'
         ]
 
-    def validate(self, data):
-        print(f"Validating data: {data}")
-        return data
-
     def create(self, validated_data):
-        print(f"Creating SessionBooking with data: {validated_data}")
+        logger.debug("booking create data=%s", validated_data)
         
         # Get the skill to determine the mentor
         skill = validated_data.get('skill')
@@ -36,21 +37,23 @@ class SessionBookingSerializer(serializers.ModelSerializer):
         
         # Set the mentor from the skill's profile
         validated_data['mentor'] = skill.profile
-        print(f"Mentor set to: {skill.profile}")
         
         try:
             return super().create(validated_data)
         except Exception as e:
-            print(f"Error creating SessionBooking: {e}")
+            logger.warning("booking create failed skill_id=%s error=%s", skill.pk, e)
             raise serializers.ValidationError(f"Failed to create booking: {str(e)}")
 
+# Same output as SessionBookingSerializer, built from .values() rows for the booking list
+session_booking_rows = ValuesSerializer(SessionBookingSerializer)
+
 class ReviewSerializer(serializers.ModelSerializer):
     student_name = serializers.CharField(source='student.username', read_only=True)
     mentor_username = serializers.CharField(source='mentor_profile.user.username', read_only=True) # To identify the mentor
 
     class Meta:
         model = Review
-        fields = ['id', 'mentor_profile', 'student_name', 'mentor_username', 'rating', 'comment', 'created_at']
+        fields = ['id', 'mentor_profile', 'skill', 'student_name', 'mentor_username', 'rating', 'comment', 'created_at']
         read_only_fields = ['student_name', 'mentor_username', 'created_at']
 
     # Override create for reviews to ensure student and mentor are set correctly
@@ -68,5 +71,11 @@ class ReviewSerializer(serializers.ModelSerializer):
             if Review.objects.filter(mentor_profile=mentor_profile, student=student).exists():
                 raise serializers.ValidationError("You have already reviewed this mentor.")
 
+            # A reviewed skill must be one the reviewed mentor offers
+            skill = validated_data.get('skill')
+            if skill and skill.profile_id != mentor_profile.id:
+                raise serializers.ValidationError("This mentor does not offer the selected skill.")
+
+            validated_data.pop('student', None) # The view passes the student explicitly as well
             return Review.objects.create(student=student, **validated_data)
         return super().create(validated_data)
\ No newline at end of file
@@ -0,0 +1,205 @@
+# bookings/stats.py
+"""
+Mentor dashboard figures: bookings per status, revenue, bookings per week and
+per skill. Each breakdown is one GROUP BY query with conditional aggregates,
+so a dashboard costs three queries however many sessions the mentor has.
+
+The queries run against MentorWeeklyStats, a rollup with one row per mentor,
+skill, week and status that the receivers below adjust by `x = x + delta` on
+every booking change. Setting BOOKING_STATS_ROLLUPS = False aggregates the
+SessionBooking rows instead; `manage.py rebuild_booking_stats` recomputes the
+rollup from them.
+
+Revenue is the skill's current hourly price times the booked minutes, for
+completed sessions (earned) and accepted ones (upcoming).
+"""
+from datetime import timedelta
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DecimalField, F, Q, Sum
+from django.db.models.functions import TruncWeek
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from config.dates import week_of
+from .models import STATS_KEY_FIELDS, MentorWeeklyStats, SessionBooking
+
+COMPLETED = 'completed'
+ACCEPTED = 'accepted'
+STATUSES = [status for status, _ in SessionBooking.STATUS_CHOICES]
+_MISSING = object()
+
+
+def _money(value):
+    # Price is per hour and the aggregates are price x minutes
+    return (Decimal(value or 0) / 60).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+class _Source:
+    """Column names for aggregating one of the two tables the same way."""
+
+    def __init__(self, queryset, week, count, minutes, week_filter):
+        self.queryset = queryset
+        self.week = week
+        self.count = count
+        self.minutes = minutes
+        self.week_filter = week_filter
+
+    def sessions(self, **filters):
+        q = Q(**filters) if filters else None
+        if self.count is None:
+            return Count('id', filter=q)
+        return Sum(self.count, filter=q, default=0)
+
+    def revenue(self, **filters):
+        return Sum(
+            F(self.minutes) * F('skill__price'), filter=Q(**filters) if filters else None,
+            output_field=DecimalField(max_digits=20, decimal_places=2),
+        )
+
+
+def _source(mentor_id, first_week, last_week, use_rollups):
+    if use_rollups:
+        source = _Source(
+            MentorWeeklyStats.objects.filter(mentor_id=mentor_id, sessions__gt=0),
+            week=F('week'), count='sessions', minutes='minutes', week_filter='week',
+        )
+        last_day = last_week
+    else:
+        source = _Source(
+            SessionBooking.objects.filter(mentor_id=mentor_id),
+            week=TruncWeek('session_date'), count=None, minutes='duration', week_filter='session_date',
+        )
+        last_day = last_week + timedelta(days=6) if last_week else None
+    if first_week:
+        source.queryset = source.queryset.filter(**{f'{source.week_filter}__gte': first_week})
+    if last_day:
+        source.queryset = source.queryset.filter(**{f'{source.week_filter}__lte': last_day})
+    return source
+
+
+def mentor_stats(mentor_id, first_day=None, last_day=None, use_rollups=None):
+    """
+    Dashboard figures for one mentor. The range is widened to whole weeks
+    (Monday of first_day to Sunday of last_day) so weekly rows are complete.
+    """
+    if use_rollups is None:
+        use_rollups = getattr(settings, 'BOOKING_STATS_ROLLUPS', True)
+    first_week = week_of(first_day) if first_day else None
+    last_week = week_of(last_day) if last_day else None
+    source = _source(mentor_id, first_week, last_week, use_rollups)
+    rows = source.queryset.order_by()
+
+    by_status = {
+        row['status']: row
+        for row in rows.values('status').annotate(
+            bookings=source.sessions(), booked_minutes=Sum(source.minutes), revenue=source.revenue(),
+        )
+    }
+    breakdown = {
+        'bookings': source.sessions(),
+        'completed': source.sessions(status=COMPLETED),
+        'revenue': source.revenue(status=COMPLETED),
+    }
+    weeks = rows.annotate(bucket=source.week).values('bucket').annotate(**breakdown).order_by('bucket')
+    skills = rows.values('skill_id', 'skill__name').annotate(**breakdown).order_by('skill__name', 'skill_id')
+
+    def status_total(status, field):
+        return by_status[status][field] if status in by_status else 0
+
+    return {
+        'mentor': mentor_id,
+        'from': first_week,
+        'to': last_week + timedelta(days=6) if last_week else None,
+        'totals': {
+            'bookings': sum(row['bookings'] for row in by_status.values()),
+            'minutesCompleted': status_total(COMPLETED, 'booked_minutes') or 0,
+            'revenue': _money(status_total(COMPLETED, 'revenue')),
+            'upcomingRevenue': _money(status_total(ACCEPTED, 'revenue')),
+        },
+        'statuses': {status: status_total(status, 'bookings') for status in STATUSES},
+        'weeks': [
+            {'week': row['bucket'], 'bookings': row['bookings'], 'completed': row['completed'], 'revenue': _money(row['revenue'])}
+            for row in weeks if row['bookings']
+        ],
+        'skills': [
+            {
+                'skill': row['skill_id'], 'name': row['skill__name'], 'bookings': row['bookings'],
+                'completed': row['completed'], 'revenue': _money(row['revenue']),
+            }
+            for row in skills if row['bookings']
+        ],
+    }
+
+
+# --- Rollup maintenance ---
+
+def apply_stats(key, sessions_delta):
+    """Adds sessions_delta bookings of the given STATS_KEY_FIELDS tuple to its rollup row."""
+    mentor_id, skill_id, session_date, status, duration = key
+    if not sessions_delta or mentor_id is None or skill_id is None:
+        return
+    bucket = MentorWeeklyStats.objects.filter(mentor_id=mentor_id, skill_id=skill_id, week=week_of(session_date), status=status)
+    changes = {'sessions': F('sessions') + sessions_delta, 'minutes': F('minutes') + sessions_delta * duration}
+    if bucket.update(**changes) or sessions_delta < 0:
+        return
+    try:
+        with transaction.atomic():
+            MentorWeeklyStats.objects.create(
+                mentor_id=mentor_id, skill_id=skill_id, week=week_of(session_date), status=status,
+                sessions=sessions_delta, minutes=sessions_delta * duration,
+            )
+    except IntegrityError:
+        # Created concurrently by another booking in the same bucket
+        bucket.update(**changes)
+
+
+def _stats_key(instance):
+    return tuple(getattr(instance, field) for field in STATS_KEY_FIELDS)
+
+
+@receiver(pre_save, sender=SessionBooking)
+def remember_booking_stats(sender, instance, raw=False, **kwargs):
+    # Instances not loaded through from_db (or with deferred fields) read the stored row once
+    if raw or instance._state.adding or getattr(instance, '_loaded_stats', _MISSING) is not _MISSING:
+        return
+    stored = SessionBooking.objects.filter(pk=instance.pk).values_list(*STATS_KEY_FIELDS).first()
+    instance._loaded_stats = stored
+
+
+@receiver(post_save, sender=SessionBooking)
+def update_booking_stats(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    current = _stats_key(instance)
+    previous = None if created else instance._loaded_stats
+    if previous != current:
+        if previous is not None:
+            apply_stats(previous, -1)
+        apply_stats(current, 1)
+    instance._loaded_stats = current
+
+
+@receiver(post_delete, sender=SessionBooking)
+def remove_booking_stats(sender, instance, **kwargs):
+    apply_stats(_stats_key(instance), -1)
+
+
+def compute_rollups(bookings=None):
+    """MentorWeeklyStats rows (unsaved) recomputed from SessionBooking."""
+    bookings = SessionBooking.objects.all() if bookings is None else bookings
+    rows = (
+        bookings.annotate(bucket=TruncWeek('session_date'))
+        .values('mentor_id', 'skill_id', 'bucket', 'status')
+        .annotate(sessions=Count('id'), minutes=Sum('duration'))
+        .order_by()
+    )
+    return [
+        MentorWeeklyStats(
+            mentor_id=row['mentor_id'], skill_id=row['skill_id'], week=row['bucket'], status=row['status'],
+            sessions=row['sessions'], minutes=row['minutes'],
+        )
+        for row in rows
+    ]
@@ -1,3 +1,355 @@
-from django.test import TestCase
+import json
+import threading
+import time as time_module
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, time
+from decimal import Decimal
+from io import StringIO
+from unittest import skipUnless
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, TransactionTestCase
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from config.testing import QueryBudgetMixin, seed_marketplace
+from profiles.models import CustomUser, UserProfile
+from skills.models import Availability, Skill
+from skills.slots import slot_index
+from .models import MentorWeeklyStats, Review, SessionBooking
+from .scheduling import check_slot
+from .serializers import SessionBookingSerializer
+from .stats import mentor_stats
+
+
+def make_user(username, role='learner'):
+    user = CustomUser.objects.create_user(username=username, password='pass12345')
+    if role != 'learner':
+        user.profile.role = role
+        user.profile.save()
+    return user
+
+
+class CounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.mentor = make_user('mentor', 'mentor')
+        cls.learners = [make_user(f'learner{i}') for i in range(3)]
+        cls.skill = Skill.objects.create(profile=cls.mentor.profile, name='React', price=20)
+
+    def book(self, learner, status='pending'):
+        return SessionBooking.objects.create(
+            mentor=self.mentor.profile, learner=learner, skill=self.skill,
+            session_date=date(2030, 1, 7), session_time=time(9 + SessionBooking.objects.count(), 0), status=status,
+        )
+
+    def assertCounters(self, rating_count, avg_rating, sessions):
+        skill = Skill.objects.get(pk=self.skill.pk)
+        profile = UserProfile.objects.get(pk=self.mentor.profile.pk)
+        for obj in (skill, profile):
+            self.assertEqual(obj.rating_count, rating_count)
+            self.assertEqual(obj.avg_rating, avg_rating)
+            self.assertEqual(obj.sessions_completed, sessions)
+
+    def test_review_create_update_delete(self):
+        reviews = [
+            Review.objects.create(mentor_profile=self.mentor.profile, skill=self.skill, student=learner, rating=rating, comment='')
+            for learner, rating in zip(self.learners, [5, 4, 4])
+        ]
+        self.assertCounters(3, Decimal('4.33'), 0)
+
+        review = Review.objects.get(pk=reviews[0].pk)
+        review.rating = 2
+        review.save()
+        self.assertCounters(3, Decimal('3.33'), 0)
+
+        # A deferred rating is re-read rather than counted again
+        Review.objects.defer('rating').get(pk=reviews[1].pk).save()
+        self.assertCounters(3, Decimal('3.33'), 0)
+
+        for review in reviews:
+            Review.objects.get(pk=review.pk).delete()
+        self.assertCounters(0, None, 0)
+
+    def test_completed_transitions(self):
+        booking = self.book(self.learners[0])
+        self.book(self.learners[1], status='completed')
+        self.assertCounters(0, None, 1)
+
+        booking = SessionBooking.objects.get(pk=booking.pk)
+        booking.status = 'completed'
+        booking.save()
+        booking.save()
+        self.assertCounters(0, None, 2)
+
+        booking.status = 'declined'
+        booking.save()
+        self.assertCounters(0, None, 1)
+
+    def test_rebuild_counters_command(self):
+        self.book(self.learners[0], status='completed')
+        Review.objects.create(mentor_profile=self.mentor.profile, skill=self.skill, student=self.learners[0], rating=3, comment='')
+        call_command('rebuild_counters', '--verify', stdout=StringIO())
+
+        Skill.objects.filter(pk=self.skill.pk).update(rating_sum=0, rating_count=0, avg_rating=None, sessions_completed=9)
+        with self.assertRaises(CommandError):
+            call_command('rebuild_counters', '--verify', stdout=StringIO())
+        call_command('rebuild_counters', '--batch-size', '1', stdout=StringIO())
+        self.assertCounters(1, Decimal('3.00'), 1)
+
+
+class BookingQueryBudgetTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # Few users and many rows, so every list below returns hundreds of rows
+        cls.mentors, cls.learners = seed_marketplace(mentors=2, learners=3, bookings=1200, reviews=6, messages=0)
+
+    def test_booking_list_budget(self):
+        self.assertEndpointBudget('/api/bookings/', 2, user=self.mentors[0], min_rows=300)
+        self.assertEndpointBudget('/api/bookings/', 2, user=self.learners[0], min_rows=200)
+
+    def test_booking_list_matches_serializer(self):
+        client = APIClient()
+        client.force_authenticate(self.learners[0])
+        response = client.get('/api/bookings/')
+        bookings = SessionBooking.objects.filter(learner=self.learners[0])
+        self.assertEqual(sorted(response.data, key=lambda row: row['id']), SessionBookingSerializer(bookings.order_by('id'), many=True).data)
+        # The rendered body is what the stdlib JSONRenderer produces
+        self.assertEqual(json.loads(response.content), json.loads(JSONRenderer().render(response.data)))
+
+    def test_compact_booking_list(self):
+        client = APIClient()
+        client.force_authenticate(self.mentors[0])
+        rows = client.get('/api/bookings/').data
+        compact = client.get('/api/bookings/', {'fields': 'id,status,session_date', 'compact': 'true'}).data
+        self.assertEqual(compact['fields'], ['id', 'session_date', 'status'])
+        self.assertEqual(sorted(compact['rows']), sorted([row['id'], row['session_date'], row['status']] for row in rows))
+
+    def test_stats_budget(self):
+        call_command('rebuild_booking_stats', stdout=StringIO())
+        for rollups in (True, False):
+            with self.settings(BOOKING_STATS_ROLLUPS=rollups):
+                response = self.assertEndpointBudget('/api/bookings/stats/', 4, user=self.mentors[0])
+            self.assertGreater(response.data['totals']['bookings'], 300)
+
+    def test_review_list_budget(self):
+        self.assertEndpointBudget('/api/bookings/reviews/', 2, user=self.mentors[0], min_rows=3)
+        self.assertEndpointBudget('/api/bookings/reviews/', 2, user=self.learners[0], min_rows=2)
+
+
+class BookingStatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.mentor = make_user('mentor', 'mentor')
+        cls.learner = make_user('learner')
+        cls.react = Skill.objects.create(profile=cls.mentor.profile, name='React', price=60)
+        cls.django = Skill.objects.create(profile=cls.mentor.profile, name='Django', price=30)
+
+    def book(self, skill, day, status='pending', duration=60, hour=9):
+        return SessionBooking.objects.create(
+            mentor=self.mentor.profile, learner=self.learner, skill=skill,
+            session_date=day, session_time=time(hour), duration=duration, status=status,
+        )
+
+    def get_stats(self, user, **params):
+        client = APIClient()
+        client.force_authenticate(user=type(user).objects.get(pk=user.pk))
+        return client.get('/api/bookings/stats/', params)
+
+    def test_rollups_follow_booking_changes(self):
+        # 2030-01-07 and 2030-01-14 are Mondays
+        first = self.book(self.react, date(2030, 1, 7), status='completed', duration=90)
+        self.book(self.react, date(2030, 1, 9), status='accepted')
+        self.book(self.django, date(2030, 1, 15), status='completed', duration=30)
+        moved = self.book(self.django, date(2030, 1, 16))
+        moved = SessionBooking.objects.get(pk=moved.pk)
+        moved.status = 'completed'
+        moved.save()
+        SessionBooking.objects.get(pk=first.pk).delete()
+        self.book(self.react, date(2030, 1, 8), status='completed', duration=90)
+
+        response = self.get_stats(self.mentor)
+        self.assertEqual(response.status_code, 200)
+        data = response.data
+        self.assertEqual(data['statuses'], {'pending': 0, 'accepted': 1, 'declined': 0, 'rescheduled': 0, 'completed': 3})
+        self.assertEqual(data['totals'], {
+            'bookings': 4, 'minutesCompleted': 180, 'revenue': Decimal('135.00'), 'upcomingRevenue': Decimal('60.00'),
+        })
+        self.assertEqual(
+            [(row['week'], row['bookings'], row['revenue']) for row in data['weeks']],
+            [(date(2030, 1, 7), 2, Decimal('90.00')), (date(2030, 1, 14), 2, Decimal('45.00'))],
+        )
+        self.assertEqual([(row['name'], row['completed']) for row in data['skills']], [('Django', 2), ('React', 1)])
+        self.assertEqual(mentor_stats(self.mentor.profile.pk, use_rollups=False), mentor_stats(self.mentor.profile.pk))
+
+    def test_range_is_widened_to_whole_weeks(self):
+        self.book(self.react, date(2030, 1, 7), status='completed')
+        self.book(self.react, date(2030, 1, 15), status='completed')
+        data = self.get_stats(self.mentor, **{'from': '2030-01-09', 'to': '2030-01-10'}).data
+        self.assertEqual((data['from'], data['to']), (date(2030, 1, 7), date(2030, 1, 13)))
+        self.assertEqual(data['totals']['bookings'], 1)
+        self.assertEqual(self.get_stats(self.mentor, **{'from': '2030-01-09', 'to': '2030-01-01'}).status_code, 400)
+        self.assertEqual(self.get_stats(self.mentor, **{'from': '2030-02-30'}).status_code, 400)
+        # Whole weeks around the ends of the calendar would not fit in a date
+        self.assertEqual(self.get_stats(self.mentor, to='9999-12-31').status_code, 400)
+        self.assertEqual(self.get_stats(self.mentor, **{'from': '0001-01-01'}).status_code, 400)
+
+    def test_learners_are_refused(self):
+        self.assertEqual(self.get_stats(self.learner).status_code, 403)
+
+    def test_rebuild_booking_stats_command(self):
+        self.book(self.react, date(2030, 1, 7), status='completed')
+        call_command('rebuild_booking_stats', '--verify', stdout=StringIO())
+
+        MentorWeeklyStats.objects.update(sessions=5)
+        with self.assertRaises(CommandError):
+            call_command('rebuild_booking_stats', '--verify', stdout=StringIO())
+        call_command('rebuild_booking_stats', stdout=StringIO())
+        self.assertEqual(self.get_stats(self.mentor).data['totals']['bookings'], 1)
+
+
+class BookingEngineTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.mentor = make_user('mentor', 'mentor')
+        cls.learners = [make_user(f'learner{i}') for i in range(2)]
+        cls.skill = Skill.objects.create(profile=cls.mentor.profile, name='React', price=20)
+        # 2030-01-07 is a Monday
+        Availability.objects.create(mentor=cls.mentor.profile, day_of_week='Monday', start_time=time(9), end_time=time(12))
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user=user)
+        return client
+
+    def request_booking(self, learner, session_time, duration=60):
+        return self.client_for(learner).post('/api/bookings/', {
+            'skill': self.skill.id, 'session_date': '2030-01-07', 'session_time': session_time, 'duration': duration,
+        })
+
+    def test_booking_must_fit_availability(self):
+        self.assertEqual(self.request_booking(self.learners[0], '09:00').status_code, 201)
+        self.assertEqual(self.request_booking(self.learners[0], '11:30').status_code, 400)
+        self.assertEqual(self.request_booking(self.learners[0], '08:30').status_code, 400)
+
+    def test_advertised_slots_across_adjacent_windows_can_be_booked(self):
+        # Schedules cached by earlier tests may belong to a mentor with the same id
+        cache.clear()
+        slot_index.clear()
+        afternoon = Availability.objects.create(
+            mentor=self.mentor.profile, day_of_week='Monday', start_time=time(12), end_time=time(15),
+        )
+        slots = APIClient().get(f'/api/skills/{self.skill.id}/slots/', {'from': '2030-01-07', 'to': '2030-01-07'}).data
+        self.assertEqual([(slot['start'].time(), slot['end'].time()) for slot in slots['slots']], [(time(9), time(15))])
+        self.assertEqual(self.request_booking(self.learners[0], '11:30').status_code, 201)
+        self.assertEqual(self.request_booking(self.learners[1], '14:30', duration=60).status_code, 400)
+
+        # A gap between the windows splits the slot, and a session across it is refused
+        afternoon.start_time = time(12, 30)
+        afternoon.save()
+        self.assertEqual(self.request_booking(self.learners[1], '11:45', duration=60).status_code, 400)
+        self.assertEqual(self.request_booking(self.learners[1], '12:30', duration=60).status_code, 201)
+
+    def test_new_bookings_start_pending(self):
+        response = self.client_for(self.learners[0]).post('/api/bookings/', {
+            'skill': self.skill.id, 'session_date': '2030-01-07', 'session_time': '09:00', 'status': 'accepted',
+        })
+        self.assertEqual(response.data['status'], 'pending')
+
+    def test_overlapping_accepts_are_rejected(self):
+        first = self.request_booking(self.learners[0], '09:00', duration=90).data['id']
+        second = self.request_booking(self.learners[1], '10:00').data['id']
+        mentor_client = self.client_for(self.mentor)
+        self.assertEqual(mentor_client.patch(f'/api/bookings/{first}/', {'status': 'accepted'}).status_code, 200)
+        self.assertEqual(mentor_client.patch(f'/api/bookings/{second}/', {'status': 'accepted'}).status_code, 400)
+        # The accepted session now blocks new requests for that time
+        self.assertEqual(self.request_booking(self.learners[1], '10:15', duration=30).status_code, 400)
+        self.assertEqual(self.request_booking(self.learners[1], '10:30').status_code, 201)
+
+
+@skipUnless(connection.vendor == 'postgresql', "Row locks and the exclusion constraint need Postgres")
+class ConcurrentBookingTests(TransactionTestCase):
+    def test_only_one_concurrent_accept_wins(self):
+        mentor = make_user('mentor', 'mentor')
+        skill = Skill.objects.create(profile=mentor.profile, name='React', price=20)
+        bookings = [
+            SessionBooking.objects.create(
+                mentor=mentor.profile, learner=make_user(f'learner{i}'), skill=skill,
+                session_date=date(2030, 1, 7), session_time=time(10, i),
+            )
+            for i in range(20)
+        ]
+        barrier = threading.Barrier(len(bookings))
+
+        def accept(booking_id):
+            try:
+                client = APIClient()
+                client.force_authenticate(user=CustomUser.objects.get(pk=mentor.pk))
+                barrier.wait()
+                return client.patch(f'/api/bookings/{booking_id}/', {'status': 'accepted'}).status_code
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=len(bookings)) as pool:
+            codes = list(pool.map(accept, [booking.id for booking in bookings]))
+
+        self.assertEqual(codes.count(200), 1)
+        self.assertEqual(codes.count(400), len(bookings) - 1)
+        self.assertEqual(SessionBooking.objects.filter(status='accepted').count(), 1)
+
+    def test_lock_waiters_see_the_booking_committed_before_them(self):
+        mentor = make_user('mentor', 'mentor')
+        skill = Skill.objects.create(profile=mentor.profile, name='React', price=20)
+        learner = make_user('learner')
+        booked = threading.Event()
+        committing = threading.Event()
+
+        def book_first():
+            try:
+                with transaction.atomic():
+                    check_slot(mentor.profile.pk, date(2030, 1, 7), time(10), 60, lock=True, require_window=False)
+                    SessionBooking.objects.create(
+                        mentor=mentor.profile, learner=learner, skill=skill,
+                        session_date=date(2030, 1, 7), session_time=time(10), status='accepted',
+                    )
+                    booked.set()
+                    committing.wait(10)
+            finally:
+                connection.close()
+
+        def check_second():
+            try:
+                booked.wait(10)
+                with transaction.atomic():
+                    check_slot(mentor.profile.pk, date(2030, 1, 7), time(10, 30), 60, lock=True, require_window=False)
+                return 'free'
+            except ValidationError:
+                return 'booked'
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            first = pool.submit(book_first)
+            second = pool.submit(check_second)
+            booked.wait(10)
+            time_module.sleep(0.5)  # the second check is now waiting for the mentor lock
+            committing.set()
+            first.result()
+            self.assertEqual(second.result(), 'booked')
+
+    def test_exclusion_constraint_blocks_direct_writes(self):
+        mentor = make_user('mentor', 'mentor')
+        skill = Skill.objects.create(profile=mentor.profile, name='React', price=20)
+        learner = make_user('learner')
+        SessionBooking.objects.create(
+            mentor=mentor.profile, learner=learner, skill=skill,
+            session_date=date(2030, 1, 7), session_time=time(10), status='accepted',
+        )
+        with self.assertRaises(IntegrityError):
+            SessionBooking.objects.create(
+                mentor=mentor.profile, learner=learner, skill=skill,
+                session_date=date(2030, 1, 7), session_time=time(10, 30), status='accepted',
+            )
@@ -2,8 +2,9 @@ from rest_framework.routers import DefaultRouter
 from .views import SessionBookingViewSet, ReviewViewSet
 
 router = DefaultRouter()
+# 'reviews' must be registered first, otherwise the booking detail route swallows it as a pk
+router.register(r'reviews', ReviewViewSet, basename='review')
 router.register(r'', SessionBookingViewSet, basename='booking')
-router.register(r'reviews', ReviewViewSet, basename='review')   
 
 urlpatterns = router.urls
 
@@ -1,80 +1,104 @@
+import logging
+
 from rest_framework import viewsets, status
+from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 # Import all models used in this file
-from .models import SessionBooking, Review
+from .models import SessionBooking, Review, BLOCKING_STATUSES
+from .scheduling import check_slot, is_overlap_violation
+from .stats import mentor_stats
 # Import models from other apps
 from profiles.models import UserProfile, CustomUser
+from profiles.permissions import IsMentor, request_profile_id, request_role
+from config.dates import query_date
+from config.serialization import ValuesListMixin
 # Import all serializers used in this file
-from .serializers import ReviewSerializer, SessionBookingSerializer
+from .serializers import ReviewSerializer, SessionBookingSerializer, session_booking_rows
 from django.shortcuts import get_object_or_404
+from django.db import IntegrityError, transaction
 # Import Django's ValidationError and DRF's ValidationError
 from django.core.exceptions import ValidationError as DjangoValidationError
 from rest_framework.exceptions import ValidationError as DRFValidationError # Use DRF's ValidationError for API responses
 
+logger = logging.getLogger(__name__)
+
 
-class SessionBookingViewSet(viewsets.ModelViewSet):
+class SessionBookingViewSet(ValuesListMixin, viewsets.ModelViewSet):
     serializer_class = SessionBookingSerializer
     permission_classes = [IsAuthenticated]
+    # list() reads .values() rows (session_booking_rows); the other actions use the serializer
+    values_serializer = session_booking_rows
 
     def get_queryset(self):
-        # Ensure the user has a profile before attempting to filter by role
-        if not hasattr(self.request.user, 'profile'):
-            return SessionBooking.objects.none()
+        # Role and profile id come from the token claims (falling back to the profile)
+        role = request_role(self.request)
+
+        # The serializer reads learner.username, mentor.user.username and skill.name per row
+        bookings = SessionBooking.objects.select_related('learner', 'mentor__user', 'skill')
 
         # If the user is a mentor, they see sessions where they are the mentor
-        if self.request.user.profile.role == 'mentor':
+        if role == 'mentor':
             # Assuming SessionBooking has a 'mentor' ForeignKey to UserProfile
-            return SessionBooking.objects.filter(mentor=self.request.user.profile)
+            return bookings.filter(mentor_id=request_profile_id(self.request))
         # If the user is a learner, they see sessions where they are the learner
-        elif self.request.user.profile.role == 'learner':
+        elif role == 'learner':
             # Assuming SessionBooking has a 'learner' ForeignKey to CustomUser
-            return SessionBooking.objects.filter(learner=self.request.user)
+            return bookings.filter(learner=self.request.user)
         # For any other role or if no role is defined, return an empty queryset
         return SessionBooking.objects.none()
 
     def perform_create(self, serializer):
         user = self.request.user
+        role = request_role(self.request)
         # Ensure user has a profile before checking role
-        if not hasattr(user, 'profile'):
+        if role is None:
             raise DRFValidationError("User profile not found.")
 
         # Mentors cannot book sessions (they are the ones being booked)
-        if user.profile.role == 'mentor':
+        if role == 'mentor':
             raise DRFValidationError("Mentors cannot book sessions.")
 
-        # Ensure the learner field is set to the current user
-        session = serializer.save(learner=user)
-
+        data = serializer.validated_data
+        duration = data.get('duration', SessionBooking._meta.get_field('duration').default)
         try:
-            # Temporarily disable validation to debug the issue
-            # session.full_clean()
-            # session.save()
-            pass
+            # Check the slot and insert under a row lock on the mentor, so a booking
+            # confirmed concurrently for the same mentor cannot slip in between
+            with transaction.atomic():
+                check_slot(data['skill'].profile_id, data['session_date'], data['session_time'], duration, lock=True)
+                # Ensure the learner field is set to the current user; new requests always start as pending
+                serializer.save(learner=user, status='pending')
         except DjangoValidationError as e:
             # Convert Django's ValidationError to DRF's ValidationError for proper API response
             raise DRFValidationError(e.messages)
-        except Exception as e:
-            # Catch any other unexpected errors during creation
-            raise DRFValidationError(f"Error creating session: {str(e)}")
+
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated, IsMentor])
+    def stats(self, request):
+        # Dashboard totals for the mentor's own sessions; 'from'/'to' are widened to whole weeks
+        from_day, to_day = query_date(request.query_params, 'from'), query_date(request.query_params, 'to')
+        if from_day and to_day and to_day < from_day:
+            raise DRFValidationError({'to': "Must not be before 'from'."})
+        return Response(mentor_stats(request_profile_id(request), from_day, to_day))
 
     def perform_update(self, serializer):
         user = self.request.user
-        print(f"Update request from user: {user.username}, role: {user.profile.role}")
-        print(f"Updating booking: {serializer.instance.id}")
-        print(f"New data: {serializer.validated_data}")
+        role = request_role(self.request)
+        logger.debug(
+            "booking update requested booking_id=%s user_id=%s role=%s data=%s",
+            serializer.instance.pk, user.pk, role, serializer.validated_data,
+        )
         
         # Ensure user has a profile
-        if not hasattr(user, 'profile'):
+        if role is None:
             raise DRFValidationError("User profile not found.")
         
         # Only mentors can update booking status
-        if user.profile.role != 'mentor':
+        if role != 'mentor':
             raise DRFValidationError("Only mentors can update booking status.")
         
         # Ensure the mentor can only update their own bookings
         booking = serializer.instance
-        if booking.mentor != user.profile:
+        if booking.mentor_id != request_profile_id(self.request):
             raise DRFValidationError("You can only update your own booking requests.")
         
         # Only allow status updates
@@ -83,8 +107,25 @@ class SessionBookingViewSet(viewsets.ModelViewSet):
             if field not in allowed_fields:
                 raise DRFValidationError(f"Cannot update field: {field}")
         
-        print(f"Saving booking with status: {serializer.validated_data.get('status')}")
-        serializer.save()
+        new_status = serializer.validated_data.get('status')
+        logger.debug("booking status change booking_id=%s status=%s new_status=%s", booking.pk, booking.status, new_status)
+        try:
+            with transaction.atomic():
+                # Confirming a booking claims the slot: re-check overlaps under the mentor lock.
+                # The mentor may accept outside their published availability.
+                if new_status in BLOCKING_STATUSES and booking.status not in BLOCKING_STATUSES:
+                    check_slot(
+                        booking.mentor_id, booking.session_date, booking.session_time, booking.duration,
+                        exclude_pk=booking.pk, lock=True, require_window=False,
+                    )
+                serializer.save()
+        except DjangoValidationError as e:
+            raise DRFValidationError(e.messages)
+        except IntegrityError as e:
+            # Backstop from the Postgres exclusion constraint
+            if is_overlap_violation(e):
+                raise DRFValidationError("This mentor is already booked at that time.")
+            raise
 
 
 class ReviewViewSet(viewsets.ModelViewSet):
@@ -93,16 +134,17 @@ class ReviewViewSet(viewsets.ModelViewSet):
     http_method_names = ['get', 'post', 'delete'] # Limit allowed methods
 
     def get_queryset(self):
-        # Ensure user has a profile before attempting to filter by role
-        if not hasattr(self.request.user, 'profile'):
-            return Review.objects.none()
+        role = request_role(self.request)
+
+        # The serializer reads student.username and mentor_profile.user.username per row
+        reviews = Review.objects.select_related('student', 'mentor_profile__user')
 
         # If current user is a mentor, show reviews received by them
-        if self.request.user.profile.role == 'mentor':
-            return Review.objects.filter(mentor_profile__user=self.request.user)
+        if role == 'mentor':
+            return reviews.filter(mentor_profile_id=request_profile_id(self.request))
         # If current user is a learner, show reviews they have given
-        elif self.request.user.profile.role == 'learner':
-            return Review.objects.filter(student=self.request.user)
+        elif role == 'learner':
+            return reviews.filter(student=self.request.user)
         return Review.objects.none() # Default for other roles or no profile
 
     def perform_create(self, serializer):
@@ -2,15 +2,57 @@
 ASGI config for config project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+HTTP requests go to Django; WebSocket connections go to the notifications
+push endpoint.
+
+Django runs each HTTP request's sync code in a thread of its own. At most
+SERVER['THREADS'] requests are let in at once per process, and later ones
+wait their turn here. This bounds the worker's threads and its database
+connections, which should match SKILLFORGE_DB_POOL_SIZE when pooling is on.
+A request gives its slot back as soon as its response starts, so slow
+clients and streamed bodies (reports.exports) do not hold it while they are
+sent. Serve it with gunicorn.conf.py (uvicorn workers).
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
 
+import asyncio
 import os
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported after Django is set up, since it pulls in models
+from notifications.consumers import notifications_application  # noqa: E402
+
+http_slots = asyncio.Semaphore(settings.SERVER['THREADS'])
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'websocket':
+        return await notifications_application(scope, receive, send)
+    if scope['type'] == 'http':
+        await http_slots.acquire()
+        held = True
+
+        def release():
+            nonlocal held
+            if held:
+                held = False
+                http_slots.release()
+
+        async def send_released(message):
+            if message['type'] == 'http.response.start':
+                release()
+            await send(message)
+
+        try:
+            return await django_application(scope, receive, send_released)
+        finally:
+            release()
+    return await django_application(scope, receive, send)
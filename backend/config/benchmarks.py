@@ -0,0 +1,333 @@
+"""
+API benchmark suite behind `manage.py benchmark_api`. A deterministic
+marketplace is seeded with seed_marketplace, then two kinds of benchmark run
+against it:
+- serializer micro-benchmarks, each timing the fetch and serialization of
+  SERIALIZER_ROWS rows;
+- end-to-end requests through the Django test client, with real JWT
+  authentication.
+
+Each benchmark reports p50/p95/p99 latency, throughput and the most queries
+one run issued. A result set can be saved as a JSON baseline, and later runs
+compared against it to catch regressions.
+
+`manage.py benchmark_connections` uses run_connection_benchmarks() to time the
+same request under each way of handling database connections:
+- reconnecting on every request;
+- persistent connections (CONN_MAX_AGE);
+- psycopg's pool.
+Requests go through config.asgi.application, the uvicorn workers' entry point,
+or WSGIHandler for gthread workers, so connections are opened and closed
+exactly as in production, which the test client skips. Each result also
+counts the connections opened, which shows whether they were reused.
+"""
+import asyncio
+import importlib.util
+import io
+import json
+import math
+import statistics
+import time
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management import call_command
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.db.models import Count
+from django.test import Client, RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from bookings.models import SessionBooking
+from bookings.serializers import SessionBookingSerializer, session_booking_rows
+from messages.models import Message
+from profiles.views import CustomTokenObtainPairSerializer
+from skills.models import Skill
+from skills.recommendations import rebuild_neighbours
+from skills.serializers import PublicSkillSerializer, public_skill_rows
+from .testing import seed_marketplace
+
+# seed_marketplace() arguments of the default dataset
+DATASET = {
+    'mentors': 50, 'learners': 500, 'skills_per_mentor': 10, 'bookings': 20000,
+    'reviews': 2000, 'messages': 20000, 'seed': 0,
+}
+USERNAME_PREFIX = 'bench-'
+# Rows handed to each serializer micro-benchmark
+SERIALIZER_ROWS = 200
+# A p95 counts as a regression only past the tolerance and this absolute margin, so sub-ms noise is ignored
+NOISE_FLOOR_MS = 0.5
+
+
+class Endpoint:
+    def __init__(self, name, path, user=None, params=None):
+        self.name = name
+        self.path = path            # may reference {skill} and {partner}
+        self.user = user            # None (anonymous), 'learner' or 'mentor'
+        self.params = params or {}
+
+
+ENDPOINTS = [
+    Endpoint('skills.public', '/api/skills/public/'),
+    Endpoint('skills.public.best_match', '/api/skills/public/', params={'ordering': 'best_match', 'page_size': 24}),
+    Endpoint('skills.public.compact', '/api/skills/public/', params={
+        'fields': 'id,title,price,rating,sessions,tags', 'compact': 1, 'page_size': 24,
+    }),
+    Endpoint('skills.search', '/api/skills/search/', params={'q': 'course'}),
+    Endpoint('skills.facets', '/api/skills/facets/'),
+    Endpoint('skills.slots', '/api/skills/{skill}/slots/', params={'from': '2030-01-07', 'to': '2030-01-20'}),
+    Endpoint('skills.recommended', '/api/skills/recommended/', user='learner'),
+    Endpoint('bookings.learner', '/api/bookings/', user='learner'),
+    Endpoint('bookings.mentor', '/api/bookings/', user='mentor'),
+    Endpoint('bookings.stats', '/api/bookings/stats/', user='mentor', params={'from': '2030-01-01', 'to': '2030-12-31'}),
+    Endpoint('reviews.mentor', '/api/bookings/reviews/', user='mentor'),
+    Endpoint('messages.conversations', '/api/messages/conversations/', user='learner'),
+    Endpoint('messages.thread', '/api/messages/conversations/{partner}/', user='learner'),
+    Endpoint('profile', '/api/profile/', user='learner'),
+]
+
+# (name, serialize(rows), rows loader); each run times the fetch and the serialization.
+# The .values variants are the fast path the list endpoints use (config.serialization).
+SERIALIZERS = [
+    ('serializer.PublicSkill', lambda rows: PublicSkillSerializer(rows, many=True).data,
+     lambda: Skill.objects.filter(active=True).select_related('profile__user').order_by('-id')[:SERIALIZER_ROWS]),
+    ('serializer.PublicSkill.values', public_skill_rows.to_representation,
+     lambda: public_skill_rows.values(Skill.objects.filter(active=True).order_by('-id'))[:SERIALIZER_ROWS]),
+    ('serializer.SessionBooking', lambda rows: SessionBookingSerializer(rows, many=True).data,
+     lambda: SessionBooking.objects.select_related('learner', 'mentor__user', 'skill').order_by('-id')[:SERIALIZER_ROWS]),
+    ('serializer.SessionBooking.values', session_booking_rows.to_representation,
+     lambda: session_booking_rows.values(SessionBooking.objects.order_by('-id'))[:SERIALIZER_ROWS]),
+]
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def summarize(timings, queries, items=1):
+    """Latency summary in ms; per_second counts requests, or rows for serializers."""
+    ms = [timing * 1000 for timing in timings]
+    mean = statistics.fmean(timings)
+    return {
+        'runs': len(ms),
+        'p50_ms': round(percentile(ms, 50), 3),
+        'p95_ms': round(percentile(ms, 95), 3),
+        'p99_ms': round(percentile(ms, 99), 3),
+        'mean_ms': round(mean * 1000, 3),
+        'per_second': round(items / mean, 1) if mean else None,
+        'queries': queries,
+    }
+
+
+def prepare_dataset(**dataset):
+    """Seeds the benchmark marketplace and fills what seed_marketplace skips; returns the fixtures."""
+    mentors, learners = seed_marketplace(username_prefix=USERNAME_PREFIX, **{**DATASET, **dataset})
+    for command in ('rebuild_counters', 'rebuild_booking_stats'):
+        call_command(command, stdout=io.StringIO())
+    rebuild_neighbours()
+
+    # The busiest learner, so the per-user endpoints return full pages
+    busiest = (
+        SessionBooking.objects.filter(learner__in=learners).values('learner_id')
+        .annotate(bookings=Count('id')).order_by('-bookings', 'learner_id').values_list('learner_id', flat=True).first()
+    )
+    learner = next((user for user in learners if user.pk == busiest), learners[0])
+    mentor = mentors[0]
+    partner = Message.objects.filter(sender=learner).values_list('receiver_id', flat=True).first() or mentor.pk
+    skill = Skill.objects.filter(profile__user=mentor).values_list('id', flat=True).first()
+    return {'learner': learner, 'mentor': mentor, 'skill': skill, 'partner': partner}
+
+
+def _client_for(user):
+    client = Client()
+    if user is not None:
+        token = CustomTokenObtainPairSerializer.get_token(user).access_token
+        client.defaults['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+    return client
+
+
+def time_endpoint(endpoint, fixtures, runs, warmup):
+    client = _client_for(fixtures[endpoint.user] if endpoint.user else None)
+    path = endpoint.path.format(**fixtures)
+    timings, queries = [], 0
+    for run in range(warmup + runs):
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = client.get(path, endpoint.params)
+            elapsed = time.perf_counter() - started
+        if response.status_code != 200:
+            raise RuntimeError(f"{endpoint.name}: GET {path} returned {response.status_code}")
+        if run >= warmup:
+            timings.append(elapsed)
+            queries = max(queries, len(captured))
+    return summarize(timings, queries)
+
+
+def time_serializer(serialize, rows, runs, warmup):
+    timings, queries, count = [], 0, 0
+    for run in range(warmup + runs):
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            count = len(serialize(rows()))
+            elapsed = time.perf_counter() - started
+        if run >= warmup:
+            timings.append(elapsed)
+            queries = max(queries, len(captured))
+    return summarize(timings, queries, items=count)
+
+
+def run_benchmarks(fixtures, runs=50, warmup=5, only=None):
+    """{name: summary} for every benchmark whose name starts with one of `only` (all when empty)."""
+    def selected(name):
+        return not only or any(name.startswith(prefix) for prefix in only)
+
+    results = {}
+    for name, serialize, rows in SERIALIZERS:
+        if selected(name):
+            results[name] = time_serializer(serialize, rows, runs, warmup)
+    for endpoint in ENDPOINTS:
+        if selected(endpoint.name):
+            results[endpoint.name] = time_endpoint(endpoint, fixtures, runs, warmup)
+    return results
+
+
+def save_baseline(path, results, dataset):
+    with open(path, 'w') as f:
+        json.dump({'dataset': dataset, 'vendor': connection.vendor, 'results': results}, f, indent=2, sort_keys=True)
+
+
+def load_baseline(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(results, baseline, tolerance=0.2):
+    """Regression messages for benchmarks whose p95 or query count grew past the baseline's."""
+    regressions = []
+    for name, result in results.items():
+        base = baseline['results'].get(name)
+        if base is None:
+            continue
+        limit = base['p95_ms'] * (1 + tolerance) + NOISE_FLOOR_MS
+        if result['p95_ms'] > limit:
+            regressions.append(f"{name}: p95 {result['p95_ms']:.2f} ms, baseline {base['p95_ms']:.2f} ms")
+        if result['queries'] > base['queries']:
+            regressions.append(f"{name}: {result['queries']} queries, baseline {base['queries']}")
+    return regressions
+
+
+def connection_modes():
+    """{mode: overrides of the default database's settings}; 'pool' needs PostgreSQL and psycopg_pool."""
+    options = {key: value for key, value in connection.settings_dict.get('OPTIONS', {}).items() if key != 'pool'}
+    modes = {
+        'reconnect': {'CONN_MAX_AGE': 0, 'OPTIONS': options},
+        'persistent': {'CONN_MAX_AGE': 600, 'OPTIONS': options},
+    }
+    if connection.vendor == 'postgresql' and importlib.util.find_spec('psycopg_pool'):
+        pool = connection.settings_dict.get('OPTIONS', {}).get('pool') or {'min_size': 1, 'max_size': 4}
+        modes['pool'] = {'CONN_MAX_AGE': 0, 'OPTIONS': {**options, 'pool': pool}}
+    return modes
+
+
+def _drop_connection():
+    connection.close()
+    if hasattr(connection, 'close_pool'):
+        connection.close_pool()
+
+
+def time_wsgi_requests(path, runs, warmup):
+    handler = WSGIHandler()
+    factory = RequestFactory()
+    statuses, timings = [], []
+
+    def start_response(status, headers, exc_info=None):
+        statuses.append(status)
+
+    for run in range(warmup + runs):
+        environ = factory.get(path).environ
+        started = time.perf_counter()
+        response = handler(environ, start_response)
+        b''.join(response)
+        # Sends request_finished, where connections past CONN_MAX_AGE are closed
+        response.close()
+        elapsed = time.perf_counter() - started
+        if not statuses[-1].startswith('200'):
+            raise RuntimeError(f"GET {path} returned {statuses[-1]}")
+        if run >= warmup:
+            timings.append(elapsed)
+    return timings
+
+
+def time_asgi_requests(path, runs, warmup):
+    from config.asgi import application
+
+    path, _, query = path.partition('?')
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+        'path': path, 'raw_path': path.encode(), 'query_string': query.encode(), 'root_path': '',
+        'headers': [(b'host', b'testserver')], 'client': ('127.0.0.1', 50000), 'server': ('testserver', 80),
+    }
+
+    async def request():
+        messages = []
+        body = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+        finished = asyncio.Event()
+
+        async def receive():
+            if body:
+                return body.pop()
+            # Django listens for a disconnect until the response is sent
+            await finished.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            messages.append(message)
+            if message['type'] == 'http.response.body' and not message.get('more_body'):
+                finished.set()
+
+        await application(dict(scope), receive, send)
+        return messages[0]['status']
+
+    async def run_all():
+        timings = []
+        for run in range(warmup + runs):
+            started = time.perf_counter()
+            status = await request()
+            elapsed = time.perf_counter() - started
+            if status != 200:
+                raise RuntimeError(f"GET {path} returned {status}")
+            if run >= warmup:
+                timings.append(elapsed)
+        return timings
+
+    return asyncio.run(run_all())
+
+
+def run_connection_benchmarks(path, runs=200, warmup=10, interface='asgi'):
+    """
+    {mode: summary} for GET `path` under each of connection_modes(), through
+    the 'asgi' or 'wsgi' handler; the settings are restored afterwards.
+    """
+    time_requests = time_asgi_requests if interface == 'asgi' else time_wsgi_requests
+    original = dict(connection.settings_dict)
+    results = {}
+    connects = []
+
+    def count_connect(**kwargs):
+        connects.append(kwargs['connection'].alias)
+
+    connection_created.connect(count_connect)
+    try:
+        for mode, overrides in connection_modes().items():
+            _drop_connection()
+            connection.settings_dict.update(overrides)
+            connects.clear()
+            timings = time_requests(path, runs, warmup)
+            results[mode] = {**summarize(timings, 0), 'connections': connects.count(connection.alias)}
+    finally:
+        connection_created.disconnect(count_connect)
+        _drop_connection()
+        connection.settings_dict.clear()
+        connection.settings_dict.update(original)
+    return results
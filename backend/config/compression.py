@@ -0,0 +1,93 @@
+"""
+Response compression. CompressionMiddleware compresses response bodies of at
+least MIN_BYTES with a text-like content type (JSON, text) for clients that
+accept it. It uses brotli when the `brotli` package is installed and the
+client sends `br`, and gzip otherwise.
+
+- It stands in for Django's GZipMiddleware, which compresses anything over
+  200 bytes and knows only gzip.
+- gzip output carries the same random filename padding GZipMiddleware uses
+  against BREACH-style length attacks.
+- Streaming responses, bodies that are already encoded, and bodies that
+  would not get smaller are left alone.
+- A strong ETag is made weak, since the compressed bytes differ from the
+  uncompressed ones.
+
+Settings come from settings.COMPRESSION.
+"""
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:  # optional; gzip is used without it
+    brotli = None
+
+DEFAULTS = {
+    # Smaller bodies are sent as they are: compression would save little and cost a round of CPU
+    'MIN_BYTES': 1024,
+    'BROTLI_QUALITY': 5,
+    'CONTENT_TYPES': ('application/json', 'text/'),
+}
+# As in GZipMiddleware
+GZIP_MAX_RANDOM_BYTES = 100
+
+
+def compression_settings():
+    return {**DEFAULTS, **getattr(settings, 'COMPRESSION', {})}
+
+
+def accepted_encodings(header):
+    """The codings an Accept-Encoding header allows (those not sent with q=0)."""
+    accepted = set()
+    for item in header.split(','):
+        coding, *params = (part.strip() for part in item.split(';'))
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding and quality > 0:
+            accepted.add(coding.lower())
+    return accepted
+
+
+class CompressionMiddleware:
+    def __init__(self, get_response):
+        config = compression_settings()
+        self.get_response = get_response
+        self.min_bytes = config['MIN_BYTES']
+        self.brotli_quality = config['BROTLI_QUALITY']
+        self.content_types = tuple(config['CONTENT_TYPES'])
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (
+            response.streaming or response.has_header('Content-Encoding')
+            or not response.get('Content-Type', '').startswith(self.content_types)
+            or len(response.content) < self.min_bytes
+        ):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        accepted = accepted_encodings(request.headers.get('Accept-Encoding', ''))
+        if brotli is not None and 'br' in accepted:
+            encoding, body = 'br', brotli.compress(response.content, quality=self.brotli_quality)
+        elif 'gzip' in accepted:
+            encoding, body = 'gzip', compress_string(response.content, max_random_bytes=GZIP_MAX_RANDOM_BYTES)
+        else:
+            return response
+        if len(body) >= len(response.content):
+            return response
+
+        response.content = body
+        response['Content-Length'] = str(len(body))
+        response['Content-Encoding'] = encoding
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
@@ -0,0 +1,35 @@
+"""Date helpers shared by the apps' views and aggregations."""
+from datetime import date, timedelta
+
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+
+# Dates a query may name. The margins leave room to widen a range to whole weeks
+# and to count default ranges from the given day without leaving date's range.
+EARLIEST_QUERY_DATE = date.min + timedelta(days=366)
+LATEST_QUERY_DATE = date.max - timedelta(days=366)
+
+
+def query_date(params, name, default=None):
+    """
+    The YYYY-MM-DD date in query parameter `name`, or `default` when it is
+    absent or empty. Malformed and impossible dates (2030-02-30) are a 400,
+    as are dates within a year of the ends of the calendar.
+    """
+    value = params.get(name)
+    if not value:
+        return default
+    try:
+        day = parse_date(value)
+    except ValueError:
+        day = None
+    if day is None:
+        raise ValidationError({name: "Use the YYYY-MM-DD format with a valid date."})
+    if not EARLIEST_QUERY_DATE <= day <= LATEST_QUERY_DATE:
+        raise ValidationError({name: f"Must be between {EARLIEST_QUERY_DATE} and {LATEST_QUERY_DATE}."})
+    return day
+
+
+def week_of(day):
+    """Monday of the week containing day."""
+    return day - timedelta(days=day.weekday())
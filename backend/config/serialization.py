@@ -0,0 +1,155 @@
+"""
+Read-only fast path for large list endpoints.
+
+ValuesSerializer compiles a DRF serializer's fields once into (output key, ORM
+lookup, converter) triples. It then turns `.values()` rows into the same dicts
+the serializer would produce, so no model instances are built and fields are
+not re-bound and resolved per row. Plain fields (strings, integers, JSON,
+primary keys) are copied as they are. Other fields go through the field's own
+to_representation(), so decimals, dates and datetimes are formatted exactly as
+before.
+
+ValuesListMixin serves a ListAPIView's list() through a ValuesSerializer,
+pagination included. Clients can trim the payload two ways:
+- `?fields=id,title` returns only those keys, and only their columns are
+  selected;
+- `?compact=1` sends the rows as lists under one shared header,
+  {"fields": [...], "rows": [[...], ...]}, instead of repeating every key
+  in every row.
+
+FastJSONRenderer encodes with orjson when it is
+installed, and otherwise falls back to DRF's JSONRenderer.
+"""
+from functools import cached_property
+
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+try:
+    import orjson
+except ImportError:  # optional; JSONRenderer's stdlib encoder is used without it
+    orjson = None
+
+# Fields whose to_representation() returns the stored value unchanged
+PASSTHROUGH_FIELDS = (
+    serializers.CharField, serializers.IntegerField, serializers.BooleanField,
+    serializers.ReadOnlyField, serializers.PrimaryKeyRelatedField,
+)
+FIELDS_PARAM = 'fields'
+COMPACT_PARAM = 'compact'
+
+
+class ValuesSerializer:
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+
+    @cached_property
+    def fields(self):
+        compiled = []
+        for name, field in self.serializer_class().fields.items():
+            if field.write_only:
+                continue
+            nested = isinstance(field, (serializers.BaseSerializer, serializers.SerializerMethodField, serializers.ManyRelatedField))
+            if field.source == '*' or nested or (
+                isinstance(field, serializers.RelatedField) and not isinstance(field, serializers.PrimaryKeyRelatedField)
+            ):
+                raise ImproperlyConfigured(f"{self.serializer_class.__name__}.{name} cannot be read from .values() rows.")
+            # values() already yields the primary key of a relation, which is what PrimaryKeyRelatedField outputs
+            passthrough = isinstance(field, PASSTHROUGH_FIELDS) or (
+                isinstance(field, serializers.JSONField) and not field.binary
+            )
+            compiled.append((name, field.source.replace('.', '__'), None if passthrough else field.to_representation))
+        return compiled
+
+    def select(self, names=None):
+        """The compiled fields listed in `names`, in declaration order; all of them when None."""
+        if names is None:
+            return self.fields
+        known = {name for name, _, _ in self.fields}
+        unknown = [name for name in names if name not in known]
+        if unknown:
+            raise ValidationError({FIELDS_PARAM: f"Unknown fields: {', '.join(unknown)}."})
+        return [field for field in self.fields if field[0] in names]
+
+    def values(self, queryset, *extra, fields=None):
+        """
+        The queryset as .values() rows holding every lookup `fields` (all
+        fields by default) read, plus `extra` columns.
+        """
+        fields = self.fields if fields is None else fields
+        return queryset.values(*dict.fromkeys([*(lookup for _, lookup, _ in fields), *extra]))
+
+    def to_representation(self, rows, fields=None, compact=False):
+        """A list of dicts, or with `compact` a {"fields", "rows"} table of the same values."""
+        fields = self.fields if fields is None else fields
+        if compact:
+            return {
+                'fields': [name for name, _, _ in fields],
+                'rows': [
+                    [row[lookup] if convert is None or row[lookup] is None else convert(row[lookup])
+                     for _, lookup, convert in fields]
+                    for row in rows
+                ],
+            }
+        data = []
+        for row in rows:
+            item = {}
+            for name, lookup, convert in fields:
+                value = row[lookup]
+                item[name] = value if convert is None or value is None else convert(value)
+            data.append(item)
+        return data
+
+
+def requested_fields(params):
+    """The names in ?fields=, or None when the parameter is absent."""
+    if FIELDS_PARAM not in params:
+        return None
+    names = [name.strip() for name in params[FIELDS_PARAM].split(',') if name.strip()]
+    if not names:
+        raise ValidationError({FIELDS_PARAM: "List at least one field."})
+    return names
+
+
+class ValuesListMixin:
+    """
+    For read-only list() actions: rows are read with .values() and rendered
+    by `values_serializer`, honouring ?fields= and ?compact=. `values_extra`
+    names further columns the pagination ordering needs (cursor pagination
+    reads them from the rows), so they are fetched even when not requested.
+    """
+    values_serializer = None
+    values_extra = ()
+
+    def list(self, request, *args, **kwargs):
+        fields = self.values_serializer.select(requested_fields(request.query_params))
+        compact = request.query_params.get(COMPACT_PARAM, '').lower() in ('1', 'true', 'yes')
+        rows = self.values_serializer.values(self.filter_queryset(self.get_queryset()), *self.values_extra, fields=fields)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(self.values_serializer.to_representation(page, fields, compact))
+        return Response(self.values_serializer.to_representation(rows, fields, compact))
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer with the same compact output, encoded by orjson when available."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None or data is None or self.ensure_ascii or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            # Datetimes go through the DRF encoder too, which trims them to milliseconds
+            ret = orjson.dumps(
+                data, default=self.encoder_class().default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Same escaping as JSONRenderer, for JSON embedded in <script> tags
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
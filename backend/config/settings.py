@@ -10,22 +10,49 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 
-# Quick-start development settings - unsuitable for production
+def env_bool(name, default):
+    value = os.environ.get(name)
+    return default if value is None else value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def env_int(name, default):
+    value = os.environ.get(name)
+    return default if value is None or not value.strip() else int(value)
+
+
+def env_list(name, default=()):
+    value = os.environ.get(name)
+    return list(default) if value is None else [item.strip() for item in value.split(',') if item.strip()]
+
+
+# SKILLFORGE_ENV=production selects the production profile: DEBUG off (so
+# queries are no longer kept in memory), secret key and hosts read from the
+# environment, and database connections kept across requests. Every
+# SKILLFORGE_* variable below overrides the profile's default.
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
+SKILLFORGE_ENV = os.environ.get('SKILLFORGE_ENV', 'development')
+PRODUCTION = SKILLFORGE_ENV == 'production'
 
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'django-insecure-faqs37dl@2c#d8(ufxdpqjk_-9pf_xge6)npig%5&48qy_b1ii'
+SECRET_KEY = os.environ.get('SKILLFORGE_SECRET_KEY') or (
+    None if PRODUCTION else 'django-insecure-faqs37dl@2c#d8(ufxdpqjk_-9pf_xge6)npig%5&48qy_b1ii'
+)
+if SECRET_KEY is None:
+    raise ImproperlyConfigured("SKILLFORGE_SECRET_KEY must be set in production.")
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = env_bool('SKILLFORGE_DEBUG', not PRODUCTION)
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = env_list('SKILLFORGE_ALLOWED_HOSTS')
 
 
 # Application definition
@@ -37,6 +64,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework_simplejwt',
     'corsheaders',
@@ -44,10 +72,15 @@ INSTALLED_APPS = [
     'skills',
     'bookings',
     'messages.apps.MessagesConfig',
-    # 'notifications',
+    'notifications',
+    'reports',
 ]
 
 MIDDLEWARE = [
+    # Outermost, so its timings cover the whole stack
+    'reports.instrumentation.InstrumentationMiddleware',
+    # Inside the instrumentation, so response sizes are counted after compression
+    'config.compression.CompressionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -78,6 +111,18 @@ TEMPLATES = [
 WSGI_APPLICATION = 'config.wsgi.application'
 
 
+# Worker class, process and thread counts for gunicorn.conf.py. Under ASGI,
+# config/asgi.py lets at most THREADS HTTP requests per worker run at once, so
+# each worker holds at most THREADS database connections.
+SERVER = {
+    'WORKER_CLASS': os.environ.get('SKILLFORGE_WORKER_CLASS', 'uvicorn.workers.UvicornWorker'),
+    'WORKERS': env_int('SKILLFORGE_WORKERS', 2 * (os.cpu_count() or 1) + 1),
+    'THREADS': env_int('SKILLFORGE_THREADS', 8),
+}
+# gunicorn's own worker classes serve WSGI; the others (uvicorn's) serve config.asgi
+ASGI_SERVER = SERVER['WORKER_CLASS'] not in ('sync', 'gthread', 'gevent', 'eventlet', 'tornado')
+
+
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
@@ -86,14 +131,34 @@ WSGI_APPLICATION = 'config.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
-        'NAME': 'skillforge',
-        'USER': 'skilluser',
-        'PASSWORD': 'banned1234',
-        'HOST': 'localhost',
-        'PORT': '5432',
+        'NAME': os.environ.get('SKILLFORGE_DB_NAME', 'skillforge'),
+        'USER': os.environ.get('SKILLFORGE_DB_USER', 'skilluser'),
+        'PASSWORD': os.environ.get('SKILLFORGE_DB_PASSWORD', 'banned1234'),
+        'HOST': os.environ.get('SKILLFORGE_DB_HOST', 'localhost'),
+        'PORT': os.environ.get('SKILLFORGE_DB_PORT', '5432'),
+        # Seconds a connection stays open for later requests; 0 reconnects on every request.
+        # Not under ASGI, where each request runs in a new thread and would leave its
+        # connection behind unused (`manage.py benchmark_connections` shows this).
+        'CONN_MAX_AGE': env_int('SKILLFORGE_DB_CONN_MAX_AGE', 60 if PRODUCTION and not ASGI_SERVER else 0),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# SKILLFORGE_DB_POOL_SIZE > 0 switches to psycopg's connection pool (needs
+# psycopg[pool]) in place of persistent connections. Use it under ASGI, where
+# each request runs its sync code in a new thread and a per-thread persistent
+# connection is never reused. Keep the size at least SERVER['THREADS'].
+DB_POOL_SIZE = env_int('SKILLFORGE_DB_POOL_SIZE', 0)
+if DB_POOL_SIZE:
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {
+            'min_size': min(env_int('SKILLFORGE_DB_POOL_MIN_SIZE', 2), DB_POOL_SIZE),
+            'max_size': DB_POOL_SIZE,
+            # Seconds a request waits for a free connection before failing
+            'timeout': env_int('SKILLFORGE_DB_POOL_TIMEOUT', 10),
+        },
+    }
 
 
 # Password validation
@@ -139,10 +204,109 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
   'DEFAULT_AUTHENTICATION_CLASSES': (
-      'rest_framework_simplejwt.authentication.JWTAuthentication',
+      # simplejwt's JWTAuthentication plus a short-lived user/profile cache
+      'profiles.authentication.CachedJWTAuthentication',
+  ),
+  'DEFAULT_RENDERER_CLASSES': (
+      # JSONRenderer output, encoded with orjson when it is installed
+      'config.serialization.FastJSONRenderer',
+      'rest_framework.renderers.BrowsableAPIRenderer',
   ),
 }
 
-CORS_ALLOW_ALL_ORIGINS = True
+# Any origin in development; production lists the frontend's origins
+CORS_ALLOW_ALL_ORIGINS = env_bool('SKILLFORGE_CORS_ALLOW_ALL', not PRODUCTION)
+CORS_ALLOWED_ORIGINS = env_list('SKILLFORGE_CORS_ALLOWED_ORIGINS')
 
 AUTH_USER_MODEL = 'profiles.CustomUser'
+
+# Per-process cache by default. Several workers must share a Redis cache
+# (SKILLFORGE_CACHE_URL, e.g. redis://cache:6379/0; needs the redis package):
+# otherwise invalidated catalogue listings and facets, slot index generations
+# and revoked token versions are only seen by the worker that changed them.
+CACHE_URL = os.environ.get('SKILLFORGE_CACHE_URL', '')
+if CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+        },
+    }
+elif PRODUCTION and SERVER['WORKERS'] > 1:
+    raise ImproperlyConfigured("SKILLFORGE_CACHE_URL must be set in production with more than one worker.")
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'skillforge',
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        },
+    }
+
+# Real-time push over /ws/notifications/. LocalBroker only reaches connections
+# served by the same process. With SKILLFORGE_NOTIFICATIONS_URL (a Redis URL,
+# SKILLFORGE_CACHE_URL by default) every worker publishes to and listens on one
+# Redis pub/sub channel instead, so several workers need it in production.
+NOTIFICATIONS_URL = os.environ.get('SKILLFORGE_NOTIFICATIONS_URL', CACHE_URL)
+if NOTIFICATIONS_URL:
+    NOTIFICATIONS = {
+        'BROKER': 'notifications.brokers.TransportBroker',
+        'OPTIONS': {
+            'transport': 'notifications.brokers.RedisTransport',
+            'transport_options': {'url': NOTIFICATIONS_URL},
+        },
+    }
+elif PRODUCTION and SERVER['WORKERS'] > 1:
+    raise ImproperlyConfigured("SKILLFORGE_NOTIFICATIONS_URL must be set in production with more than one worker.")
+else:
+    NOTIFICATIONS = {
+        'BROKER': 'notifications.brokers.LocalBroker',
+        'OPTIONS': {},
+    }
+
+# /api/bookings/stats/ reads the incrementally maintained MentorWeeklyStats
+# rollup; False aggregates the raw booking rows instead (same result, cost
+# grows with the mentor's session count).
+BOOKING_STATS_ROLLUPS = True
+
+# Per-request latency, query, serializer and response-size metrics served on
+# /metrics (reports.instrumentation). PROFILE_SAMPLE_RATE > 0 runs that share of
+# requests under cProfile and keeps the profiles of those slower than PROFILE_SLOW_MS.
+# /metrics needs SKILLFORGE_METRICS_TOKEN as "Authorization: Bearer <token>" when it
+# is set, or a client address in METRICS_ALLOWED_IPS otherwise. Behind a reverse
+# proxy on the same host every request comes from 127.0.0.1, so production
+# allows no addresses by default and /metrics stays closed until a token is set.
+INSTRUMENTATION = {
+    'ENABLED': True,
+    'PROFILE_SAMPLE_RATE': 0.0,
+    'PROFILE_SLOW_MS': 500,
+    'PROFILE_DIR': BASE_DIR / 'request-profiles',
+    'METRICS_TOKEN': os.environ.get('SKILLFORGE_METRICS_TOKEN', ''),
+    'METRICS_ALLOWED_IPS': env_list('SKILLFORGE_METRICS_ALLOWED_IPS', [] if PRODUCTION else ['127.0.0.1', '::1']),
+}
+
+# JSON and text responses of at least MIN_BYTES are compressed (config.compression):
+# brotli when the brotli package is installed and the client accepts it, gzip otherwise.
+COMPRESSION = {
+    'MIN_BYTES': 1024,
+    'BROTLI_QUALITY': 5,
+}
+
+# key=value log lines on stderr. App loggers default to INFO; DEBUG enables the
+# booking request traces, which are skipped without formatting otherwise.
+LOG_LEVEL = os.environ.get('SKILLFORGE_LOG_LEVEL', 'INFO')
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'keyvalue': {'format': 'time=%(asctime)s level=%(levelname)s logger=%(name)s %(message)s'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': 'keyvalue'},
+    },
+    'root': {'handlers': ['console'], 'level': 'WARNING'},
+    'loggers': {
+        app: {'level': LOG_LEVEL}
+        for app in ('bookings', 'messages', 'notifications', 'profiles', 'reports', 'skills')
+    },
+}
@@ -0,0 +1,143 @@
+"""
+Shared test helpers: a bulk seeder for realistic datasets and a query-budget
+mixin that fails a test when an endpoint's query count grows with its rows.
+"""
+import random
+from datetime import date, time, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from bookings.models import Review, SessionBooking, session_bounds
+from messages.models import Message
+from profiles.models import CustomUser, UserProfile
+from skills.models import Availability, Skill
+from skills.ranking import skill_rank_score
+from skills.search import refresh_search_vectors
+from skills.tags import sync_skill_tags
+
+CATEGORIES = ['Frontend Development', 'Backend Development', 'Data Science', 'Design', 'DevOps']
+LEVELS = ['Beginner', 'Intermediate', 'Expert']
+TAGS = ['Hooks', 'Context API', 'Django', 'REST', 'Pandas', 'Figma', 'Docker', 'SQL', 'Testing', 'CSS']
+DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+STATUSES = [status for status, _ in SessionBooking.STATUS_CHOICES]
+
+
+def seed_marketplace(mentors=10, learners=50, skills_per_mentor=5, bookings=1000,
+                     reviews=200, messages=1000, seed=0, username_prefix=''):
+    """
+    Bulk-creates a deterministic marketplace (users, profiles, skills, weekly
+    availability, bookings, reviews and messages) and returns the created
+    mentor and learner users. Signal handlers are bypassed, so denormalized
+    counters are left at their defaults; search vectors and tag links are
+    filled in directly.
+    """
+    rng = random.Random(seed)
+    password = make_password('pass12345')
+
+    users = CustomUser.objects.bulk_create(
+        [CustomUser(username=f'{username_prefix}mentor{i}', password=password) for i in range(mentors)]
+        + [CustomUser(username=f'{username_prefix}learner{i}', password=password) for i in range(learners)]
+    )
+    profiles = UserProfile.objects.bulk_create(
+        [UserProfile(user=user, role='mentor' if i < mentors else 'learner') for i, user in enumerate(users)]
+    )
+    mentor_users, learner_users = users[:mentors], users[mentors:]
+    mentor_profiles = profiles[:mentors]
+
+    skills = [
+        Skill(
+            profile=profile,
+            name=f'{rng.choice(TAGS)} course {i}',
+            price=rng.randint(5, 150),
+            category=rng.choice(CATEGORIES),
+            level=rng.choice(LEVELS),
+            description=f'Session plan {i} by {profile.user.username}',
+            tags=rng.sample(TAGS, 3),
+        )
+        for profile in mentor_profiles for i in range(skills_per_mentor)
+    ]
+    for skill in skills:
+        # bulk_create skips save(), which normally derives the rank score
+        skill.rank_score = skill_rank_score(skill)
+    skills = Skill.objects.bulk_create(skills)
+    refresh_search_vectors(Skill.objects.all())
+    sync_skill_tags({skill.pk: skill.tags for skill in skills}, created=True)
+
+    Availability.objects.bulk_create([
+        Availability(mentor=profile, day_of_week=day, start_time=time(9, 0), end_time=time(17, 0))
+        for profile in mentor_profiles for day in DAYS[:5]
+    ])
+
+    start = date(2030, 1, 7)
+    booking_rows = []
+    for i in range(bookings):
+        skill = rng.choice(skills)
+        booking = SessionBooking(
+            mentor=skill.profile, learner=rng.choice(learner_users), skill=skill,
+            session_date=start + timedelta(days=i // 8), session_time=time(9 + i % 8, 0),
+            status=rng.choice(STATUSES),
+        )
+        # bulk_create skips save(), which normally derives the session interval
+        booking.session_start, booking.session_end = session_bounds(booking.session_date, booking.session_time, booking.duration)
+        booking_rows.append(booking)
+    SessionBooking.objects.bulk_create(booking_rows, batch_size=500)
+
+    review_pairs = set()
+    while len(review_pairs) < min(reviews, mentors * learners):
+        review_pairs.add((rng.randrange(mentors), rng.randrange(learners)))
+    Review.objects.bulk_create([
+        Review(mentor_profile=mentor_profiles[m], student=learner_users[l], rating=rng.randint(1, 5), comment='Great session')
+        for m, l in sorted(review_pairs)
+    ], batch_size=500)
+
+    Message.objects.bulk_create([
+        Message(
+            sender=rng.choice(learner_users), receiver=rng.choice(mentor_users),
+            content=f'Message {i}', is_read=rng.random() < 0.5,
+        )
+        for i in range(messages)
+    ], batch_size=500)
+
+    return mentor_users, learner_users
+
+
+class QueryBudgetMixin:
+    """
+    TestCase mixin for asserting that an endpoint stays within a fixed number
+    of queries. Use it against a dataset seeded with seed_marketplace so a
+    per-row query (N+1) blows the budget by hundreds instead of by one.
+    """
+
+    def assertMaxQueries(self, budget):
+        return _MaxQueriesContext(self, budget)
+
+    def assertEndpointBudget(self, path, budget, user=None, min_rows=1, **params):
+        client = APIClient()
+        if user is not None:
+            # Re-fetch so cached relations from earlier requests cannot hide queries
+            client.force_authenticate(user=type(user).objects.get(pk=user.pk))
+        with self.assertMaxQueries(budget):
+            response = client.get(path, params)
+        self.assertEqual(response.status_code, 200, response.content[:500])
+        rows = response.data['results'] if isinstance(response.data, dict) and 'results' in response.data else response.data
+        self.assertGreaterEqual(len(rows), min_rows, f"{path} returned too few rows to measure")
+        return response
+
+
+class _MaxQueriesContext(CaptureQueriesContext):
+    def __init__(self, test_case, budget):
+        self.test_case = test_case
+        self.budget = budget
+        super().__init__(connection)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        super().__exit__(exc_type, exc_value, traceback)
+        if exc_type is not None:
+            return
+        executed = len(self)
+        if executed > self.budget:
+            queries = '\n'.join(f"{i}. {query['sql'][:300]}" for i, query in enumerate(self.captured_queries[:20], start=1))
+            self.test_case.fail(f"{executed} queries executed, budget is {self.budget}. First queries:\n{queries}")
@@ -17,6 +17,7 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from reports.instrumentation import metrics_view
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
@@ -29,8 +30,11 @@ urlpatterns = [
     path('api/skills/', include('skills.urls')),
     path('api/bookings/', include('bookings.urls')),
     path('api/messages/', include('messages.urls')),
+    path('api/reports/', include('reports.urls')),
     path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    # Prometheus scrape endpoint (see reports.instrumentation)
+    path('metrics', metrics_view, name='metrics'),
     # path('api/notifications/', include('notifications.urls')),
 
 ]
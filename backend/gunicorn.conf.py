@@ -0,0 +1,27 @@
+"""
+Gunicorn settings for production, read from the Django settings (and so from
+the SKILLFORGE_* environment variables). From backend/:
+
+    gunicorn config.asgi:application                          # uvicorn workers (ASGI)
+    SKILLFORGE_WORKER_CLASS=gthread gunicorn config.wsgi:application
+
+Each ASGI worker serves up to SERVER['THREADS'] requests at once (see
+config/asgi.py). gthread workers run the same number of threads. With more
+than one worker, production needs SKILLFORGE_CACHE_URL (a shared Redis, which
+also carries WebSocket pushes between workers).
+"""
+import os
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+
+from django.conf import settings  # noqa: E402
+
+bind = os.environ.get('SKILLFORGE_BIND', '0.0.0.0:8000')
+worker_class = settings.SERVER['WORKER_CLASS']
+workers = settings.SERVER['WORKERS']
+threads = settings.SERVER['THREADS']
+# Recycle workers now and then so slow leaks cannot accumulate; the jitter keeps them from restarting together
+max_requests = 10000
+max_requests_jitter = 1000
+# Keep-alive between the proxy and the workers
+keepalive = 5
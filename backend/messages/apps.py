@@ -5,3 +5,6 @@ class MessagesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'messages'
     label = 'custom_messages'
+
+    def ready(self):
+        from . import counters  # noqa: F401  registers the unread counter signal handlers
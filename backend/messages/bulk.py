@@ -0,0 +1,58 @@
+# messages/bulk.py
+"""
+Set-based message writes: sending one message to many recipients is a single
+bulk INSERT, and marking a conversation read is a single UPDATE, however many
+rows they touch.
+"""
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+
+from bookings.models import SessionBooking
+from profiles.models import CustomUser
+from .models import Message
+from .signals import messages_read, messages_sent
+
+# Recipients accepted by one bulk send
+MAX_BULK_RECIPIENTS = 5000
+INSERT_BATCH_SIZE = 1000
+
+
+def send_bulk(sender, receiver_ids, content):
+    """Creates one message from sender to each receiver and returns them."""
+    with transaction.atomic():
+        messages = Message.objects.bulk_create(
+            [Message(sender_id=sender.pk, receiver_id=receiver_id, content=content) for receiver_id in receiver_ids],
+            batch_size=INSERT_BATCH_SIZE,
+        )
+        messages_sent.send(sender=Message, messages=messages)
+    return messages
+
+
+def reachable_receivers(sender, receiver_ids):
+    """
+    The ids among receiver_ids that sender may message in bulk: anyone for
+    staff, otherwise users sharing a booking or a conversation with sender.
+    One query.
+    """
+    users = CustomUser.objects.filter(pk__in=receiver_ids)
+    if not sender.is_staff:
+        booked = SessionBooking.objects.filter(
+            Q(learner=OuterRef('pk'), mentor__user=sender) | Q(learner=sender, mentor__user=OuterRef('pk'))
+        )
+        talked = Message.objects.filter(
+            Q(sender=OuterRef('pk'), receiver=sender) | Q(sender=sender, receiver=OuterRef('pk'))
+        )
+        users = users.filter(Exists(booked) | Exists(talked))
+    return set(users.values_list('pk', flat=True))
+
+
+def mark_conversation_read(reader_id, partner_id, up_to=None):
+    """Marks the partner's messages to reader_id read (up to message id up_to) and returns how many changed."""
+    unread = Message.objects.filter(receiver_id=reader_id, sender_id=partner_id, is_read=False)
+    if up_to is not None:
+        unread = unread.filter(id__lte=up_to)
+    with transaction.atomic():
+        count = unread.update(is_read=True)
+        if count:
+            messages_read.send(sender=Message, reader_id=reader_id, partner_id=partner_id, up_to=up_to, count=count)
+    return count
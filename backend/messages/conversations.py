@@ -0,0 +1,45 @@
+# messages/conversations.py
+"""
+Conversation queries. A conversation is every message exchanged between two
+users, in either direction; both directions are served by message_pair_ts_idx.
+"""
+from django.db.models import Case, Count, Exists, F, IntegerField, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
+
+from .models import Message
+
+
+def user_messages(user_id):
+    return Message.objects.filter(Q(sender_id=user_id) | Q(receiver_id=user_id))
+
+
+def thread_between(user_id, partner_id):
+    return Message.objects.filter(
+        Q(sender_id=user_id, receiver_id=partner_id) | Q(sender_id=partner_id, receiver_id=user_id)
+    )
+
+
+def conversations_for(user_id):
+    """
+    The latest message of each of the user's conversations, annotated with
+    partner_id, partner_username and unread_count (messages from the partner
+    the user has not read). Evaluates as a single query.
+    """
+    outgoing = Q(sender_id=user_id)
+    later_in_thread = Message.objects.filter(
+        Q(sender_id=user_id, receiver_id=OuterRef('partner_id')) | Q(sender_id=OuterRef('partner_id'), receiver_id=user_id),
+        Q(timestamp__gt=OuterRef('timestamp')) | Q(timestamp=OuterRef('timestamp'), id__gt=OuterRef('id')),
+    )
+    unread = (
+        Message.objects.filter(receiver_id=user_id, sender_id=OuterRef('partner_id'), is_read=False)
+        .values('receiver_id').annotate(count=Count('id')).values('count')
+    )
+    return (
+        user_messages(user_id)
+        .annotate(
+            partner_id=Case(When(outgoing, then=F('receiver_id')), default=F('sender_id')),
+            partner_username=Case(When(outgoing, then=F('receiver__username')), default=F('sender__username')),
+        )
+        .filter(~Exists(later_in_thread))
+        .annotate(unread_count=Coalesce(Subquery(unread, output_field=IntegerField()), Value(0)))
+    )
@@ -0,0 +1,65 @@
+# messages/counters.py
+"""
+Incremental maintenance of UserProfile.unread_messages. Each Message change
+issues at most one `UPDATE ... SET unread_messages = unread_messages + delta`
+per affected profile, so the inbox badge never needs a COUNT over messages.
+Bulk sends and mark-read (messages.bulk) adjust all affected profiles with
+one UPDATE each.
+"""
+from collections import Counter, defaultdict
+
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from profiles.models import UserProfile
+from .models import Message
+from .signals import messages_read, messages_sent
+
+
+def apply_unread(user_id, delta):
+    if user_id and delta:
+        UserProfile.objects.filter(user_id=user_id).update(unread_messages=F('unread_messages') + delta)
+
+
+@receiver(pre_save, sender=Message)
+def remember_unread_state(sender, instance, raw=False, **kwargs):
+    if raw or instance._state.adding or getattr(instance, '_loaded_unread', None) is not None:
+        return
+    stored = Message.objects.filter(pk=instance.pk).values_list('receiver_id', 'is_read').first()
+    instance._loaded_unread = stored or (None, True)
+
+
+@receiver(post_save, sender=Message)
+def update_unread_counter(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    current = (instance.receiver_id, instance.is_read)
+    previous = None if created else instance._loaded_unread
+    if previous != current:
+        if previous and previous[1] is False:
+            apply_unread(previous[0], -1)
+        if not instance.is_read:
+            apply_unread(instance.receiver_id, 1)
+    instance._loaded_unread = current
+
+
+@receiver(post_delete, sender=Message)
+def remove_unread_counter(sender, instance, **kwargs):
+    if not instance.is_read:
+        apply_unread(instance.receiver_id, -1)
+
+
+@receiver(messages_sent)
+def add_bulk_unread(sender, messages, **kwargs):
+    # Receivers grouped by how many messages they got: one UPDATE per distinct delta
+    receivers_by_delta = defaultdict(list)
+    for user_id, delta in Counter(message.receiver_id for message in messages if not message.is_read).items():
+        receivers_by_delta[delta].append(user_id)
+    for delta, user_ids in receivers_by_delta.items():
+        UserProfile.objects.filter(user_id__in=user_ids).update(unread_messages=F('unread_messages') + delta)
+
+
+@receiver(messages_read)
+def remove_read_unread(sender, reader_id, count, **kwargs):
+    apply_unread(reader_id, -count)
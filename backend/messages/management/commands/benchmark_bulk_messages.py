@@ -0,0 +1,89 @@
+# messages/management/commands/benchmark_bulk_messages.py
+import statistics
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from profiles.models import CustomUser, UserProfile
+from messages.models import Message
+from messages.views import MessageViewSet
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Times the bulk send and mark-read endpoints against throwaway users. "
+        "Everything runs in one transaction that is rolled back at the end, so "
+        "on_commit work (WebSocket pushes) is not included."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipients', type=int, default=2000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        recipients, repeat = options['recipients'], options['repeat']
+        if recipients < 1 or repeat < 1:
+            raise CommandError("--recipients and --repeat must be positive.")
+        try:
+            with transaction.atomic():
+                self.run(recipients, repeat)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def run(self, recipients, repeat):
+        password = make_password(None)
+        # The sender is staff, who may message any list of users
+        users = CustomUser.objects.bulk_create(
+            [CustomUser(username=f'bench-bulk-{i}', password=password, is_staff=i == 0) for i in range(recipients + 1)]
+        )
+        UserProfile.objects.bulk_create([UserProfile(user=user) for user in users])
+        sender, receivers = users[0], users[1:]
+        receiver_ids = [user.pk for user in receivers]
+
+        factory = APIRequestFactory()
+        send_view = MessageViewSet.as_view({'post': 'bulk'})
+        read_view = MessageViewSet.as_view({'post': 'mark_read'})
+
+        send_times, read_times = [], []
+        for _ in range(repeat):
+            request = factory.post('/api/messages/bulk/', {'receivers': receiver_ids, 'content': 'Benchmark'}, format='json')
+            force_authenticate(request, user=sender)
+            started = time.perf_counter()
+            response = send_view(request)
+            send_times.append(time.perf_counter() - started)
+            if response.status_code != 201:
+                raise CommandError(f"Bulk send failed: {response.status_code} {response.data}")
+
+        # One long conversation: `recipients` unread messages from a single partner
+        partner = receivers[0]
+        Message.objects.bulk_create(
+            [Message(sender=partner, receiver=sender, content='Benchmark') for _ in range(recipients)], batch_size=1000,
+        )
+        for _ in range(repeat):
+            Message.objects.filter(sender=partner, receiver=sender).update(is_read=False)
+            UserProfile.objects.filter(user=sender).update(unread_messages=recipients)
+            request = factory.post(f'/api/messages/conversations/{partner.pk}/read/', {}, format='json')
+            force_authenticate(request, user=sender)
+            started = time.perf_counter()
+            response = read_view(request, partner_id=str(partner.pk))
+            read_times.append(time.perf_counter() - started)
+            if response.data['marked_read'] != recipients:
+                raise CommandError(f"Mark read changed {response.data['marked_read']} rows, expected {recipients}.")
+
+        self.report('bulk send', send_times, recipients)
+        self.report('mark read', read_times, recipients)
+
+    def report(self, name, timings, rows):
+        median = statistics.median(timings)
+        self.stdout.write(
+            f"{name}: {rows} rows, median {median * 1000:.1f} ms, best {min(timings) * 1000:.1f} ms "
+            f"over {len(timings)} run(s), {rows / median:,.0f} rows/s"
+        )
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:16
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_unread_counts(apps, schema_editor):
+    Message = apps.get_model('custom_messages', 'Message')
+    UserProfile = apps.get_model('profiles', 'UserProfile')
+    unread = (
+        Message.objects.filter(receiver_id=OuterRef('user_id'), is_read=False)
+        .values('receiver_id').annotate(count=Count('id')).values('count')
+    )
+    UserProfile.objects.update(unread_messages=Coalesce(Subquery(unread), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('custom_messages', '0001_initial'),
+        ('profiles', '0003_userprofile_unread_messages'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['sender', 'receiver', '-timestamp', '-id'], name='message_pair_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['receiver', '-timestamp', '-id'], name='message_receiver_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(condition=models.Q(('is_read', False)), fields=['receiver', 'sender'], name='message_unread_idx'),
+        ),
+        migrations.RunPython(backfill_unread_counts, migrations.RunPython.noop),
+    ]
@@ -9,5 +9,26 @@ class Message(models.Model):
     timestamp = models.DateTimeField(auto_now_add=True)
     is_read = models.BooleanField(default=False)
 
+    class Meta:
+        # Threads are read newest first in both directions of a pair, and the
+        # inbox only ever looks at unread rows addressed to one user.
+        indexes = [
+            models.Index(fields=['sender', 'receiver', '-timestamp', '-id'], name='message_pair_ts_idx'),
+            models.Index(fields=['receiver', '-timestamp', '-id'], name='message_receiver_ts_idx'),
+            models.Index(fields=['receiver', 'sender'], condition=models.Q(is_read=False), name='message_unread_idx'),
+            # Incremental exports (reports.exports) scan by timestamp
+            models.Index(fields=['timestamp', 'id'], name='message_ts_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored state so the unread counter can react to changes without re-reading the row
+        loaded = dict(zip(field_names, values))
+        if 'receiver_id' in loaded and 'is_read' in loaded:
+            # With either deferred, messages.counters re-reads the row on save
+            instance._loaded_unread = (loaded['receiver_id'], loaded['is_read'])
+        return instance
+
     def __str__(self):
         return f"From {self.sender.username} to {self.receiver.username}"
@@ -0,0 +1,23 @@
+# messages/pagination.py
+from rest_framework.pagination import CursorPagination
+
+
+class MessageCursorPagination(CursorPagination):
+    """
+    Keyset pagination over (timestamp, id), newest first. Each page is a range
+    scan on the conversation indexes, however far back the reader scrolls.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    ordering = ('-timestamp', '-id')
+
+
+class OptionalMessageCursorPagination(MessageCursorPagination):
+    """Opt-in variant for the plain message list, which existing clients read as a bare list."""
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+        return super().paginate_queryset(queryset, request, view)
@@ -1,8 +1,40 @@
 from rest_framework import serializers
+from .bulk import MAX_BULK_RECIPIENTS
 from .models import Message
 
 class MessageSerializer(serializers.ModelSerializer):
     class Meta:
         model = Message
         fields = ['id', 'sender', 'receiver', 'content', 'timestamp', 'is_read']
-        read_only_fields = ['id', 'sender', 'timestamp']
\ No newline at end of file
+        read_only_fields = ['id', 'sender', 'timestamp']
+
+
+class ConversationSerializer(serializers.ModelSerializer):
+    # One row per conversation partner, built from that conversation's latest message
+    partner = serializers.IntegerField(source='partner_id', read_only=True)
+    partner_username = serializers.CharField(read_only=True)
+    unread_count = serializers.IntegerField(read_only=True)
+    last_message = MessageSerializer(source='*', read_only=True)
+
+    class Meta:
+        model = Message
+        fields = ['partner', 'partner_username', 'unread_count', 'last_message']
+
+
+class BulkMessageSerializer(serializers.Serializer):
+    # Either explicit recipients, or every learner who has booked one of the sender's skills
+    receivers = serializers.ListField(
+        child=serializers.IntegerField(), required=False, allow_empty=False, max_length=MAX_BULK_RECIPIENTS,
+    )
+    skill = serializers.IntegerField(required=False)
+    content = serializers.CharField()
+
+    def validate(self, attrs):
+        if ('receivers' in attrs) == ('skill' in attrs):
+            raise serializers.ValidationError("Provide either 'receivers' or 'skill'.")
+        return attrs
+
+
+class MarkReadSerializer(serializers.Serializer):
+    # Marks messages up to and including this id; everything unread when omitted
+    up_to = serializers.IntegerField(required=False, min_value=1)
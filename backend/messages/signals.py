@@ -0,0 +1,9 @@
+# messages/signals.py
+from django.dispatch import Signal
+
+# Bulk writes skip the model save/delete signals, so the bulk helpers send
+# these instead; counters and push notifications listen to both kinds.
+#   messages_sent: messages=[Message, ...] just created with bulk_create
+#   messages_read: reader_id, partner_id, up_to (message id or None), count
+messages_sent = Signal()
+messages_read = Signal()
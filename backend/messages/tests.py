@@ -1,3 +1,160 @@
+from datetime import date, time
+from io import StringIO
+
+from django.core.management import call_command
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from config.testing import QueryBudgetMixin, seed_marketplace
+from bookings.models import SessionBooking
+from profiles.models import CustomUser, UserProfile
+from skills.models import Skill
+from .models import Message
+
+
+class ConversationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice, cls.bob, cls.carol = [
+            CustomUser.objects.create_user(username=name, password='pass12345') for name in ('alice', 'bob', 'carol')
+        ]
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user=user)
+        return client
+
+    def send(self, sender, receiver, content):
+        return Message.objects.create(sender=sender, receiver=receiver, content=content)
+
+    def unread(self, user):
+        return UserProfile.objects.get(user=user).unread_messages
+
+    def test_unread_counter_follows_changes(self):
+        first = self.send(self.bob, self.alice, 'hi')
+        self.send(self.carol, self.alice, 'hello')
+        self.assertEqual(self.unread(self.alice), 2)
+        # Deferred state is re-read rather than counted again
+        Message.objects.defer('receiver', 'is_read').get(pk=first.pk).save()
+        self.assertEqual(self.unread(self.alice), 2)
+
+        first = Message.objects.get(pk=first.pk)
+        first.is_read = True
+        first.save()
+        first.save()
+        self.assertEqual(self.unread(self.alice), 1)
+
+        Message.objects.filter(sender=self.carol).get().delete()
+        self.assertEqual(self.unread(self.alice), 0)
+        self.assertEqual(self.client_for(self.alice).get('/api/messages/unread/').data, {'unread_messages': 0})
+
+    def test_conversation_list(self):
+        self.send(self.alice, self.bob, 'one')
+        self.send(self.bob, self.alice, 'two')
+        self.send(self.bob, self.alice, 'three')
+        self.send(self.carol, self.alice, 'four')
+        self.send(self.bob, self.carol, 'not for alice')
+
+        response = self.client_for(self.alice).get('/api/messages/conversations/')
+        self.assertEqual(response.status_code, 200)
+        rows = [(row['partner_username'], row['last_message']['content'], row['unread_count']) for row in response.data['results']]
+        self.assertEqual(rows, [('carol', 'four', 1), ('bob', 'three', 2)])
+
+    def test_thread_is_keyset_paginated_and_private(self):
+        for i in range(5):
+            self.send(self.alice if i % 2 else self.bob, self.bob if i % 2 else self.alice, f'm{i}')
+        self.send(self.carol, self.bob, 'private')
+
+        client = self.client_for(self.alice)
+        page = client.get(f'/api/messages/conversations/{self.bob.id}/', {'page_size': 2}).data
+        seen = [row['content'] for row in page['results']]
+        while page['next']:
+            page = client.get(page['next']).data
+            seen += [row['content'] for row in page['results']]
+        self.assertEqual(seen, ['m4', 'm3', 'm2', 'm1', 'm0'])
+
+        self.assertNotIn('private', [row['content'] for row in client.get('/api/messages/').data])
+        private = Message.objects.get(content='private')
+        self.assertEqual(client.get(f'/api/messages/{private.id}/').status_code, 404)
+
+
+class BulkMessageTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.mentor = CustomUser.objects.create_user(username='mentor', password='pass12345')
+        cls.learners = CustomUser.objects.bulk_create([CustomUser(username=f'learner{i}') for i in range(300)])
+        UserProfile.objects.bulk_create([UserProfile(user=learner) for learner in cls.learners])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.mentor)
+
+    def test_bulk_send_is_constant_queries(self):
+        self.mentor.is_staff = True
+        self.mentor.save()
+        ids = [learner.id for learner in self.learners]
+        with self.assertMaxQueries(6):
+            response = self.client.post('/api/messages/bulk/', {'receivers': ids, 'content': 'Welcome!'}, format='json')
+        self.assertEqual(response.data, {'sent': 300})
+        self.assertEqual(UserProfile.objects.filter(user__in=ids, unread_messages=1).count(), 300)
+
+        response = self.client.post('/api/messages/bulk/', {'receivers': [ids[0], 999999], 'content': 'x'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn('999999', str(response.data))
+        self.assertEqual(self.client.post('/api/messages/bulk/', {'content': 'x'}, format='json').status_code, 400)
+
+    def test_bulk_send_to_learners_of_a_skill(self):
+        self.mentor.profile.role = 'mentor'
+        self.mentor.profile.save()
+        skill = Skill.objects.create(profile=self.mentor.profile, name='React', price=20)
+        for i, status in enumerate(['pending', 'accepted', 'declined']):
+            SessionBooking.objects.create(
+                mentor=self.mentor.profile, learner=self.learners[i], skill=skill,
+                session_date=date(2030, 1, 7), session_time=time(9 + i), status=status,
+            )
+        response = self.client.post('/api/messages/bulk/', {'skill': skill.id, 'content': 'Rescheduling'}, format='json')
+        self.assertEqual(response.data, {'sent': 2})
+        self.assertEqual(set(Message.objects.values_list('receiver', flat=True)), {self.learners[0].id, self.learners[1].id})
+
+    def test_explicit_receivers_need_a_booking_or_conversation(self):
+        Message.objects.create(sender=self.learners[0], receiver=self.mentor, content='hi')
+        with self.assertMaxQueries(6):
+            response = self.client.post('/api/messages/bulk/', {'receivers': [self.learners[0].id], 'content': 'x'}, format='json')
+        self.assertEqual(response.data, {'sent': 1})
+        response = self.client.post(
+            '/api/messages/bulk/', {'receivers': [self.learners[0].id, self.learners[1].id], 'content': 'x'}, format='json',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Message.objects.filter(receiver=self.learners[1]).count(), 0)
+
+    def test_mark_conversation_read_up_to(self):
+        sent = [Message.objects.create(sender=self.learners[0], receiver=self.mentor, content=f'm{i}') for i in range(5)]
+        Message.objects.create(sender=self.learners[1], receiver=self.mentor, content='other')
+        url = f'/api/messages/conversations/{self.learners[0].id}/read/'
+
+        with self.assertMaxQueries(4):  # two UPDATEs, wrapped in a savepoint
+            response = self.client.post(url, {'up_to': sent[2].id}, format='json')
+        self.assertEqual(response.data, {'marked_read': 3})
+        self.assertEqual(self.client.post(url, {}, format='json').data, {'marked_read': 2})
+        self.assertEqual(UserProfile.objects.get(user=self.mentor).unread_messages, 1)
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command('benchmark_bulk_messages', '--recipients', '20', '--repeat', '2', stdout=out)
+        self.assertIn('bulk send: 20 rows', out.getvalue())
+        self.assertIn('mark read: 20 rows', out.getvalue())
+        self.assertFalse(CustomUser.objects.filter(username__startswith='bench-bulk-').exists())
+
+
+class MessageQueryBudgetTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.mentors, cls.learners = seed_marketplace(mentors=2, learners=2, skills_per_mentor=1, bookings=0, reviews=0, messages=1200)
+
+    def test_message_list_budget(self):
+        self.assertEndpointBudget('/api/messages/', 1, user=self.learners[0], min_rows=300)
+        self.assertEndpointBudget('/api/messages/', 1, user=self.learners[0], min_rows=100, page_size=100)
 
-# Create your tests here.
+    def test_conversation_budget(self):
+        self.assertEndpointBudget('/api/messages/conversations/', 1, user=self.mentors[0], min_rows=2)
+        self.assertEndpointBudget(f'/api/messages/conversations/{self.mentors[0].id}/', 2, user=self.learners[0], min_rows=50)
@@ -1,11 +1,78 @@
-from rest_framework import viewsets, permissions
-from .models import Message
-from .serializers import MessageSerializer
+from django.shortcuts import get_object_or_404
+from rest_framework import viewsets, permissions, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError as DRFValidationError
+from rest_framework.response import Response
+from bookings.models import SessionBooking
+from profiles.models import CustomUser, UserProfile
+from skills.models import Skill
+from .bulk import MAX_BULK_RECIPIENTS, mark_conversation_read, reachable_receivers, send_bulk
+from .conversations import conversations_for, thread_between, user_messages
+from .pagination import MessageCursorPagination, OptionalMessageCursorPagination
+from .serializers import BulkMessageSerializer, ConversationSerializer, MarkReadSerializer, MessageSerializer
 
 class MessageViewSet(viewsets.ModelViewSet):
-    queryset = Message.objects.all()
     serializer_class = MessageSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = OptionalMessageCursorPagination
+
+    def get_queryset(self):
+        # Users only ever see messages they sent or received
+        return user_messages(self.request.user.pk).order_by('-timestamp', '-id')
 
     def perform_create(self, serializer):
-        serializer.save(sender=self.request.user)
\ No newline at end of file
+        serializer.save(sender=self.request.user)
+
+    def paginated_response(self, queryset, serializer_class):
+        paginator = MessageCursorPagination()
+        page = paginator.paginate_queryset(queryset, self.request, view=self)
+        return paginator.get_paginated_response(serializer_class(page, many=True).data)
+
+    @action(detail=False)
+    def conversations(self, request):
+        """One entry per conversation partner with the latest message and unread count, newest first."""
+        return self.paginated_response(conversations_for(request.user.pk), ConversationSerializer)
+
+    @action(detail=False, url_path=r'conversations/(?P<partner_id>\d+)')
+    def thread(self, request, partner_id):
+        """Messages exchanged with one user, newest first."""
+        partner = get_object_or_404(CustomUser.objects.only('id'), pk=partner_id)
+        return self.paginated_response(thread_between(request.user.pk, partner.pk), MessageSerializer)
+
+    @action(detail=False, methods=['post'], url_path=r'conversations/(?P<partner_id>\d+)/read')
+    def mark_read(self, request, partner_id):
+        """Marks the partner's messages to the current user read in one UPDATE."""
+        serializer = MarkReadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        count = mark_conversation_read(request.user.pk, int(partner_id), serializer.validated_data.get('up_to'))
+        return Response({'marked_read': count})
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """Sends the same message to many users with one bulk INSERT."""
+        serializer = BulkMessageSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        if 'skill' in data:
+            skill = get_object_or_404(Skill.objects.only('id'), pk=data['skill'], profile__user=request.user)
+            receiver_ids = set(
+                SessionBooking.objects.filter(skill=skill).exclude(status='declined').values_list('learner_id', flat=True)
+            )
+        else:
+            # Explicit lists are limited to staff and to people the sender already deals with;
+            # the error does not say which ids failed, so it cannot be used to probe for accounts
+            receiver_ids = set(data['receivers'])
+            if reachable_receivers(request.user, receiver_ids) != receiver_ids:
+                raise DRFValidationError({'receivers': "Some of these users cannot be messaged."})
+        receiver_ids.discard(request.user.pk)
+        if len(receiver_ids) > MAX_BULK_RECIPIENTS:
+            raise DRFValidationError(f"At most {MAX_BULK_RECIPIENTS} recipients per request.")
+
+        messages = send_bulk(request.user, sorted(receiver_ids), data['content'])
+        return Response({'sent': len(messages)}, status=status.HTTP_201_CREATED)
+
+    @action(detail=False)
+    def unread(self, request):
+        count = UserProfile.objects.filter(user_id=request.user.pk).values_list('unread_messages', flat=True).first()
+        return Response({'unread_messages': count or 0})
@@ -0,0 +1,205 @@
+# notifications/brokers.py
+"""
+Brokers route events to the WebSocket connections of the users they are
+addressed to. Publishing is synchronous and safe to call from any thread;
+each connection receives its events on its own event loop.
+
+LocalBroker delivers within the current process, which is all a single
+process needs. TransportBroker hands every event to a Transport (a pub/sub bus
+shared by all processes, e.g. RedisTransport) and delivers whatever the bus
+hands back, so connections on any worker or node see events published on any
+other. Select the broker with the NOTIFICATIONS setting; see get_broker().
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# Events buffered per connection before the oldest are dropped for a slow reader
+MAX_PENDING_EVENTS = 100
+
+
+class Subscription:
+    """One connection's mailbox."""
+
+    def __init__(self, user_id, loop, max_pending=MAX_PENDING_EVENTS):
+        self.user_id = user_id
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=max_pending)
+
+    def deliver(self, event):
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            pass  # the connection's loop is already closed
+
+    def _put(self, event):
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    async def get(self):
+        return await self.queue.get()
+
+
+class BaseBroker:
+    def __init__(self, max_pending=MAX_PENDING_EVENTS):
+        self._lock = threading.Lock()
+        self._subscriptions = defaultdict(set)
+        self.max_pending = max_pending
+
+    def subscribe(self, user_id, loop=None):
+        subscription = Subscription(user_id, loop or asyncio.get_running_loop(), self.max_pending)
+        with self._lock:
+            self._subscriptions[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.user_id]
+
+    def connection_count(self):
+        with self._lock:
+            return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+    def deliver_local(self, user_ids, event):
+        """Hands the event to this process's connections for the given users."""
+        with self._lock:
+            targets = [subscription for user_id in user_ids for subscription in self._subscriptions.get(user_id, ())]
+        for subscription in targets:
+            subscription.deliver(event)
+
+    def publish(self, user_ids, event):
+        raise NotImplementedError
+
+
+class LocalBroker(BaseBroker):
+    """Single-node broker: events only reach connections served by this process."""
+
+    def publish(self, user_ids, event):
+        self.deliver_local(user_ids, event)
+
+
+class Transport:
+    """
+    A pub/sub bus shared by every node. send() must reach the callback passed
+    to listen() on every node, including the sender's own.
+    """
+
+    def send(self, payload):
+        raise NotImplementedError
+
+    def listen(self, callback):
+        raise NotImplementedError
+
+
+class InMemoryTransport(Transport):
+    """
+    Stand-in for a networked bus: every transport on the same named bus in
+    this process receives every payload. Payloads go through JSON exactly as
+    they would on the wire.
+    """
+    _buses = defaultdict(list)
+    _lock = threading.Lock()
+
+    def __init__(self, bus='default'):
+        self.bus = bus
+
+    def send(self, payload):
+        with self._lock:
+            callbacks = list(self._buses[self.bus])
+        for callback in callbacks:
+            callback(payload)
+
+    def listen(self, callback):
+        with self._lock:
+            self._buses[self.bus].append(callback)
+
+    @classmethod
+    def reset(cls):
+        with cls._lock:
+            cls._buses.clear()
+
+
+class RedisTransport(Transport):
+    """
+    Redis pub/sub (needs the redis package). Each process subscribes to the
+    channel from a daemon thread, which hands every payload to the callback.
+    Events published while the subscription is reconnecting are lost, as
+    pushes are best effort.
+    """
+
+    def __init__(self, url, channel='skillforge:notifications'):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.channel = channel
+
+    def send(self, payload):
+        self.client.publish(self.channel, payload)
+
+    def listen(self, callback):
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(**{self.channel: lambda message: callback(message['data'])})
+        pubsub.run_in_thread(sleep_time=1, daemon=True, exception_handler=self._listen_failed)
+
+    @staticmethod
+    def _listen_failed(error, pubsub, thread):
+        # The next read reconnects and resubscribes; pause so an outage does not spin
+        logger.warning("notification subscription failed error=%s", error)
+        time.sleep(1)
+
+
+class TransportBroker(BaseBroker):
+    """Multi-node broker: fans events out through a Transport shared by all nodes."""
+
+    def __init__(self, transport='notifications.brokers.InMemoryTransport', transport_options=None, **kwargs):
+        super().__init__(**kwargs)
+        if isinstance(transport, str):
+            transport = import_string(transport)(**(transport_options or {}))
+        self.transport = transport
+        self.transport.listen(self._receive)
+
+    def publish(self, user_ids, event):
+        self.transport.send(json.dumps({'users': list(user_ids), 'event': event}, cls=DjangoJSONEncoder))
+
+    def _receive(self, payload):
+        message = json.loads(payload)
+        self.deliver_local(message['users'], message['event'])
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """
+    The process-wide broker, built from settings.NOTIFICATIONS:
+    {'BROKER': '<dotted path>', 'OPTIONS': {...constructor kwargs}}.
+    """
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                config = getattr(settings, 'NOTIFICATIONS', {})
+                broker_class = import_string(config.get('BROKER', 'notifications.brokers.LocalBroker'))
+                _broker = broker_class(**config.get('OPTIONS', {}))
+    return _broker
+
+
+def reset_broker():
+    global _broker
+    with _broker_lock:
+        _broker = None
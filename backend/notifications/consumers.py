@@ -0,0 +1,89 @@
+# notifications/consumers.py
+"""
+The /ws/notifications/ WebSocket endpoint, served directly on the ASGI
+protocol. Browsers cannot set headers on a WebSocket handshake, so the
+client passes its access token as ?token=<jwt>. Once connected, the server
+sends one JSON text frame per event; the client may send "ping" and gets
+"pong" back.
+
+Tokens are checked by CachedJWTAuthentication, so sockets follow the same
+rules as HTTP requests: inactive users and tokens made stale by a role change
+are refused. Open sockets are checked again every REAUTHENTICATE_SECONDS and
+closed with CLOSE_UNAUTHORIZED once their token is refused or has expired.
+"""
+import asyncio
+import json
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+
+from profiles.authentication import USER_CACHE_TTL, CachedJWTAuthentication
+from .brokers import get_broker
+
+WEBSOCKET_PATH = '/ws/notifications/'
+# Close codes in the 4000-4999 range are reserved for applications
+CLOSE_NOT_FOUND = 4404
+CLOSE_UNAUTHORIZED = 4401
+# Checking more often than users are cached would only hit the cache again
+REAUTHENTICATE_SECONDS = USER_CACHE_TTL
+
+
+def authenticate(scope):
+    """
+    Id of the user the access token in the query string belongs to, or None
+    when HTTP requests with that token would be refused. Runs queries on a
+    cache miss, so call it through sync_to_async.
+    """
+    token = parse_qs(scope.get('query_string', b'').decode()).get('token', [None])[0]
+    if not token:
+        return None
+    authentication = CachedJWTAuthentication()
+    try:
+        # The real pk value, which brokers key subscriptions by (the claim may be a string)
+        return authentication.get_user(authentication.get_validated_token(token.encode())).pk
+    except (InvalidToken, AuthenticationFailed):
+        return None
+
+
+async def notifications_application(scope, receive, send):
+    if (await receive())['type'] != 'websocket.connect':
+        return
+    if scope['path'] != WEBSOCKET_PATH:
+        await send({'type': 'websocket.close', 'code': CLOSE_NOT_FOUND})
+        return
+    user_id = await sync_to_async(authenticate)(scope)
+    if user_id is None:
+        await send({'type': 'websocket.close', 'code': CLOSE_UNAUTHORIZED})
+        return
+
+    await send({'type': 'websocket.accept'})
+    broker = get_broker()
+    subscription = broker.subscribe(user_id)
+    incoming = asyncio.ensure_future(receive())
+    outgoing = asyncio.ensure_future(subscription.get())
+    recheck = asyncio.ensure_future(asyncio.sleep(REAUTHENTICATE_SECONDS))
+    try:
+        while True:
+            done, _ = await asyncio.wait({incoming, outgoing, recheck}, return_when=asyncio.FIRST_COMPLETED)
+            if recheck in done:
+                if await sync_to_async(authenticate)(scope) != user_id:
+                    await send({'type': 'websocket.close', 'code': CLOSE_UNAUTHORIZED})
+                    break
+                recheck = asyncio.ensure_future(asyncio.sleep(REAUTHENTICATE_SECONDS))
+            if outgoing in done:
+                await send({'type': 'websocket.send', 'text': json.dumps(outgoing.result(), cls=DjangoJSONEncoder)})
+                outgoing = asyncio.ensure_future(subscription.get())
+            if incoming in done:
+                message = incoming.result()
+                if message['type'] == 'websocket.disconnect':
+                    break
+                if message.get('text') == 'ping':
+                    await send({'type': 'websocket.send', 'text': 'pong'})
+                incoming = asyncio.ensure_future(receive())
+    finally:
+        incoming.cancel()
+        outgoing.cancel()
+        recheck.cancel()
+        broker.unsubscribe(subscription)
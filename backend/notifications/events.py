@@ -0,0 +1,84 @@
+# notifications/events.py
+"""
+Pushes new messages and booking status transitions to the users involved.
+Events are published only once the surrounding transaction commits, so a
+client never hears about a row it cannot read yet.
+
+Event shapes:
+    {"type": "message.created", "data": <MessageSerializer fields>}
+    {"type": "messages.read", "data": {"reader", "partner", "up_to", "count"}}
+    {"type": "booking.status", "data": {"id", "status", "previous_status", "skill", "session_date", "session_time"}}
+"""
+from django.db import transaction
+from django.db.models.signals import post_save, pre_save
+from django.dispatch import receiver
+
+from bookings.models import SessionBooking
+from messages.models import Message
+from messages.serializers import MessageSerializer
+from messages.signals import messages_read, messages_sent
+from profiles.models import UserProfile
+from .brokers import get_broker
+
+
+def push(user_ids, event_type, data):
+    user_ids = sorted({user_id for user_id in user_ids if user_id})
+    event = {'type': event_type, 'data': data}
+    transaction.on_commit(lambda: get_broker().publish(user_ids, event))
+
+
+def message_data(message):
+    # Same keys as MessageSerializer, without its per-field overhead (bulk sends build thousands)
+    return {field: getattr(message, Message._meta.get_field(field).attname) for field in MessageSerializer.Meta.fields}
+
+
+@receiver(post_save, sender=Message)
+def push_new_message(sender, instance, created, raw=False, **kwargs):
+    if raw or not created:
+        return
+    # The sender gets it too, for their other open tabs and devices
+    push([instance.receiver_id, instance.sender_id], 'message.created', message_data(instance))
+
+
+@receiver(messages_sent)
+def push_bulk_messages(sender, messages, **kwargs):
+    events = [([message.receiver_id], {'type': 'message.created', 'data': message_data(message)}) for message in messages]
+
+    def publish():
+        broker = get_broker()
+        for user_ids, event in events:
+            broker.publish(user_ids, event)
+
+    transaction.on_commit(publish)
+
+
+@receiver(messages_read)
+def push_read_receipt(sender, reader_id, partner_id, up_to, count, **kwargs):
+    data = {'reader': reader_id, 'partner': partner_id, 'up_to': up_to, 'count': count}
+    push([reader_id, partner_id], 'messages.read', data)
+
+
+@receiver(pre_save, sender=SessionBooking)
+def remember_pushed_status(sender, instance, raw=False, **kwargs):
+    # bookings.counters has already filled in _loaded_status (it registers first),
+    # and resets it after saving, so keep our own copy of the previous status
+    instance._previous_status = None if instance._state.adding else getattr(instance, '_loaded_status', None)
+
+
+@receiver(post_save, sender=SessionBooking)
+def push_booking_status(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_previous_status', None)
+    if not created and previous == instance.status:
+        return
+    data = {
+        'id': instance.pk,
+        'status': instance.status,
+        'previous_status': previous,
+        'skill': instance.skill_id,
+        'session_date': instance.session_date,
+        'session_time': instance.session_time,
+    }
+    mentor_user_id = UserProfile.objects.filter(pk=instance.mentor_id).values_list('user_id', flat=True).first()
+    push([instance.learner_id, mentor_user_id], 'booking.status', data)
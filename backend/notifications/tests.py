@@ -0,0 +1,169 @@
+import asyncio
+import json
+from datetime import date, time
+from unittest import mock
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from bookings.models import SessionBooking
+from messages.models import Message
+from profiles.authentication import user_cache
+from profiles.models import CustomUser
+from profiles.tokens import stamp_role_claims
+from skills.models import Skill
+from .brokers import InMemoryTransport, LocalBroker, TransportBroker, reset_broker
+from .consumers import CLOSE_UNAUTHORIZED, notifications_application
+
+
+class WebSocket:
+    """Drives notifications_application the way an ASGI server would."""
+
+    def __init__(self, token=None, path='/ws/notifications/'):
+        query = f'token={token}'.encode() if token else b''
+        self.scope = {'type': 'websocket', 'path': path, 'query_string': query}
+        self.to_app = asyncio.Queue()
+        self.from_app = asyncio.Queue()
+
+    async def connect(self):
+        self.task = asyncio.ensure_future(notifications_application(self.scope, self.to_app.get, self.from_app.put))
+        await self.to_app.put({'type': 'websocket.connect'})
+        return await self.receive()
+
+    async def receive(self):
+        return await asyncio.wait_for(self.from_app.get(), timeout=2)
+
+    async def receive_json(self):
+        return json.loads((await self.receive())['text'])
+
+    async def send_text(self, text):
+        await self.to_app.put({'type': 'websocket.receive', 'text': text})
+
+    async def close(self):
+        await self.to_app.put({'type': 'websocket.disconnect', 'code': 1000})
+        await asyncio.wait_for(self.task, timeout=2)
+
+
+class BrokerTests(TestCase):
+    def test_local_broker_routes_by_user(self):
+        async def scenario():
+            broker = LocalBroker()
+            alice, bob = broker.subscribe(1), broker.subscribe(2)
+            broker.publish([1], {'type': 'ping'})
+            self.assertEqual(await asyncio.wait_for(alice.get(), 1), {'type': 'ping'})
+            self.assertTrue(bob.queue.empty())
+            broker.unsubscribe(alice)
+            broker.unsubscribe(bob)
+            self.assertEqual(broker.connection_count(), 0)
+        async_to_sync(scenario)()
+
+    def test_transport_broker_fans_out_across_nodes(self):
+        InMemoryTransport.reset()
+        self.addCleanup(InMemoryTransport.reset)
+
+        async def scenario():
+            node_a = TransportBroker(transport_options={'bus': 'test'})
+            node_b = TransportBroker(transport_options={'bus': 'test'})
+            subscription = node_b.subscribe(7)
+            node_a.publish([7], {'type': 'message.created', 'data': {'id': 1}})
+            self.assertEqual(await asyncio.wait_for(subscription.get(), 1), {'type': 'message.created', 'data': {'id': 1}})
+        async_to_sync(scenario)()
+
+    def test_slow_readers_keep_the_newest_events(self):
+        async def scenario():
+            broker = LocalBroker(max_pending=2)
+            subscription = broker.subscribe(1)
+            for i in range(3):
+                broker.publish([1], {'n': i})
+            await asyncio.sleep(0)
+            self.assertEqual([subscription.queue.get_nowait()['n'] for _ in range(2)], [1, 2])
+        async_to_sync(scenario)()
+
+
+@override_settings(NOTIFICATIONS={'BROKER': 'notifications.brokers.LocalBroker'})
+class WebSocketPushTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.mentor = CustomUser.objects.create_user(username='mentor', password='pass12345')
+        cls.mentor.profile.role = 'mentor'
+        cls.mentor.profile.save()
+        cls.learner = CustomUser.objects.create_user(username='learner', password='pass12345')
+        cls.skill = Skill.objects.create(profile=cls.mentor.profile, name='React', price=20)
+
+    def setUp(self):
+        reset_broker()
+        self.addCleanup(reset_broker)
+        user_cache.clear()
+        cache.clear()
+
+    def committed(self, func):
+        # Runs func in the test's thread and transaction, then fires its on_commit hooks
+        def run():
+            with self.captureOnCommitCallbacks(execute=True):
+                return func()
+        return sync_to_async(run)()
+
+    def test_rejects_missing_or_invalid_token(self):
+        async def scenario():
+            for token in (None, 'not-a-jwt'):
+                closed = await WebSocket(token).connect()
+                self.assertEqual(closed, {'type': 'websocket.close', 'code': CLOSE_UNAUTHORIZED})
+        async_to_sync(scenario)()
+
+    def test_follows_http_revocation_rules(self):
+        stale = str(stamp_role_claims(AccessToken.for_user(self.learner), self.learner.profile))
+        token_before_deactivation = str(AccessToken.for_user(self.mentor))
+
+        def become_mentor():
+            self.learner.profile.role = 'mentor'
+            self.learner.profile.save(update_fields=['role'])
+
+        def deactivate():
+            self.mentor.is_active = False
+            self.mentor.save(update_fields=['is_active'])
+
+        async def scenario():
+            # Sockets opened before the change are closed at their next check, new ones at once
+            for token, change in ((stale, become_mentor), (token_before_deactivation, deactivate)):
+                socket = WebSocket(token)
+                self.assertEqual((await socket.connect())['type'], 'websocket.accept')
+                await self.committed(change)
+                self.assertEqual(await socket.receive(), {'type': 'websocket.close', 'code': CLOSE_UNAUTHORIZED})
+                await asyncio.wait_for(socket.task, timeout=2)
+                closed = await WebSocket(token).connect()
+                self.assertEqual(closed, {'type': 'websocket.close', 'code': CLOSE_UNAUTHORIZED})
+
+        with mock.patch('notifications.consumers.REAUTHENTICATE_SECONDS', 0.05):
+            async_to_sync(scenario)()
+
+    def test_pushes_messages_and_booking_transitions(self):
+        async def scenario():
+            socket = WebSocket(str(AccessToken.for_user(self.mentor)))
+            self.assertEqual((await socket.connect())['type'], 'websocket.accept')
+            await socket.send_text('ping')
+            self.assertEqual((await socket.receive())['text'], 'pong')
+
+            await self.committed(lambda: Message.objects.create(sender=self.learner, receiver=self.mentor, content='Hi!'))
+            event = await socket.receive_json()
+            self.assertEqual((event['type'], event['data']['content']), ('message.created', 'Hi!'))
+
+            booking = await self.committed(lambda: SessionBooking.objects.create(
+                mentor=self.mentor.profile, learner=self.learner, skill=self.skill,
+                session_date=date(2030, 1, 7), session_time=time(9),
+            ))
+            self.assertEqual((await socket.receive_json())['data']['status'], 'pending')
+
+            def accept():
+                stored = SessionBooking.objects.get(pk=booking.pk)
+                stored.status = 'accepted'
+                stored.save()
+                stored.save()  # unchanged status: no second event
+            await self.committed(accept)
+            event = await socket.receive_json()
+            self.assertEqual((event['type'], event['data']['previous_status'], event['data']['status']), ('booking.status', 'pending', 'accepted'))
+            self.assertTrue(socket.from_app.empty())
+
+            await socket.close()
+        async_to_sync(scenario)()
@@ -0,0 +1,123 @@
+# profiles/authentication.py
+"""
+JWT authentication that resolves the user and profile together and keeps the
+result in a short-lived per-process cache, so an authenticated request costs
+no queries on a cache hit and views can read request.user.profile freely.
+
+Entries are dropped as soon as this process saves or deletes the user or its
+profile (e.g. BecomeMentorView). Other processes notice within
+USER_CACHE_TTL seconds. Counter columns that are maintained with
+queryset.update() (ratings, unread messages) may lag on request.user.profile
+for the same window; read them from the database where exactness matters.
+"""
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .models import CustomUser, UserProfile
+from .tokens import TOKEN_VERSION_CLAIM, current_token_version
+
+USER_CACHE_TTL = 30
+USER_CACHE_MAX_ENTRIES = 10000
+
+
+class UserCache:
+    """
+    LRU of users keyed by primary key, stored pickled so every request gets its
+    own instances and one request's changes never leak into another's.
+    """
+
+    def __init__(self, ttl=USER_CACHE_TTL, max_entries=USER_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, user_id):
+        key = str(user_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, payload = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        return pickle.loads(payload)
+
+    def set(self, user_id, user):
+        payload = pickle.dumps(user)
+        with self._lock:
+            self._entries[str(user_id)] = (time.monotonic() + self.ttl, payload)
+            self._entries.move_to_end(str(user_id))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, user_id):
+        with self._lock:
+            self._entries.pop(str(user_id), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = UserCache()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    Drop-in replacement for simplejwt's JWTAuthentication that also rejects
+    access tokens whose role claims predate the user's last role change.
+    """
+
+    def get_validated_token(self, raw_token):
+        token = super().get_validated_token(raw_token)
+        # Tokens without the claim (issued by the plain /api/token/ view) carry no role to go stale
+        if TOKEN_VERSION_CLAIM in token and api_settings.USER_ID_CLAIM in token:
+            if token[TOKEN_VERSION_CLAIM] != current_token_version(token[api_settings.USER_ID_CLAIM]):
+                raise InvalidToken(_("Token role claims are out of date; refresh the token."))
+        return token
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        user = user_cache.get(user_id)
+        if user is None:
+            try:
+                user = self.user_model.objects.select_related('profile').get(**{api_settings.USER_ID_FIELD: user_id})
+            except self.user_model.DoesNotExist as e:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found") from e
+            user_cache.set(user_id, user)
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+        return user
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def forget_cached_user(sender, instance, **kwargs):
+    user_cache.discard(getattr(instance, api_settings.USER_ID_FIELD))
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def forget_cached_profile_user(sender, instance, **kwargs):
+    user_cache.discard(instance.user_id)
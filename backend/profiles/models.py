@@ -18,17 +18,35 @@ class UserProfile(models.Model):
     role = models.CharField(max_length=10, choices=USER_ROLE_CHOICES, default='learner')
     bio = models.TextField(blank=True, null=True)
     availability = models.CharField(max_length=255, blank=True, null=True)
+    # Denormalized mentor counters, maintained incrementally by bookings.counters
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    avg_rating = models.DecimalField(max_digits=3, decimal_places=2, null=True, blank=True, editable=False)
+    sessions_completed = models.PositiveIntegerField(default=0, editable=False)
+    # Unread messages addressed to this user, maintained by messages.counters
+    unread_messages = models.PositiveIntegerField(default=0, editable=False)
+    # Bumped on role changes so access tokens carrying the old role claim are rejected (profiles.tokens)
+    token_version = models.PositiveIntegerField(default=0, editable=False)
     # session_count for learners can be calculated from sessions related to them
     # skills_learned for learners can be calculated from sessions
     # top_skills for learners can be derived from skills_learned or a separate tracking
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored role so a role change can invalidate issued tokens without re-reading the row
+        instance._loaded_role = dict(zip(field_names, values)).get('role')
+        return instance
+
     def __str__(self):
         return f"{self.user.username}'s Profile ({self.role})"
     
-# Signal to create a UserProfile automatically when a new CustomUser is created
+# Signal to create a UserProfile automatically when a new CustomUser is created.
+# Callers that know the profile's fields up front (registration) set
+# user._profile_fields before saving, so the profile is written once.
 
 @receiver(post_save, sender=CustomUser)
-def create_or_update_user_profile(sender, instance, created, **kwargs):
-    if created:
-        UserProfile.objects.create(user=instance)
-    instance.profile.save() # Ensure profile exists and save it (important for updates)
\ No newline at end of file
+def create_user_profile(sender, instance, created, raw=False, **kwargs):
+    # Later saves (e.g. last_login updates) never touch the profile
+    if created and not raw:
+        UserProfile.objects.create(user=instance, **getattr(instance, '_profile_fields', {}))
@@ -0,0 +1,52 @@
+# profiles/permissions.py
+"""
+Role checks that trust the verified token first. Access tokens from the login
+and refresh endpoints carry role and profile_id claims (profiles.tokens), so
+these helpers answer without touching profiles_userprofile; requests without
+those claims (e.g. force_authenticate in tests) fall back to the profile.
+"""
+from rest_framework.permissions import BasePermission
+
+from .tokens import PROFILE_CLAIM, ROLE_CLAIM
+
+
+def _claim(request, name):
+    token = getattr(request, 'auth', None)
+    return token.get(name) if token is not None and hasattr(token, 'get') else None
+
+
+def _profile(request):
+    if not request.user or not request.user.is_authenticated:
+        return None
+    return getattr(request.user, 'profile', None)
+
+
+def request_role(request):
+    """'mentor', 'learner', or None for anonymous users and users without a profile."""
+    role = _claim(request, ROLE_CLAIM)
+    if role is None:
+        profile = _profile(request)
+        role = profile.role if profile is not None else None
+    return role
+
+
+def request_profile_id(request):
+    profile_id = _claim(request, PROFILE_CLAIM)
+    if profile_id is None:
+        profile = _profile(request)
+        profile_id = profile.pk if profile is not None else None
+    return profile_id
+
+
+class IsMentor(BasePermission):
+    message = "Only mentors can do this."
+
+    def has_permission(self, request, view):
+        return request_role(request) == 'mentor'
+
+
+class IsLearner(BasePermission):
+    message = "Only learners can do this."
+
+    def has_permission(self, request, view):
+        return request_role(request) == 'learner'
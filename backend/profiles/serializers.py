@@ -1,4 +1,5 @@
 # profiles/serializers.py
+from django.db import transaction
 from rest_framework import serializers
 from .models import CustomUser, UserProfile
 # No need to import Skill or Review here if they are in separate apps
@@ -57,23 +58,17 @@ class RegisterSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         password = validated_data.pop('password')
-        password2 = validated_data.pop('password2') # Pop this as it's not a model field
+        validated_data.pop('password2') # Pop this as it's not a model field
         role = validated_data.pop('role', 'learner') # Pop the role for UserProfile
         bio = validated_data.pop('bio', '')
 
-        user = CustomUser.objects.create_user(**validated_data)
+        # One INSERT per table: the profile is created by the post_save signal with these fields
+        user = CustomUser(
+            username=CustomUser.normalize_username(validated_data['username']),
+            email=CustomUser.objects.normalize_email(validated_data.get('email', '')),
+        )
         user.set_password(password)
-        user.save()
-
-        # Create UserProfile with the specified role
-        # UserProfile.objects.create(user=user, role=role)
-        if hasattr(user, 'profile'): # Check if profile already exists (it should due to signal)
-            user.profile.role = role
-            user.profile.bio = bio
-            user.profile.save()
-        else:
-            # Fallback, though the signal should ensure this path is rarely hit if ever.
-            UserProfile.objects.create(user=user, role=role, bio=bio)
-
-
-        return user
\ No newline at end of file
+        user._profile_fields = {'role': role, 'bio': bio}
+        with transaction.atomic():
+            user.save()
+        return user
@@ -1,3 +1,172 @@
-from django.test import TestCase
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from skills.models import Skill
+from .authentication import user_cache
+from .models import CustomUser, UserProfile
+from .tokens import TOKEN_VERSION_TTL, current_token_version
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='alice', password='pass12345')
+
+    def setUp(self):
+        user_cache.clear()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+
+    def test_user_and_profile_are_cached(self):
+        Skill.objects.create(profile=self.user.profile, name='React', price=20)
+        self.user.profile.role = 'mentor'
+        self.user.profile.save()
+
+        with self.assertNumQueries(2):  # user with profile, then the skills
+            self.assertEqual(len(self.client.get('/api/skills/').data), 1)
+        with self.assertNumQueries(1):
+            self.assertEqual(len(self.client.get('/api/skills/').data), 1)
+
+    def test_profile_and_user_saves_invalidate(self):
+        self.assertEqual(self.client.get('/api/skills/availabilities/').data, [])
+        self.assertEqual(self.client.post('/api/become-mentor/').status_code, 200)
+        # The role change is visible to the very next request
+        response = self.client.post('/api/skills/', {'name': 'React', 'price': 20})
+        self.assertEqual(response.status_code, 201, response.data)
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/skills/').status_code, 401)
+
+    def test_invalid_tokens_are_rejected(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer nonsense')
+        self.assertEqual(self.client.get('/api/skills/').status_code, 401)
+        token = AccessToken.for_user(self.user)
+        self.user.delete()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        self.assertEqual(self.client.get('/api/skills/').status_code, 401)
+
+
+class RoleClaimTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='bob', password='pass12345')
+
+    def setUp(self):
+        user_cache.clear()
+        cache.clear()
+        self.client = APIClient()
+
+    def login(self):
+        tokens = self.client.post('/api/login/', {'username': 'bob', 'password': 'pass12345'}).data
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+        return tokens
+
+    def test_reads_are_authorized_from_claims(self):
+        self.user.profile.role = 'mentor'
+        self.user.profile.save()
+        self.login()
+        self.client.get('/api/skills/availabilities/')
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get('/api/skills/availabilities/').status_code, 200)
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('profiles_userprofile', queries[0]['sql'])
+
+        response = self.client.post('/api/skills/availabilities/', {'day_of_week': 'Monday', 'start_time': '09:00', 'end_time': '10:00'})
+        self.assertEqual(response.status_code, 201, response.data)
+
+    def test_role_change_invalidates_tokens_until_refresh(self):
+        tokens = self.login()
+        self.assertEqual(self.client.post('/api/skills/', {'name': 'React', 'price': 20}).status_code, 403)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.post('/api/become-mentor/').status_code, 200)
+
+        # The old access token claims 'learner' and is now refused
+        self.assertEqual(self.client.get('/api/skills/').status_code, 401)
+        access = self.client.post('/api/token/refresh/', {'refresh': tokens['refresh']}).data['access']
+        self.assertEqual(AccessToken(access)['role'], 'mentor')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        self.assertEqual(self.client.post('/api/skills/', {'name': 'React', 'price': 20}).status_code, 201)
+
+    def test_role_change_keeps_the_counters(self):
+        self.login()
+        self.client.get('/api/skills/')  # caches the user and profile
+        UserProfile.objects.filter(user=self.user).update(unread_messages=2, sessions_completed=3)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.post('/api/become-mentor/').status_code, 200)
+        profile = UserProfile.objects.get(user=self.user)
+        self.assertEqual((profile.role, profile.unread_messages, profile.sessions_completed), ('mentor', 2, 3))
+        self.assertEqual(profile.token_version, 1)
+
+    def test_cached_versions_expire(self):
+        # Another worker's change reaches this one once its cached version expires
+        with mock.patch.object(cache, 'set', wraps=cache.set) as cache_set:
+            self.assertEqual(current_token_version(self.user.pk), 0)
+        cache_set.assert_called_once_with(mock.ANY, 0, timeout=TOKEN_VERSION_TTL)
+        self.assertLessEqual(TOKEN_VERSION_TTL, 5 * 60)
+
+
+class RegistrationWriteTests(TestCase):
+    def test_registration_is_one_insert_per_table(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = APIClient().post('/api/register/', {
+                'username': 'carol', 'email': 'carol@example.com', 'password': 'pass12345', 'password2': 'pass12345', 'role': 'mentor',
+            })
+        self.assertEqual(response.status_code, 201, response.data)
+        writes = [query['sql'].split()[0] for query in queries if query['sql'].startswith(('INSERT', 'UPDATE'))]
+        self.assertEqual(writes, ['INSERT', 'INSERT'])
+        user = CustomUser.objects.get(username='carol')
+        self.assertEqual(user.profile.role, 'mentor')
+        self.assertTrue(user.check_password('pass12345'))
+
+    def test_user_saves_leave_the_profile_alone(self):
+        user = CustomUser.objects.create_user(username='dave', password='pass12345')
+        with CaptureQueriesContext(connection) as queries:
+            user.save(update_fields=['last_login'])
+            user.save()
+        profile_writes = ('UPDATE "profiles_userprofile"', 'INSERT INTO "profiles_userprofile"')
+        self.assertFalse([query for query in queries if query['sql'].startswith(profile_writes)])
+
+
+class ImportUsersCommandTests(TestCase):
+    def write_csv(self, text):
+        handle = tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False)
+        handle.write(text)
+        handle.close()
+        self.addCleanup(os.unlink, handle.name)
+        return handle.name
+
+    # A fast (still salted) hasher, since every imported user's password is hashed
+    @override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+    def test_imports_users_with_profiles(self):
+        CustomUser.objects.create_user(username='existing', password='pass12345')
+        rows = ''.join(f'user{i},user{i}@example.com,{"mentor" if i % 10 == 0 else "learner"},\n' for i in range(1500))
+        path = self.write_csv('username,email,role,password\n' + rows + 'existing,e@example.com,learner,secret\n')
+
+        with self.assertRaises(CommandError):
+            call_command('import_users', path, stdout=StringIO())
+        self.assertFalse(CustomUser.objects.filter(username='user0').exists())
+
+        call_command('import_users', path, '--skip-existing', '--password', 'welcome123', stdout=StringIO())
+        self.assertEqual(UserProfile.objects.filter(user__username__startswith='user').count(), 1500)
+        self.assertEqual(UserProfile.objects.filter(user__username__startswith='user', role='mentor').count(), 150)
+        self.assertTrue(CustomUser.objects.get(username='user7').check_password('welcome123'))
+        # Same password, separate salts
+        hashes = CustomUser.objects.filter(username__in=['user7', 'user8']).values_list('password', flat=True)
+        self.assertEqual(len(set(hashes)), 2)
+        self.assertTrue(CustomUser.objects.get(username='user8').check_password('welcome123'))
+
+    def test_rejects_bad_rows(self):
+        path = self.write_csv('username,email,role\nann,a@example.com,admin\n')
+        with self.assertRaisesMessage(CommandError, "unknown role"):
+            call_command('import_users', path, stdout=StringIO())
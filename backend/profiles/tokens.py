@@ -0,0 +1,75 @@
+# profiles/tokens.py
+"""
+Role claims carried in access tokens. Tokens issued by the login and refresh
+endpoints say who the user is on the marketplace (role, profile id), so
+authorization can be decided from the verified token alone.
+
+Each profile has a token_version that is bumped whenever its role changes.
+Access tokens carry the version they were issued with and are rejected once
+it is stale; the client then refreshes and gets a token with the new claims.
+The current version per user is kept in the Django cache for
+TOKEN_VERSION_TTL seconds, so checking it costs no query on a hit. A role
+change deletes the entry in the cache it was saved through. With several
+workers that cache must be shared (settings.CACHES, SKILLFORGE_CACHE_URL) for
+revocation to take effect at once. With a per-process cache, the other
+workers still accept the old tokens until their entry expires.
+"""
+from django.core.cache import cache
+from rest_framework_simplejwt.settings import api_settings
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_save, pre_save
+from django.dispatch import receiver
+
+from .models import UserProfile
+
+ROLE_CLAIM = 'role'
+PROFILE_CLAIM = 'profile_id'
+TOKEN_VERSION_CLAIM = 'token_version'
+# How stale a cached version may be; never longer than an access token lives
+TOKEN_VERSION_TTL = min(30, int(api_settings.ACCESS_TOKEN_LIFETIME.total_seconds()))
+
+
+def _version_key(user_id):
+    return f'profiles:token_version:{user_id}'
+
+
+def current_token_version(user_id):
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        version = UserProfile.objects.filter(user_id=user_id).values_list('token_version', flat=True).first() or 0
+        cache.set(key, version, timeout=TOKEN_VERSION_TTL)
+    return version
+
+
+def stamp_role_claims(token, profile):
+    token[ROLE_CLAIM] = profile.role
+    token['is_mentor'] = profile.role == 'mentor'
+    token[PROFILE_CLAIM] = profile.pk
+    token[TOKEN_VERSION_CLAIM] = profile.token_version
+    return token
+
+
+@receiver(pre_save, sender=UserProfile)
+def detect_role_change(sender, instance, raw=False, **kwargs):
+    if raw or instance._state.adding:
+        instance._role_changed = False
+        return
+    loaded_role = getattr(instance, '_loaded_role', None)
+    if loaded_role is None:
+        loaded_role = UserProfile.objects.filter(pk=instance.pk).values_list('role', flat=True).first()
+    instance._role_changed = loaded_role != instance.role
+
+
+@receiver(post_save, sender=UserProfile)
+def revoke_tokens_on_role_change(sender, instance, raw=False, **kwargs):
+    instance._loaded_role = instance.role
+    if raw or not getattr(instance, '_role_changed', False):
+        return
+    # An UPDATE of its own, so saves with update_fields=['role'] bump it too
+    UserProfile.objects.filter(pk=instance.pk).update(token_version=F('token_version') + 1)
+    instance.token_version = UserProfile.objects.filter(pk=instance.pk).values_list('token_version', flat=True).get()
+    instance._role_changed = False
+    user_id = instance.user_id
+    transaction.on_commit(lambda: cache.delete(_version_key(user_id)))
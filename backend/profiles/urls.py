@@ -1,10 +1,10 @@
 # My recommended profiles/urls.py
 from django.urls import path
-from rest_framework_simplejwt.views import TokenRefreshView
 
 from .views import (
     RegisterView,
     CustomTokenObtainPairView, # Renamed from MyTokenObtainPairView
+    CustomTokenRefreshView,    # Re-stamps role claims on refresh
     # TokenObtainPairView,
     CurrentUserProfileView,    # Renamed from UserProfileView
     BecomeMentorView,          # New endpoint
@@ -14,7 +14,7 @@ urlpatterns = [
     path('register/', RegisterView.as_view(), name='register'),
     path('login/', CustomTokenObtainPairView.as_view(), name='token_obtain_pair'), # Path changed to login/, name changed
     # path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
-    path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'), # Path changed to token/refresh/
+    path('token/refresh/', CustomTokenRefreshView.as_view(), name='token_refresh'), # Path changed to token/refresh/
     path('profile/', CurrentUserProfileView.as_view(), name='current-user-profile'), # Name changed
     path('become-mentor/', BecomeMentorView.as_view(), name='become-mentor'), # New endpoint
 ]
\ No newline at end of file
@@ -3,11 +3,13 @@ from rest_framework import generics, status, permissions # Import permissions
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.views import APIView
-from django.shortcuts import get_object_or_404
 from .models import CustomUser, UserProfile
 from .serializers import CurrentUserAndProfileSerializer, RegisterSerializer # Import RegisterSerializer
-from rest_framework_simplejwt.views import TokenObtainPairView
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+from .tokens import stamp_role_claims
 
 
 # Add this RegisterView class
@@ -25,12 +27,27 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         token['username'] = user.username
         token['email'] = user.email
         token['user_id'] = user.id
-        token['is_mentor'] = user.profile.role == 'mentor'
+        # role, is_mentor, profile_id and token_version (see profiles.tokens)
+        stamp_role_claims(token, user.profile)
         return token
 
 class CustomTokenObtainPairView(TokenObtainPairView):
     serializer_class = CustomTokenObtainPairSerializer
 
+
+class CustomTokenRefreshSerializer(TokenRefreshSerializer):
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        # Claims copied from the refresh token may predate a role change; re-stamp them from the profile
+        access = AccessToken(data['access'], verify=False)
+        profile = UserProfile.objects.filter(user_id=access[api_settings.USER_ID_CLAIM]).first()
+        if profile is not None:
+            data['access'] = str(stamp_role_claims(access, profile))
+        return data
+
+class CustomTokenRefreshView(TokenRefreshView):
+    serializer_class = CustomTokenRefreshSerializer
+
 class CurrentUserProfileView(generics.RetrieveUpdateAPIView):
     serializer_class = CurrentUserAndProfileSerializer
     permission_classes = [IsAuthenticated]
@@ -46,10 +63,14 @@ class BecomeMentorView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request, *args, **kwargs):
-        user_profile = get_object_or_404(UserProfile, user=request.user)
+        # The profile is loaded along with the user during authentication
+        user_profile = getattr(request.user, 'profile', None)
+        if user_profile is None:
+            return Response({'detail': 'User profile not found.'}, status=status.HTTP_404_NOT_FOUND)
         if user_profile.role == 'mentor':
             return Response({'detail': 'You are already a mentor.'}, status=status.HTTP_400_BAD_REQUEST)
 
         user_profile.role = 'mentor'
-        user_profile.save()
+        # The cached profile's counters may be stale; write the role alone (the token version is bumped with F())
+        user_profile.save(update_fields=['role'])
         return Response({'detail': 'Congratulations! You are now a mentor.'}, status=status.HTTP_200_OK)
\ No newline at end of file
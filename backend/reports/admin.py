@@ -0,0 +1,18 @@
+from django.contrib import admin
+
+from .models import MetricRollup, RollupWatermark
+
+
+@admin.register(MetricRollup)
+class MetricRollupAdmin(admin.ModelAdmin):
+    list_display = ('period', 'bucket', 'metric', 'dimension', 'value')
+    list_filter = ('period', 'metric')
+    date_hierarchy = 'bucket'
+    # Rows are written by update_rollups only
+    readonly_fields = list_display
+
+
+@admin.register(RollupWatermark)
+class RollupWatermarkAdmin(admin.ModelAdmin):
+    list_display = ('source', 'created_at', 'last_id', 'updated_at')
+    readonly_fields = list_display
@@ -0,0 +1,144 @@
+# reports/exports.py
+"""
+Streaming exports of bookings, reviews and messages as CSV or NDJSON.
+
+Rows are read with values_list().iterator(chunk_size), which uses a
+server-side cursor on Postgres, and encoded one line at a time. Neither model
+instances nor the whole result are ever held in memory, so the same code serves
+a few rows or several million to a StreamingHttpResponse or a file.
+
+Rows come out in (timestamp, id) order, on the (timestamp, id) indexes.
+Incremental exports pass the previous export's `until` as `since`. Each export
+covers rows with since < timestamp <= until. Timestamps are set before their
+transaction commits, so the default `until` trails the clock by the same
+SETTLE_SECONDS as the rollups; a row committed later than that could still be
+missed.
+
+Under ASGI a StreamingHttpResponse buffers a synchronous iterator whole before
+sending it, so the view hands it async_chunks() instead, which reads batches
+of lines in the request's sync thread.
+"""
+import csv
+from datetime import datetime, time, timedelta
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from bookings.models import Review, SessionBooking
+from messages.models import Message
+from .rollups import SETTLE_SECONDS
+
+CHUNK_SIZE = 2000
+# Lines joined into each chunk sent under ASGI, so the thread hops stay few
+LINES_PER_CHUNK = 500
+FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
+
+class Export:
+    def __init__(self, model, timestamp, columns):
+        self.model = model
+        self.timestamp = timestamp
+        self.columns = columns          # [(header, lookup)]
+
+    @property
+    def headers(self):
+        return [header for header, _ in self.columns]
+
+    def rows(self, since=None, until=None, chunk_size=CHUNK_SIZE):
+        queryset = self.model._default_manager.all()
+        if since is not None:
+            queryset = queryset.filter(**{f'{self.timestamp}__gt': since})
+        if until is not None:
+            queryset = queryset.filter(**{f'{self.timestamp}__lte': until})
+        lookups = [lookup for _, lookup in self.columns]
+        return queryset.order_by(self.timestamp, 'id').values_list(*lookups).iterator(chunk_size=chunk_size)
+
+
+EXPORTS = {
+    'bookings': Export(SessionBooking, 'created_at', [
+        ('id', 'id'), ('created_at', 'created_at'), ('status', 'status'),
+        ('session_date', 'session_date'), ('session_time', 'session_time'), ('duration', 'duration'),
+        ('mentor_profile_id', 'mentor_id'), ('mentor_username', 'mentor__user__username'),
+        ('learner_id', 'learner_id'), ('learner_username', 'learner__username'),
+        ('skill_id', 'skill_id'), ('skill_name', 'skill__name'), ('skill_price', 'skill__price'),
+    ]),
+    'reviews': Export(Review, 'created_at', [
+        ('id', 'id'), ('created_at', 'created_at'), ('rating', 'rating'),
+        ('mentor_profile_id', 'mentor_profile_id'), ('student_id', 'student_id'),
+        ('student_username', 'student__username'), ('skill_id', 'skill_id'), ('comment', 'comment'),
+    ]),
+    'messages': Export(Message, 'timestamp', [
+        ('id', 'id'), ('timestamp', 'timestamp'), ('sender_id', 'sender_id'), ('receiver_id', 'receiver_id'),
+        ('is_read', 'is_read'), ('content', 'content'),
+    ]),
+}
+
+
+def parse_timestamp(value):
+    """ISO datetime or date (midnight) to an aware datetime; None if it cannot be parsed."""
+    try:
+        moment = parse_datetime(value)
+        if moment is None:
+            day = parse_date(value)
+            moment = datetime.combine(day, time.min) if day else None
+    except ValueError:
+        return None
+    if moment is not None and timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def default_until(now=None):
+    """Upper bound of an export when none is given: rows this recent may not all have committed yet."""
+    return (now or timezone.now()) - timedelta(seconds=SETTLE_SECONDS)
+
+
+class _Echo:
+    # csv.writer target that hands each encoded line back instead of buffering it
+    def write(self, value):
+        return value
+
+
+def _isoformat(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+def csv_lines(headers, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(headers)
+    for row in rows:
+        yield writer.writerow([_isoformat(value) for value in row])
+
+
+def ndjson_lines(headers, rows):
+    encoder = DjangoJSONEncoder(ensure_ascii=False, separators=(',', ':'))
+    for row in rows:
+        yield encoder.encode(dict(zip(headers, row))) + '\n'
+
+
+def export_lines(source, fmt, since=None, until=None, chunk_size=CHUNK_SIZE):
+    """Encoded lines (str) of one export; raises KeyError for unknown sources or formats."""
+    export = EXPORTS[source]
+    encode = {'csv': csv_lines, 'ndjson': ndjson_lines}[fmt]
+    return encode(export.headers, export.rows(since, until, chunk_size))
+
+
+def _batches(lines, size):
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= size:
+            yield ''.join(batch)
+            batch = []
+    if batch:
+        yield ''.join(batch)
+
+
+async def async_chunks(lines, size=None):
+    """Async iterator over `lines`, `size` (LINES_PER_CHUNK) at a time; each batch is read with sync_to_async."""
+    batches = _batches(lines, size or LINES_PER_CHUNK)
+    next_batch = sync_to_async(next, thread_sensitive=True)
+    while (chunk := await next_batch(batches, None)) is not None:
+        yield chunk
@@ -0,0 +1,293 @@
+# reports/instrumentation.py
+"""
+Per-request instrumentation. InstrumentationMiddleware records, per method and
+URL route:
+- a latency histogram;
+- responses by status;
+- a histogram of DB queries per request;
+- DB time, serializer time and response bytes.
+
+These are served in the Prometheus text format on /metrics.
+
+- DB queries are counted and timed with connection.execute_wrapper(), so
+  DEBUG does not need to be on.
+- Serializer time is the time spent in the top-level Serializer.data,
+  ListSerializer.data or ValuesSerializer.to_representation() of the request.
+  They are wrapped once when the middleware loads.
+- A sampled share of requests run under cProfile. The profile is written to
+  PROFILE_DIR only when the request turns out slower than PROFILE_SLOW_MS.
+
+Settings come from settings.INSTRUMENTATION. With ENABLED False the middleware
+removes itself from the stack (MiddlewareNotUsed), the serializer hooks are
+never installed, and /metrics answers 404.
+
+/metrics is guarded by METRICS_TOKEN, a bearer token, when one is set, and by
+METRICS_ALLOWED_IPS otherwise. The address check only holds when clients reach
+this process directly: behind a reverse proxy on the same host every request
+comes from 127.0.0.1, so such deployments must set a token.
+
+Each process keeps its own registry: with several workers, each one's series
+cover only the requests it served.
+"""
+import contextvars
+import cProfile
+import hmac
+import logging
+import random
+import re
+import threading
+import time
+from contextlib import ExitStack
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+from rest_framework import serializers
+
+from config.serialization import ValuesSerializer
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ENABLED': True,
+    # Share of requests profiled (0 disables profiling), and the duration that makes a profile worth keeping
+    'PROFILE_SAMPLE_RATE': 0.0,
+    'PROFILE_SLOW_MS': 500,
+    'PROFILE_DIR': 'request-profiles',
+    # Scrapers must send "Authorization: Bearer <token>" when set; otherwise only these client addresses may scrape
+    'METRICS_TOKEN': '',
+    'METRICS_ALLOWED_IPS': ['127.0.0.1', '::1'],
+}
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+UNMATCHED_ROUTE = '<unmatched>'
+# Scrapes are not recorded themselves
+METRICS_ROUTE = 'metrics'
+
+_sample = contextvars.ContextVar('instrumentation_sample', default=None)
+
+
+def instrumentation_settings():
+    return {**DEFAULTS, **getattr(settings, 'INSTRUMENTATION', {})}
+
+
+class Sample:
+    """What one request spent, filled in while it runs."""
+
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.serializer_seconds = 0.0
+        self.serializing = False
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.query_seconds += time.perf_counter() - started
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def lines(self, name, labels):
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+        yield f'{name}_bucket{{{labels},le="+Inf"}} {self.count}'
+        yield f'{name}_sum{{{labels}}} {self.sum}'
+        yield f'{name}_count{{{labels}}} {self.count}'
+
+
+class EndpointStats:
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.responses = {}
+        self.query_seconds = 0.0
+        self.serializer_seconds = 0.0
+        self.response_bytes = 0
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.endpoints = {}         # (method, route) -> EndpointStats
+
+    def record(self, method, route, status, duration, sample, size):
+        with self.lock:
+            stats = self.endpoints.get((method, route))
+            if stats is None:
+                stats = self.endpoints[(method, route)] = EndpointStats()
+            stats.latency.observe(duration)
+            stats.queries.observe(sample.queries)
+            stats.responses[status] = stats.responses.get(status, 0) + 1
+            stats.query_seconds += sample.query_seconds
+            stats.serializer_seconds += sample.serializer_seconds
+            stats.response_bytes += size
+
+    def clear(self):
+        with self.lock:
+            self.endpoints.clear()
+
+    def render(self):
+        with self.lock:
+            endpoints = sorted(self.endpoints.items())
+            sections = {
+                'skillforge_request_duration_seconds': ('histogram', "Request latency.", []),
+                'skillforge_request_db_queries': ('histogram', "DB queries per request.", []),
+                'skillforge_responses_total': ('counter', "Responses by status code.", []),
+                'skillforge_db_query_seconds_total': ('counter', "Time spent in DB queries.", []),
+                'skillforge_serializer_seconds_total': ('counter', "Time spent in DRF serializers.", []),
+                'skillforge_response_bytes_total': ('counter', "Response body bytes (streamed bodies excluded).", []),
+            }
+            for (method, route), stats in endpoints:
+                labels = f'method="{_label(method)}",route="{_label(route)}"'
+                sections['skillforge_request_duration_seconds'][2].extend(
+                    stats.latency.lines('skillforge_request_duration_seconds', labels)
+                )
+                sections['skillforge_request_db_queries'][2].extend(stats.queries.lines('skillforge_request_db_queries', labels))
+                sections['skillforge_responses_total'][2].extend(
+                    f'skillforge_responses_total{{{labels},status="{status}"}} {count}'
+                    for status, count in sorted(stats.responses.items())
+                )
+                for name, value in (
+                    ('skillforge_db_query_seconds_total', stats.query_seconds),
+                    ('skillforge_serializer_seconds_total', stats.serializer_seconds),
+                    ('skillforge_response_bytes_total', stats.response_bytes),
+                ):
+                    sections[name][2].append(f'{name}{{{labels}}} {value}')
+        lines = []
+        for name, (kind, help_text, samples) in sections.items():
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}', *samples]
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+_install_lock = threading.Lock()
+_installed = False
+
+
+def _timed(func):
+    def timed(self, *args, **kwargs):
+        sample = _sample.get()
+        if sample is None or sample.serializing:
+            return func(self, *args, **kwargs)
+        sample.serializing = True
+        started = time.perf_counter()
+        try:
+            return func(self, *args, **kwargs)
+        finally:
+            sample.serializer_seconds += time.perf_counter() - started
+            sample.serializing = False
+    return timed
+
+
+def install_serializer_timing():
+    global _installed
+    with _install_lock:
+        if not _installed:
+            serializers.Serializer.data = property(_timed(serializers.Serializer.data.fget))
+            serializers.ListSerializer.data = property(_timed(serializers.ListSerializer.data.fget))
+            ValuesSerializer.to_representation = _timed(ValuesSerializer.to_representation)
+            _installed = True
+
+
+def _route(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.route if match is not None else UNMATCHED_ROUTE
+
+
+class InstrumentationMiddleware:
+    def __init__(self, get_response):
+        config = instrumentation_settings()
+        if not config['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = config['PROFILE_SAMPLE_RATE']
+        self.slow_seconds = config['PROFILE_SLOW_MS'] / 1000
+        self.profile_dir = Path(config['PROFILE_DIR'])
+        install_serializer_timing()
+
+    def __call__(self, request):
+        sample = Sample()
+        token = _sample.set(sample)
+        profiler = self.start_profiler()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(sample))
+                response = self.get_response(request)
+        finally:
+            duration = time.perf_counter() - started
+            if profiler is not None:
+                profiler.disable()
+            _sample.reset(token)
+
+        route = _route(request)
+        if route != METRICS_ROUTE:
+            size = 0 if response.streaming else len(response.content)
+            registry.record(request.method, route, response.status_code, duration, sample, size)
+        if profiler is not None and duration >= self.slow_seconds:
+            self.save_profile(profiler, request.method, route, duration)
+        return response
+
+    def start_profiler(self):
+        if not self.sample_rate or random.random() >= self.sample_rate:
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is already active on this thread
+            return None
+        return profiler
+
+    def save_profile(self, profiler, method, route, duration):
+        slug = re.sub(r'[^A-Za-z0-9]+', '-', route).strip('-') or 'root'
+        path = self.profile_dir / f"{time.strftime('%Y%m%dT%H%M%S')}-{method}-{slug}-{duration * 1000:.0f}ms.prof"
+        try:
+            self.profile_dir.mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(path)
+        except OSError:
+            logger.warning("profile not saved path=%s", path, exc_info=True)
+            return
+        logger.info("slow request profiled method=%s route=%s duration_ms=%.0f path=%s", method, route, duration * 1000, path)
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint for this process's registry."""
+    config = instrumentation_settings()
+    if not config['ENABLED']:
+        raise Http404
+    if config['METRICS_TOKEN']:
+        allowed = hmac.compare_digest(
+            request.META.get('HTTP_AUTHORIZATION', '').encode(), f"Bearer {config['METRICS_TOKEN']}".encode(),
+        )
+    else:
+        allowed = request.META.get('REMOTE_ADDR') in config['METRICS_ALLOWED_IPS']
+    if not allowed:
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,90 @@
+# reports/management/commands/benchmark_api.py
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test.utils import override_settings
+
+from config.benchmarks import DATASET, compare, load_baseline, prepare_dataset, run_benchmarks, save_baseline
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds a deterministic marketplace and reports p50/p95/p99 latency, throughput and "
+        "queries per request for the serializers and key API endpoints. Everything runs in one "
+        "transaction that is rolled back at the end. Responses are not cached unless --with-cache "
+        "is given. --save-baseline writes the results as JSON; --baseline compares against such "
+        "a file and exits non-zero on regressions."
+    )
+
+    def add_arguments(self, parser):
+        for name, default in DATASET.items():
+            parser.add_argument(f"--{name.replace('_', '-')}", type=int, default=default)
+        parser.add_argument('--runs', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument('--only', default='', help="Comma-separated benchmark name prefixes, e.g. skills.,serializer.")
+        parser.add_argument('--with-cache', action='store_true', help="Keep the configured cache (measures cache hits).")
+        parser.add_argument('--save-baseline', metavar='PATH')
+        parser.add_argument('--baseline', metavar='PATH')
+        parser.add_argument('--tolerance', type=float, default=0.2, help="Allowed p95 growth over the baseline (0.2 = 20%%).")
+
+    def handle(self, *args, **options):
+        if options['runs'] < 1 or options['warmup'] < 0:
+            raise CommandError("--runs must be positive and --warmup not negative.")
+        if any(options[name] < 0 for name in DATASET):
+            raise CommandError("Dataset sizes must not be negative.")
+        if options['mentors'] < 1 or options['learners'] < 1:
+            raise CommandError("--mentors and --learners must be positive.")
+        dataset = {name: options[name] for name in DATASET}
+        baseline = None
+        if options['baseline']:
+            try:
+                baseline = load_baseline(options['baseline'])
+            except (OSError, ValueError) as exc:
+                raise CommandError(f"Cannot read the baseline: {exc}")
+            if baseline.get('dataset') != dataset:
+                self.stderr.write("Warning: the baseline was recorded with a different dataset.")
+
+        only = [prefix.strip() for prefix in options['only'].split(',') if prefix.strip()]
+        overrides = {'ALLOWED_HOSTS': [*settings.ALLOWED_HOSTS, 'testserver']}
+        if not options['with_cache']:
+            overrides['CACHES'] = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+        try:
+            with override_settings(**overrides), transaction.atomic():
+                fixtures = prepare_dataset(**dataset)
+                results = run_benchmarks(fixtures, options['runs'], options['warmup'], only)
+                raise _Rollback
+        except _Rollback:
+            pass
+        except RuntimeError as exc:
+            raise CommandError(str(exc))
+
+        self.report(results, baseline)
+        if options['save_baseline']:
+            save_baseline(options['save_baseline'], results, dataset)
+            self.stdout.write(f"Saved the baseline to {options['save_baseline']}.")
+        if baseline is not None:
+            regressions = compare(results, baseline, options['tolerance'])
+            for message in regressions:
+                self.stderr.write(f"REGRESSION {message}")
+            if regressions:
+                raise CommandError(f"{len(regressions)} regression(s) against {options['baseline']}.")
+            self.stdout.write("No regressions against the baseline.")
+
+    def report(self, results, baseline):
+        header = f"{'benchmark':<34} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'per s':>11} {'queries':>7}"
+        if baseline is not None:
+            header += f" {'base p95':>9}"
+        self.stdout.write(header)
+        for name, result in results.items():
+            line = (
+                f"{name:<34} {result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} {result['p99_ms']:>9.2f} "
+                f"{result['per_second'] or 0:>11,.0f} {result['queries']:>7}"
+            )
+            if baseline is not None:
+                base = baseline['results'].get(name)
+                line += f" {base['p95_ms']:>9.2f}" if base else f" {'-':>9}"
+            self.stdout.write(line)
@@ -0,0 +1,50 @@
+# reports/management/commands/benchmark_connections.py
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from config.benchmarks import run_connection_benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        "Times one GET request through the ASGI application the uvicorn workers serve (or, with "
+        "--interface wsgi, the WSGI handler) with a new database connection per request, with "
+        "persistent connections and (on PostgreSQL with psycopg_pool installed) with psycopg's "
+        "pool, showing what connection setup adds to request latency and how many connections "
+        "each mode opens. Responses are not cached. It reads the existing database, so --path "
+        "should be a read-only endpoint."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/api/skills/public/?page_size=24')
+        parser.add_argument('--runs', type=int, default=200)
+        parser.add_argument('--warmup', type=int, default=10)
+        parser.add_argument('--interface', choices=['asgi', 'wsgi'], default='asgi')
+
+    def handle(self, *args, **options):
+        if options['runs'] < 1 or options['warmup'] < 0:
+            raise CommandError("--runs must be positive and --warmup not negative.")
+        if connection.in_atomic_block:
+            raise CommandError("Cannot measure connection handling inside a transaction.")
+        overrides = {
+            'ALLOWED_HOSTS': [*settings.ALLOWED_HOSTS, 'testserver'],
+            'CACHES': {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}},
+        }
+        try:
+            with override_settings(**overrides):
+                results = run_connection_benchmarks(options['path'], options['runs'], options['warmup'], options['interface'])
+        except RuntimeError as exc:
+            raise CommandError(str(exc))
+
+        baseline = results['reconnect']['p50_ms']
+        self.stdout.write(f"GET {options['path']} on {connection.vendor} over {options['interface'].upper()}")
+        self.stdout.write(
+            f"{'connections':<12} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'per s':>11} {'p50 saved':>10} {'opened':>7}"
+        )
+        for mode, result in results.items():
+            self.stdout.write(
+                f"{mode:<12} {result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} {result['p99_ms']:>9.2f} "
+                f"{result['per_second'] or 0:>11,.0f} {baseline - result['p50_ms']:>10.2f} {result['connections']:>7}"
+            )
@@ -0,0 +1,43 @@
+# reports/management/commands/update_rollups.py
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from reports.rollups import SETTLE_SECONDS, reset_rollups, update_rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Folds bookings and reviews created since the last run into the daily and "
+        "weekly metric rollups served by /api/reports/metrics/. Run it periodically (e.g. from cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--settle-seconds', type=int, default=SETTLE_SECONDS,
+            help="Leave rows younger than this for the next run, so late commits are not skipped.",
+        )
+        parser.add_argument('--since', help="Recompute the rollups from the week of this date (YYYY-MM-DD) on.")
+        parser.add_argument('--rebuild', action='store_true', help="Recompute all rollups from scratch.")
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be positive.")
+        if options['settle_seconds'] < 0:
+            raise CommandError("--settle-seconds must not be negative.")
+        if options['since'] and options['rebuild']:
+            raise CommandError("Use either --since or --rebuild.")
+        if options['since']:
+            try:
+                since = parse_date(options['since'])
+            except ValueError:
+                since = None
+            if since is None:
+                raise CommandError("--since must be a YYYY-MM-DD date.")
+            reset_rollups(since)
+        elif options['rebuild']:
+            reset_rollups()
+
+        processed = update_rollups(options['batch_size'], options['settle_seconds'])
+        for source, count in processed.items():
+            self.stdout.write(f"Folded {count} new {source} row(s) into the rollups.")
@@ -0,0 +1,38 @@
+from django.db import models
+
+
+class MetricRollup(models.Model):
+    """
+    One platform-wide figure for a day or week: e.g. the number of bookings
+    created on 2030-01-07 that were 'accepted', or the reviews of a week that
+    gave 5 stars. Filled in by `manage.py update_rollups` (see reports.rollups).
+    """
+    DAY = 'day'
+    WEEK = 'week'
+    PERIOD_CHOICES = ((DAY, 'Day'), (WEEK, 'Week'))
+
+    period = models.CharField(max_length=4, choices=PERIOD_CHOICES)
+    # The day itself, or the Monday of the week
+    bucket = models.DateField()
+    metric = models.CharField(max_length=32)
+    dimension = models.CharField(max_length=100, blank=True, default='')
+    value = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['period', 'bucket', 'metric', 'dimension'], name='metric_rollup_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.period} {self.bucket} {self.metric}[{self.dimension}] = {self.value}"
+
+
+class RollupWatermark(models.Model):
+    """Position (created_at, id) of the last source row folded into MetricRollup."""
+    source = models.CharField(max_length=32, unique=True)
+    created_at = models.DateTimeField(null=True, blank=True)
+    last_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.source} @ {self.created_at} #{self.last_id}"
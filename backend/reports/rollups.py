@@ -0,0 +1,180 @@
+# reports/rollups.py
+"""
+Platform-wide daily and weekly rollups of bookings and reviews.
+
+Each source table is folded into MetricRollup in created_at order. A
+RollupWatermark row remembers the (created_at, id) of the last row folded in,
+so every run of `manage.py update_rollups` only reads newer rows, through the
+(created_at, id) indexes. Rows younger than a settle delay are left for the
+next run: created_at is set before commit, so a slow transaction can commit a
+row that sorts before ones already visible.
+
+Bookings are counted under the status they had when they were folded in.
+Later status changes of folded bookings move them between status dimensions
+as they happen (follow_booking_status), so bookings_by_status stays current.
+That handler takes the watermark lock, which orders it against fold batches
+as long as the status change is saved inside transaction.atomic(), as the
+booking API does. `update_rollups --since DATE` recomputes buckets from that
+week on.
+Active mentors are derived from the per-mentor booking counts, so reports
+never have to count distinct mentors over raw bookings.
+"""
+from collections import Counter
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from bookings.models import Review, SessionBooking
+from config.dates import week_of
+from .models import MetricRollup, RollupWatermark
+
+BOOKINGS_BY_STATUS = 'bookings_by_status'
+BOOKINGS_BY_CATEGORY = 'bookings_by_category'
+BOOKINGS_BY_MENTOR = 'bookings_by_mentor'
+REVIEWS_BY_RATING = 'reviews_by_rating'
+
+# Rows created within this many seconds of a run are left for the next one
+SETTLE_SECONDS = 60
+
+
+def _booking_metrics(row):
+    yield BOOKINGS_BY_STATUS, row['status']
+    yield BOOKINGS_BY_CATEGORY, row['skill__category'] or ''
+    yield BOOKINGS_BY_MENTOR, str(row['mentor_id'])
+
+
+def _review_metrics(row):
+    yield REVIEWS_BY_RATING, str(row['rating'])
+
+
+# source name -> (model, fields read per row, row -> [(metric, dimension)])
+SOURCES = {
+    'bookings': (SessionBooking, ('status', 'skill__category', 'mentor_id'), _booking_metrics),
+    'reviews': (Review, ('rating',), _review_metrics),
+}
+
+
+def _buckets(created_at):
+    day = timezone.localtime(created_at).date()
+    return ((MetricRollup.DAY, day), (MetricRollup.WEEK, week_of(day)))
+
+
+def _apply(counts):
+    """Adds {(period, bucket, metric, dimension): delta} to the stored rollups."""
+    if not counts:
+        return
+    buckets = [key[1] for key in counts]
+    existing = {
+        (row.period, row.bucket, row.metric, row.dimension): row
+        for row in MetricRollup.objects.filter(
+            bucket__range=(min(buckets), max(buckets)), metric__in={key[2] for key in counts},
+        )
+    }
+    changed, created = [], []
+    for key, delta in counts.items():
+        row = existing.get(key)
+        if row is None:
+            period, bucket, metric, dimension = key
+            created.append(MetricRollup(period=period, bucket=bucket, metric=metric, dimension=dimension, value=delta))
+        else:
+            row.value += delta
+            changed.append(row)
+    MetricRollup.objects.bulk_update(changed, ['value'], batch_size=1000)
+    MetricRollup.objects.bulk_create(created, batch_size=1000)
+
+
+def fold_batch(source, until, batch_size):
+    """
+    Folds the next batch of rows created up to `until` into the rollups and
+    advances the watermark, in one transaction. Returns the number of rows.
+    The watermark row lock keeps concurrent runs from counting a row twice.
+    """
+    model, fields, metrics = SOURCES[source]
+    RollupWatermark.objects.get_or_create(source=source)
+    with transaction.atomic():
+        watermark = RollupWatermark.objects.select_for_update().get(source=source)
+        rows = model.objects.filter(created_at__lte=until)
+        if watermark.created_at is not None:
+            rows = rows.filter(
+                Q(created_at__gt=watermark.created_at) | Q(created_at=watermark.created_at, id__gt=watermark.last_id)
+            )
+        rows = list(rows.order_by('created_at', 'id').values('id', 'created_at', *fields)[:batch_size])
+        if not rows:
+            return 0
+
+        counts = Counter()
+        for row in rows:
+            for period, bucket in _buckets(row['created_at']):
+                for metric, dimension in metrics(row):
+                    counts[period, bucket, metric, dimension] += 1
+        _apply(counts)
+
+        watermark.created_at, watermark.last_id = rows[-1]['created_at'], rows[-1]['id']
+        watermark.save(update_fields=['created_at', 'last_id', 'updated_at'])
+        return len(rows)
+
+
+@receiver(pre_save, sender=SessionBooking)
+def remember_rollup_status(sender, instance, raw=False, **kwargs):
+    # Shares _loaded_status with bookings.counters, so the stored status is read at most once
+    if raw or instance._state.adding:
+        return
+    if getattr(instance, '_loaded_status', None) is None:
+        instance._loaded_status = SessionBooking.objects.filter(pk=instance.pk).values_list('status', flat=True).first()
+    instance._rollup_status = instance._loaded_status
+
+
+@receiver(post_save, sender=SessionBooking)
+def follow_booking_status(sender, instance, created, raw=False, **kwargs):
+    """Moves a folded booking from its old status dimension to the new one."""
+    previous = getattr(instance, '_rollup_status', None)
+    instance._rollup_status = instance.status
+    if raw or created or previous is None or previous == instance.status:
+        return
+    with transaction.atomic():
+        watermark = RollupWatermark.objects.select_for_update().filter(source='bookings').first()
+        if watermark is None or watermark.created_at is None:
+            return
+        if (instance.created_at, instance.pk) > (watermark.created_at, watermark.last_id):
+            return  # not folded in yet; the next run counts the new status
+        counts = Counter()
+        for period, bucket in _buckets(instance.created_at):
+            counts[period, bucket, BOOKINGS_BY_STATUS, previous] -= 1
+            counts[period, bucket, BOOKINGS_BY_STATUS, instance.status] += 1
+        _apply(counts)
+
+
+def update_rollups(batch_size=5000, settle_seconds=SETTLE_SECONDS, now=None):
+    """Folds every settled new row of every source; returns {source: rows}."""
+    until = (now or timezone.now()) - timedelta(seconds=settle_seconds)
+    processed = {}
+    for source in SOURCES:
+        processed[source] = 0
+        while True:
+            count = fold_batch(source, until, batch_size)
+            processed[source] += count
+            if count < batch_size:
+                break
+    return processed
+
+
+@transaction.atomic
+def reset_rollups(since=None):
+    """
+    Drops the rollups from the week of `since` on (all of them when None) and
+    rewinds the watermarks, so the next update recomputes those buckets.
+    """
+    list(RollupWatermark.objects.select_for_update())  # holds off update_rollups runs until the reset commits
+    if since is None:
+        MetricRollup.objects.all().delete()
+        RollupWatermark.objects.all().delete()
+        return
+    start = week_of(since)
+    MetricRollup.objects.filter(bucket__gte=start).delete()
+    # Rows created exactly at the start of that Monday are folded in again
+    start_at = timezone.make_aware(datetime.combine(start, time.min))
+    RollupWatermark.objects.filter(Q(created_at__gte=start_at) | Q(created_at__isnull=True)).update(created_at=start_at, last_id=-1)
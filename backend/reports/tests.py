@@ -0,0 +1,440 @@
+import asyncio
+import csv
+import json
+import os
+import pstats
+import re
+import runpy
+import tempfile
+import warnings
+from datetime import date, datetime, time, timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from asgiref.testing import ApplicationCommunicator
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from bookings.models import Review, SessionBooking
+from messages.models import Message
+from config.dates import week_of
+from config.benchmarks import ENDPOINTS, SERIALIZERS, compare, load_baseline, percentile
+from config.testing import QueryBudgetMixin
+from profiles.models import CustomUser
+from skills.models import Skill
+from .instrumentation import registry
+from .models import MetricRollup, RollupWatermark
+from .rollups import SETTLE_SECONDS, update_rollups
+
+
+def at(day, hour=12):
+    return timezone.make_aware(datetime.combine(day, time(hour)))
+
+
+class RollupTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_user(username='admin', password='pass12345', is_staff=True)
+        cls.learner = CustomUser.objects.create_user(username='learner', password='pass12345')
+        cls.mentors = []
+        for i in range(2):
+            mentor = CustomUser.objects.create_user(username=f'mentor{i}', password='pass12345')
+            mentor.profile.role = 'mentor'
+            mentor.profile.save()
+            cls.mentors.append(mentor)
+        cls.skills = [
+            Skill.objects.create(profile=cls.mentors[0].profile, name='React', price=20, category='Frontend'),
+            Skill.objects.create(profile=cls.mentors[1].profile, name='Django', price=20, category='Backend'),
+        ]
+
+    def book(self, skill, created_at, status='pending'):
+        booking = SessionBooking.objects.create(
+            mentor=skill.profile, learner=self.learner, skill=skill, status=status,
+            session_date=date(2030, 1, 7), session_time=time(9 + SessionBooking.objects.count()),
+        )
+        SessionBooking.objects.filter(pk=booking.pk).update(created_at=created_at)
+        return booking
+
+    def review(self, mentor, rating, created_at):
+        review = Review.objects.create(mentor_profile=mentor.profile, student=self.learner, rating=rating, comment='')
+        Review.objects.filter(pk=review.pk).update(created_at=created_at)
+
+    def metrics(self, user=None, **params):
+        client = APIClient()
+        client.force_authenticate(user=user or self.admin)
+        return client.get('/api/reports/metrics/', params)
+
+    def test_incremental_daily_and_weekly_rollups(self):
+        # 2024-01-08 is a Monday
+        self.book(self.skills[0], at(date(2024, 1, 8)), status='accepted')
+        self.book(self.skills[0], at(date(2024, 1, 9)))
+        self.book(self.skills[1], at(date(2024, 1, 9)))
+        self.review(self.mentors[0], 5, at(date(2024, 1, 9)))
+        now = at(date(2024, 1, 21))
+        self.assertEqual(update_rollups(now=now), {'bookings': 3, 'reviews': 1})
+        self.assertEqual(update_rollups(now=now), {'bookings': 0, 'reviews': 0})
+
+        # Only rows past the watermark are read on the next run
+        self.book(self.skills[1], at(date(2024, 1, 10)), status='completed')
+        self.assertEqual(update_rollups(now=now, batch_size=1), {'bookings': 1, 'reviews': 0})
+
+        # Rollup rows, active mentor counts and the watermarks; never the bookings table
+        with self.assertMaxQueries(3):
+            data = self.metrics(period='day', **{'from': '2024-01-08', 'to': '2024-01-10'}).data
+        self.assertEqual([row['bookings'] for row in data['buckets']], [1, 2, 1])
+        self.assertEqual([row['activeMentors'] for row in data['buckets']], [1, 2, 1])
+        self.assertEqual(data['buckets'][1]['bookingsByCategory'], {'Frontend': 1, 'Backend': 1})
+        self.assertEqual(data['buckets'][1]['reviewsByRating'], {'5': 1})
+
+        week = self.metrics(period='week', **{'from': '2024-01-10', 'to': '2024-01-10'}).data['buckets']
+        self.assertEqual(len(week), 1)
+        self.assertEqual(week[0]['bucket'], date(2024, 1, 8))
+        self.assertEqual(week[0]['bookingsByStatus'], {'accepted': 1, 'pending': 2, 'completed': 1})
+        self.assertEqual((week[0]['activeMentors'], week[0]['reviews']), (2, 1))
+
+        self.assertEqual(self.metrics(**{'from': '2024-02-30'}).status_code, 400)
+        # Buckets past either end of the calendar cannot be built
+        for period in ('day', 'week'):
+            self.assertEqual(self.metrics(period=period, to='9999-12-31').status_code, 400)
+            self.assertEqual(self.metrics(period=period, to='0001-01-05').status_code, 400)
+        with self.assertRaises(CommandError):
+            call_command('update_rollups', '--since', '2024-02-30', stdout=StringIO())
+
+    def test_recent_rows_wait_for_the_settle_delay(self):
+        now = timezone.now()
+        self.book(self.skills[0], now - timedelta(seconds=10))
+        self.assertEqual(update_rollups(now=now, settle_seconds=60)['bookings'], 0)
+        self.assertEqual(update_rollups(now=now + timedelta(minutes=2), settle_seconds=60)['bookings'], 1)
+
+    def test_since_recomputes_changed_statuses(self):
+        booking = self.book(self.skills[0], at(date(2024, 1, 9)))
+        update_rollups(now=at(date(2024, 1, 21)))
+        SessionBooking.objects.filter(pk=booking.pk).update(status='declined')
+
+        call_command('update_rollups', '--since', '2024-01-10', '--settle-seconds', '0', stdout=StringIO())
+        statuses = dict(
+            MetricRollup.objects.filter(period=MetricRollup.WEEK, metric='bookings_by_status').values_list('dimension', 'value')
+        )
+        self.assertEqual(statuses, {'declined': 1})
+        self.assertEqual(RollupWatermark.objects.get(source='bookings').last_id, booking.pk)
+
+    def test_status_changes_follow_folded_bookings(self):
+        folded = self.book(self.skills[0], at(date(2024, 1, 9)))
+        update_rollups(now=at(date(2024, 1, 21)))
+        pending = self.book(self.skills[0], timezone.now())
+        client = APIClient()
+        client.force_authenticate(user=self.mentors[0])
+        for booking, status in ((folded, 'accepted'), (folded, 'completed'), (pending, 'declined')):
+            self.assertEqual(client.patch(f'/api/bookings/{booking.pk}/', {'status': status}).status_code, 200)
+
+        def statuses(bucket):
+            return dict(MetricRollup.objects.filter(
+                period=MetricRollup.WEEK, bucket=bucket, metric='bookings_by_status', value__gt=0,
+            ).values_list('dimension', 'value'))
+
+        # Without a --since rebuild; the booking folded later is counted with its status by then
+        self.assertEqual(statuses(date(2024, 1, 8)), {'completed': 1})
+        update_rollups(settle_seconds=0)
+        self.assertEqual(statuses(week_of(timezone.localdate())), {'declined': 1})
+
+    def test_staff_only(self):
+        self.assertEqual(self.metrics(user=self.learner).status_code, 403)
+        self.assertEqual(self.metrics(period='month').status_code, 400)
+        self.assertEqual(len(self.metrics().data['buckets']), 30)
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_user(username='admin', password='pass12345', is_staff=True)
+        cls.learner = CustomUser.objects.create_user(username='learner', password='pass12345')
+        cls.mentor = CustomUser.objects.create_user(username='mentor', password='pass12345')
+        cls.mentor.profile.role = 'mentor'
+        cls.mentor.profile.save()
+        skill = Skill.objects.create(profile=cls.mentor.profile, name='React', price='20.50')
+        for hour in (9, 10):
+            booking = SessionBooking.objects.create(
+                mentor=cls.mentor.profile, learner=cls.learner, skill=skill,
+                session_date=date(2030, 1, 7), session_time=time(hour),
+            )
+            SessionBooking.objects.filter(pk=booking.pk).update(created_at=at(date(2024, 1, hour)))
+        for day in (1, 2, 3):
+            message = Message.objects.create(sender=cls.learner, receiver=cls.mentor, content=f'Hi, "day" {day}\nbye')
+            Message.objects.filter(pk=message.pk).update(timestamp=at(date(2024, 2, day)))
+
+    def export(self, path, user=None, **params):
+        client = APIClient()
+        client.force_authenticate(user=user or self.admin)
+        return client.get(f'/api/reports/exports/{path}', params)
+
+    def test_csv_export_streams_rows_in_order(self):
+        response = self.export('bookings.csv')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.DictReader(StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual([row['session_time'] for row in rows], ['09:00:00', '10:00:00'])
+        self.assertEqual((rows[0]['mentor_username'], rows[0]['skill_price']), ('mentor', '20.50'))
+
+    def test_incremental_ndjson_export(self):
+        response = self.export('messages.ndjson', since='2024-02-01T12:00:00', until='2024-02-03')
+        self.assertEqual(response['X-Export-Until'], at(date(2024, 2, 3), 0).isoformat())
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([row['content'] for row in rows], ['Hi, "day" 2\nbye'])
+
+        self.assertEqual(self.export('messages.ndjson', since='yesterday').status_code, 400)
+        self.assertEqual(self.export('messages.xml').status_code, 404)
+        self.assertEqual(self.export('bookings.csv', user=self.learner).status_code, 403)
+
+    def test_default_until_lets_late_commits_settle(self):
+        response = self.export('messages.ndjson')
+        until = datetime.fromisoformat(response['X-Export-Until'])
+        self.assertLessEqual(until, timezone.now() - timedelta(seconds=SETTLE_SECONDS))
+
+    def test_export_command(self):
+        out, err = StringIO(), StringIO()
+        call_command('export_data', 'messages', '--format', 'csv', '--since', '2024-02-02', '--chunk-size', '1', stdout=out, stderr=err)
+        rows = list(csv.reader(StringIO(out.getvalue())))
+        self.assertEqual(rows[0], ['id', 'timestamp', 'sender_id', 'receiver_id', 'is_read', 'content'])
+        self.assertEqual([row[5] for row in rows[1:]], ['Hi, "day" 2\nbye', 'Hi, "day" 3\nbye'])
+        self.assertIn('Exported 3 line(s)', err.getvalue())
+
+
+class ASGITests(TransactionTestCase):
+    # The ASGI handler runs the view in a thread of its own, which a TestCase transaction would lock out
+    def test_asgi_exports_stream_in_chunks(self):
+        from config.asgi import application
+
+        admin = CustomUser.objects.create_user(username='admin', password='pass12345', is_staff=True)
+        for day in (1, 2, 3):
+            message = Message.objects.create(sender=admin, receiver=admin, content=f'Day {day}')
+            Message.objects.filter(pk=message.pk).update(timestamp=at(date(2024, 2, day)))
+
+        async def export():
+            token = AccessToken.for_user(admin)
+            communicator = ApplicationCommunicator(application, {
+                'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+                'path': '/api/reports/exports/messages.ndjson', 'raw_path': b'/api/reports/exports/messages.ndjson',
+                'query_string': b'', 'root_path': '', 'client': ('127.0.0.1', 50000), 'server': ('testserver', 80),
+                'headers': [(b'host', b'testserver'), (b'authorization', f'Bearer {token}'.encode())],
+            })
+            await communicator.send_input({'type': 'http.request', 'body': b'', 'more_body': False})
+            messages = [await communicator.receive_output()]
+            while messages[-1]['type'] == 'http.response.start' or messages[-1].get('more_body'):
+                messages.append(await communicator.receive_output())
+            await communicator.wait()
+            return messages
+
+        with mock.patch('reports.exports.LINES_PER_CHUNK', 1), warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            start, *bodies = async_to_sync(export)()
+        self.assertEqual(start['status'], 200)
+        chunks = [message['body'] for message in bodies if message.get('body')]
+        # One chunk per line rather than the whole export buffered into one body
+        self.assertEqual(len(chunks), 3)
+        self.assertEqual([json.loads(chunk)['content'] for chunk in chunks], ['Day 1', 'Day 2', 'Day 3'])
+        self.assertFalse([warning for warning in caught if 'synchronous iterators' in str(warning.message)])
+
+
+    def test_slow_readers_give_their_slot_back(self):
+        from config.asgi import application
+
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+            'path': '/api/skills/public/', 'raw_path': b'/api/skills/public/', 'query_string': b'', 'root_path': '',
+            'client': ('127.0.0.1', 50000), 'server': ('testserver', 80), 'headers': [(b'host', b'testserver')],
+        }
+
+        def receiver():
+            requests = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+
+            async def receive():
+                if requests:
+                    return requests.pop()
+                await asyncio.Event().wait()  # cancelled once the response is sent
+            return receive
+
+        async def run():
+            reading = asyncio.Event()
+            statuses = []
+
+            async def slow_send(message):
+                if message['type'] == 'http.response.body':
+                    await reading.wait()
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    statuses.append(message['status'])
+
+            with mock.patch('config.asgi.http_slots', asyncio.Semaphore(1)):
+                slow = asyncio.create_task(application(dict(scope), receiver(), slow_send))
+                # The first response is stuck sending its body, yet the only slot is free again
+                await asyncio.wait_for(application(dict(scope), receiver(), send), timeout=10)
+                reading.set()
+                await slow
+            return statuses
+
+        self.assertEqual(async_to_sync(run)(), [200])
+
+
+class BenchmarkTests(TestCase):
+    def test_percentiles_and_regressions(self):
+        samples = list(range(1, 101))
+        self.assertEqual([percentile(samples, pct) for pct in (50, 95, 99)], [50, 95, 99])
+        baseline = {'results': {'skills.public': {'p95_ms': 10.0, 'queries': 1}}}
+        self.assertEqual(compare({'skills.public': {'p95_ms': 12.0, 'queries': 1}}, baseline), [])
+        self.assertEqual(len(compare({'skills.public': {'p95_ms': 20.0, 'queries': 2}}, baseline)), 2)
+
+    def test_command_saves_and_checks_a_baseline(self):
+        path = os.path.join(self.enterContext(tempfile.TemporaryDirectory()), 'baseline.json')
+        sizes = ['--mentors', '2', '--learners', '4', '--skills-per-mentor', '2', '--bookings', '20',
+                 '--reviews', '4', '--messages', '20', '--runs', '2', '--warmup', '0']
+        out = StringIO()
+        call_command('benchmark_api', *sizes, '--save-baseline', path, stdout=out)
+        results = load_baseline(path)['results']
+        self.assertEqual(set(results), {name for name, _, _ in SERIALIZERS} | {endpoint.name for endpoint in ENDPOINTS})
+        self.assertFalse(CustomUser.objects.exists())
+
+        for result in results.values():
+            result['queries'] = 0
+        with open(path, 'w') as f:
+            json.dump({'results': results}, f)
+        with self.assertRaisesMessage(CommandError, 'regression(s)'):
+            call_command('benchmark_api', *sizes, '--only', 'skills.facets', '--baseline', path, stdout=StringIO(), stderr=StringIO())
+
+
+class InstrumentationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        mentor = CustomUser.objects.create_user(username='mentor', password='pass12345')
+        mentor.profile.role = 'mentor'
+        mentor.profile.save()
+        for i in range(3):
+            Skill.objects.create(profile=mentor.profile, name=f'Skill {i}', price=10)
+
+    def setUp(self):
+        registry.clear()
+        cache.clear()
+
+    def scrape(self, **extra):
+        return Client().get('/metrics', **extra)
+
+    def test_requests_are_recorded_per_route(self):
+        Client().get('/api/skills/public/')
+        Client().get('/api/skills/public/', {'min_price': 'cheap'})
+        response = self.scrape()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        body = response.content.decode()
+        labels = 'method="GET",route="api/skills/public/"'
+        self.assertIn(f'skillforge_request_duration_seconds_count{{{labels}}} 2', body)
+        self.assertIn(f'skillforge_responses_total{{{labels},status="200"}} 1', body)
+        self.assertIn(f'skillforge_responses_total{{{labels},status="400"}} 1', body)
+        # The list runs one query; the rejected filter none
+        self.assertIn(f'skillforge_request_db_queries_bucket{{{labels},le="1"}} 2', body)
+        serializer_seconds = re.search(rf'skillforge_serializer_seconds_total\{{{labels}\}} (\S+)', body).group(1)
+        self.assertGreater(float(serializer_seconds), 0)
+        self.assertNotIn('route="metrics"', body)
+
+        self.assertEqual(self.scrape(REMOTE_ADDR='10.0.0.8').status_code, 403)
+        with override_settings(INSTRUMENTATION={'ENABLED': False}):
+            self.assertEqual(self.scrape().status_code, 404)
+
+    def test_token_replaces_the_address_check(self):
+        # Behind a same-host proxy every client looks like 127.0.0.1
+        with override_settings(INSTRUMENTATION={'METRICS_TOKEN': 's3cret'}):
+            self.assertEqual(self.scrape().status_code, 403)
+            self.assertEqual(self.scrape(HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+            self.assertEqual(self.scrape(REMOTE_ADDR='10.0.0.8', HTTP_AUTHORIZATION='Bearer s3cret').status_code, 200)
+
+    def test_slow_sampled_requests_are_profiled(self):
+        directory = self.enterContext(tempfile.TemporaryDirectory())
+        with override_settings(INSTRUMENTATION={'PROFILE_SAMPLE_RATE': 1, 'PROFILE_SLOW_MS': 0, 'PROFILE_DIR': directory}):
+            Client().get('/api/skills/public/')
+        profiles = os.listdir(directory)
+        self.assertEqual(len(profiles), 1)
+        self.assertIn('-GET-api-skills-public-', profiles[0])
+        pstats.Stats(os.path.join(directory, profiles[0]))
+
+
+class ProductionSettingsTests(TestCase):
+    SETTINGS_PATH = Path(__file__).resolve().parent.parent / 'config' / 'settings.py'
+
+    def load(self, **environ):
+        with mock.patch.dict(os.environ, environ):
+            for name in [name for name in os.environ if name.startswith('SKILLFORGE_') and name not in environ]:
+                del os.environ[name]
+            return runpy.run_path(str(self.SETTINGS_PATH))
+
+    def test_profiles(self):
+        development = self.load()
+        self.assertTrue(development['DEBUG'])
+        self.assertEqual(development['DATABASES']['default']['CONN_MAX_AGE'], 0)
+
+        with self.assertRaises(ImproperlyConfigured):
+            self.load(SKILLFORGE_ENV='production')
+        production = self.load(
+            SKILLFORGE_ENV='production', SKILLFORGE_SECRET_KEY='s3cret', SKILLFORGE_ALLOWED_HOSTS='api.example.com, ',
+            SKILLFORGE_DB_HOST='db', SKILLFORGE_THREADS='4', SKILLFORGE_CACHE_URL='redis://cache:6379/0',
+        )
+        self.assertFalse(production['DEBUG'])
+        self.assertFalse(production['CORS_ALLOW_ALL_ORIGINS'])
+        self.assertEqual(production['ALLOWED_HOSTS'], ['api.example.com'])
+        database = production['DATABASES']['default']
+        # uvicorn workers by default, which cannot reuse persistent connections
+        self.assertEqual((database['HOST'], database['CONN_MAX_AGE']), ('db', 0))
+        self.assertEqual(production['SERVER']['THREADS'], 4)
+        self.assertEqual(production['CACHES']['default']['LOCATION'], 'redis://cache:6379/0')
+        # Pushes cross workers over the same Redis
+        notifications = production['NOTIFICATIONS']
+        self.assertEqual(notifications['BROKER'], 'notifications.brokers.TransportBroker')
+        self.assertEqual(notifications['OPTIONS']['transport_options'], {'url': 'redis://cache:6379/0'})
+        self.assertEqual(development['NOTIFICATIONS']['BROKER'], 'notifications.brokers.LocalBroker')
+        # No scrapes by address until SKILLFORGE_METRICS_TOKEN is set
+        self.assertEqual(production['INSTRUMENTATION']['METRICS_ALLOWED_IPS'], [])
+
+    def test_wsgi_workers_keep_persistent_connections(self):
+        production = self.load(SKILLFORGE_ENV='production', SKILLFORGE_SECRET_KEY='s3cret', SKILLFORGE_WORKER_CLASS='gthread', SKILLFORGE_WORKERS='1')
+        self.assertEqual(production['DATABASES']['default']['CONN_MAX_AGE'], 60)
+        self.assertEqual(production['CACHES']['default']['BACKEND'], 'django.core.cache.backends.locmem.LocMemCache')
+
+    def test_several_workers_need_a_shared_cache_and_broker(self):
+        with self.assertRaises(ImproperlyConfigured):
+            self.load(SKILLFORGE_ENV='production', SKILLFORGE_SECRET_KEY='s3cret', SKILLFORGE_WORKERS='3')
+        with self.assertRaisesMessage(ImproperlyConfigured, 'SKILLFORGE_NOTIFICATIONS_URL'):
+            self.load(
+                SKILLFORGE_ENV='production', SKILLFORGE_SECRET_KEY='s3cret', SKILLFORGE_WORKERS='3',
+                SKILLFORGE_CACHE_URL='redis://cache:6379/0', SKILLFORGE_NOTIFICATIONS_URL='',
+            )
+
+    def test_pool_replaces_persistent_connections(self):
+        database = self.load(SKILLFORGE_ENV='production', SKILLFORGE_SECRET_KEY='s3cret', SKILLFORGE_DB_POOL_SIZE='8', SKILLFORGE_WORKERS='1')['DATABASES']['default']
+        self.assertEqual(database['CONN_MAX_AGE'], 0)
+        self.assertEqual(database['OPTIONS']['pool'], {'min_size': 2, 'max_size': 8, 'timeout': 10})
+
+
+class ConnectionBenchmarkTests(TransactionTestCase):
+    def test_command_times_each_mode_and_restores_settings(self):
+        original = dict(connection.settings_dict)
+        out = StringIO()
+        call_command('benchmark_connections', '--runs', '3', '--warmup', '1', stdout=out)
+        self.assertIn('over ASGI', out.getvalue())
+        self.assertRegex(out.getvalue(), r'(?m)^reconnect\s')
+        self.assertRegex(out.getvalue(), r'(?m)^persistent\s')
+        self.assertEqual(connection.settings_dict, original)
+
+        out = StringIO()
+        call_command('benchmark_connections', '--runs', '3', '--warmup', '1', '--interface', 'wsgi', stdout=out)
+        self.assertIn('over WSGI', out.getvalue())
+        self.assertEqual(connection.settings_dict, original)
+
+        with self.assertRaises(CommandError):
+            call_command('benchmark_connections', '--path', '/api/nowhere/', '--runs', '1', stdout=StringIO())
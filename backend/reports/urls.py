@@ -0,0 +1,13 @@
+from django.urls import path, re_path
+
+from .exports import EXPORTS, FORMATS
+from .views import ExportView, MetricsView
+
+urlpatterns = [
+    path('metrics/', MetricsView.as_view(), name='report-metrics'),
+    # e.g. exports/bookings.csv, exports/messages.ndjson
+    re_path(
+        rf'^exports/(?P<source>{"|".join(EXPORTS)})\.(?P<ext>{"|".join(FORMATS)})$',
+        ExportView.as_view(), name='report-export',
+    ),
+]
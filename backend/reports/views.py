@@ -0,0 +1,100 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Count
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError as DRFValidationError
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from config.dates import query_date, week_of
+from .exports import FORMATS, async_chunks, default_until, export_lines, parse_timestamp
+from .models import MetricRollup, RollupWatermark
+from .rollups import BOOKINGS_BY_CATEGORY, BOOKINGS_BY_MENTOR, BOOKINGS_BY_STATUS, REVIEWS_BY_RATING
+
+
+class MetricsView(APIView):
+    # Staff-only platform metrics, read from the rollups only (see reports.rollups)
+    permission_classes = [IsAdminUser]
+    default_buckets = {MetricRollup.DAY: 30, MetricRollup.WEEK: 12}
+    max_buckets = 366
+    step = {MetricRollup.DAY: timedelta(days=1), MetricRollup.WEEK: timedelta(weeks=1)}
+
+    def get(self, request):
+        period = request.query_params.get('period', MetricRollup.DAY)
+        if period not in self.step:
+            raise DRFValidationError({'period': f"Must be one of: {', '.join(self.step)}."})
+        step = self.step[period]
+        align = week_of if period == MetricRollup.WEEK else (lambda day: day)
+
+        # query_date() refuses dates within a year of date.min/date.max, so the bucket arithmetic below stays in range
+        to_day = align(query_date(request.query_params, 'to', timezone.localdate()))
+        from_day = align(query_date(request.query_params, 'from', to_day - step * (self.default_buckets[period] - 1)))
+        if to_day < from_day:
+            raise DRFValidationError({'to': "Must not be before 'from'."})
+        if (to_day - from_day) // step >= self.max_buckets:
+            raise DRFValidationError({'to': f"At most {self.max_buckets} buckets can be requested at once."})
+
+        buckets = {}
+        day = from_day
+        while day <= to_day:
+            buckets[day] = {
+                'bucket': day, 'bookings': 0, 'reviews': 0, 'activeMentors': 0,
+                'bookingsByStatus': defaultdict(int), 'bookingsByCategory': defaultdict(int), 'reviewsByRating': defaultdict(int),
+            }
+            day += step
+
+        rollups = MetricRollup.objects.filter(period=period, bucket__range=(from_day, to_day))
+        for bucket, metric, dimension, value in rollups.exclude(metric=BOOKINGS_BY_MENTOR).values_list(
+            'bucket', 'metric', 'dimension', 'value',
+        ):
+            row = buckets[bucket]
+            if metric == BOOKINGS_BY_STATUS:
+                row['bookingsByStatus'][dimension] += value
+                row['bookings'] += value
+            elif metric == BOOKINGS_BY_CATEGORY:
+                row['bookingsByCategory'][dimension] += value
+            elif metric == REVIEWS_BY_RATING:
+                row['reviewsByRating'][dimension] += value
+                row['reviews'] += value
+        # One rollup row per mentor with bookings in the bucket
+        active = rollups.filter(metric=BOOKINGS_BY_MENTOR, value__gt=0).values('bucket').annotate(mentors=Count('id')).order_by()
+        for row in active:
+            buckets[row['bucket']]['activeMentors'] = row['mentors']
+
+        return Response({
+            'period': period,
+            'from': from_day,
+            'to': to_day,
+            'watermarks': dict(RollupWatermark.objects.values_list('source', 'created_at')),
+            'buckets': list(buckets.values()),
+        })
+
+
+class ExportView(APIView):
+    # Staff-only streaming dumps; see reports.exports
+    permission_classes = [IsAdminUser]
+
+    def parse_timestamp(self, name):
+        value = self.request.query_params.get(name)
+        if not value:
+            return None
+        moment = parse_timestamp(value)
+        if moment is None:
+            raise DRFValidationError({name: "Use an ISO 8601 date or date-time."})
+        return moment
+
+    def get(self, request, source, ext):
+        since = self.parse_timestamp('since')
+        # Fixing the upper bound up front gives the caller the `since` for the next export
+        until = self.parse_timestamp('until') or default_until()
+        lines = export_lines(source, ext, since, until)
+        if isinstance(request._request, ASGIRequest):
+            lines = async_chunks(lines)
+        response = StreamingHttpResponse(lines, content_type=FORMATS[ext])
+        response['Content-Disposition'] = f'attachment; filename="{source}-{until:%Y%m%dT%H%M%S}.{ext}"'
+        response['X-Export-Until'] = until.isoformat()
+        return response
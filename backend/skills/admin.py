@@ -1,6 +1,7 @@
 from django.contrib import admin
 from .models import Skill
 from .models import Availability
+from .models import Tag
 
 @admin.register(Skill)
 class SkillAdmin(admin.ModelAdmin):
@@ -25,3 +26,9 @@ class AvailabilityAdmin(admin.ModelAdmin):
     search_fields = ('mentor__username', 'day_of_week')
     list_filter = ('day_of_week',)
     ordering = ('mentor', 'day_of_week')
+
+@admin.register(Tag)
+class TagAdmin(admin.ModelAdmin):
+    # Tags are created from Skill.tags on save (skills.tags); rename or merge them there
+    list_display = ('name',)
+    search_fields = ('name',)
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class SkillsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'skills'
+
+    def ready(self):
+        from . import caching, recommendations, search, slots, tags  # noqa: F401  registers the cache, recommendation, search, slot index and tag signal handlers
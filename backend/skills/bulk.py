@@ -0,0 +1,166 @@
+# skills/bulk.py
+"""
+Bulk skill import. A batch of rows is validated in memory, then written with
+one `INSERT ... ON CONFLICT (profile_id, name) DO UPDATE` per group of rows
+that supply the same fields, so re-importing a catalogue updates it in place
+and an omitted column never overwrites stored data. Invalid rows are reported
+by index and skipped; the valid ones are still written.
+
+bulk_create() neither calls save() nor sends signals, so the tag links, rank
+scores, search documents and the public catalogue cache are refreshed here.
+"""
+import csv
+import io
+
+from django.db import connection, transaction
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+from profiles.models import UserProfile
+from .caching import invalidate_catalogue
+from .models import Skill
+from .ranking import refresh_rank_scores, skill_rank_score
+from .search import refresh_search_vectors, skill_index
+from .serializers import SkillSerializer
+from .tags import sync_skill_tags
+
+# Rows accepted by one import
+MAX_BULK_SKILLS = 1000
+INSERT_BATCH_SIZE = 500
+# CSV cells holding several tags separate them with this
+TAG_SEPARATOR = ';'
+
+
+class CSVTextParser(BaseParser):
+    """Parses a text/csv body into a list of row dicts keyed by the header line."""
+    media_type = 'text/csv'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', 'utf-8')
+        return csv_rows(decode_csv(stream.read(), encoding))
+
+
+def decode_csv(data, encoding):
+    try:
+        return data.decode(encoding)
+    except (UnicodeDecodeError, LookupError):
+        raise ParseError(f"The CSV is not valid {encoding} text.")
+
+
+def csv_rows(text):
+    rows = []
+    try:
+        records = list(csv.DictReader(io.StringIO(text)))
+    except csv.Error as exc:
+        raise ParseError(f"Malformed CSV: {exc}")
+    for row in records:
+        row = {key.strip(): value for key, value in row.items() if key and value not in (None, '')}
+        if 'tags' in row:
+            row['tags'] = [tag.strip() for tag in row['tags'].split(TAG_SEPARATOR) if tag.strip()]
+        rows.append(row)
+    return rows
+
+
+def _mentor_ids(rows, default_profile_id, allow_mentor_field):
+    """Target profile per row, or an error message; staff imports name the mentor per row."""
+    requested = set()
+    for row in rows:
+        if allow_mentor_field and isinstance(row, dict) and row.get('mentor') not in (None, ''):
+            requested.add(str(row['mentor']))
+    mentors = set()
+    numeric = [int(value) for value in requested if value.isdigit()]
+    if numeric:
+        mentors = {str(pk) for pk in UserProfile.objects.filter(pk__in=numeric, role='mentor').values_list('pk', flat=True)}
+
+    targets = []
+    for row in rows:
+        value = row.get('mentor') if allow_mentor_field and isinstance(row, dict) else None
+        if value in (None, ''):
+            targets.append(default_profile_id or {'mentor': ["This field is required."]})
+        elif str(value) in mentors:
+            targets.append(int(value))
+        else:
+            targets.append({'mentor': [f"No mentor profile with id {value}."]})
+    return targets
+
+
+def upsert_skills(rows, profile_id=None, allow_mentor_field=False):
+    """
+    Creates or updates one skill per row (keyed by mentor and name) and
+    returns (results, errors): results are {'row', 'id', 'name', 'created'}
+    and errors {'row', 'errors'}, both in row order.
+    """
+    errors = []
+    valid = []  # (index, profile_id, validated_data)
+    seen = {}
+    for index, (row, target) in enumerate(zip(rows, _mentor_ids(rows, profile_id, allow_mentor_field))):
+        if not isinstance(row, dict):
+            errors.append({'row': index, 'errors': {'non_field_errors': ["Expected an object."]}})
+            continue
+        if isinstance(target, dict):
+            errors.append({'row': index, 'errors': target})
+            continue
+        serializer = SkillSerializer(data={key: value for key, value in row.items() if key != 'mentor'})
+        if not serializer.is_valid():
+            errors.append({'row': index, 'errors': serializer.errors})
+            continue
+        key = (target, serializer.validated_data['name'])
+        if key in seen:
+            errors.append({'row': index, 'errors': {'name': [f"Duplicate of row {seen[key]}."]}})
+            continue
+        seen[key] = index
+        valid.append((index, target, serializer.validated_data))
+    if not valid:
+        return [], errors
+
+    # Rows that supply the same columns share one upsert, which only overwrites those columns
+    groups = {}
+    for index, target, data in valid:
+        groups.setdefault(frozenset(data), []).append((index, target, data))
+
+    existing = set(
+        Skill.objects.filter(
+            profile_id__in={target for _, target, _ in valid}, name__in={data['name'] for _, _, data in valid},
+        ).values_list('profile_id', 'name')
+    )
+    results = []
+    skills_by_group = {}
+    with transaction.atomic():
+        for fields, members in groups.items():
+            new_skills = [Skill(profile_id=target, **data) for _, target, data in members]
+            for skill in new_skills:
+                # Right for inserted rows; updated ones keep their stored score unless the price changes below
+                skill.rank_score = skill_rank_score(skill)
+            skills = skills_by_group[fields] = Skill.objects.bulk_create(
+                new_skills,
+                batch_size=INSERT_BATCH_SIZE,
+                update_conflicts=True,
+                unique_fields=['profile', 'name'],
+                update_fields=sorted(fields - {'name'}) or ['name'],
+            )
+            for (index, target, data), skill in zip(members, skills):
+                results.append({
+                    'row': index, 'id': skill.pk, 'name': skill.name, 'created': (target, data['name']) not in existing,
+                })
+        results.sort(key=lambda result: result['row'])
+        repriced = [
+            skill.pk for fields, members in groups.items() if 'price' in fields
+            for (_, target, data), skill in zip(members, skills_by_group[fields]) if (target, data['name']) in existing
+        ]
+        if repriced:
+            refresh_rank_scores(repriced)
+        # Rows without a tags column keep their stored tags
+        sync_skill_tags({
+            skill.pk: data['tags'] for fields, members in groups.items() if 'tags' in fields
+            for (_, _, data), skill in zip(members, skills_by_group[fields])
+        })
+        _refresh_catalogue([result['id'] for result in results])
+    return results, errors
+
+
+def _refresh_catalogue(skill_ids):
+    if connection.vendor == 'postgresql':
+        refresh_search_vectors(Skill.objects.filter(pk__in=skill_ids))
+    else:
+        transaction.on_commit(lambda: skill_index.update(skill_ids))
+    invalidate_catalogue()
@@ -0,0 +1,101 @@
+# skills/caching.py
+"""
+Response cache for the anonymous catalogue endpoints. Serialized responses
+are stored in the default Django cache under a key made of the catalogue
+generation and the request's query parameters; the generation is a counter
+bumped after any committed change that can alter a listing (skills, mentor
+profiles and usernames, rating and session counters). Old entries are never
+deleted, they simply stop being addressed and expire.
+
+The ETag is derived from the same generation and key, so a client revalidating
+with If-None-Match gets a 304 after a single cache read and no queries.
+"""
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+from profiles.models import CustomUser, UserProfile
+from .models import Skill
+
+GENERATION_KEY = 'skills:catalogue:generation'
+# Entries outlive their generation at most this long
+CACHE_TIMEOUT = 10 * 60
+
+
+def catalogue_generation():
+    return cache.get(GENERATION_KEY, 0)
+
+
+def _bump():
+    cache.add(GENERATION_KEY, 0, timeout=None)
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, 1, timeout=None)
+
+
+def invalidate_catalogue():
+    """Makes every cached listing stale once the current transaction commits."""
+    transaction.on_commit(_bump)
+
+
+class CachedListMixin:
+    """
+    For anonymous ListAPIViews whose output depends only on the query string
+    and the catalogue. Only successful responses are cached; other anonymous
+    views can wrap their own response with cached_response().
+    """
+    cache_prefix = 'skills:list'
+    cache_timeout = CACHE_TIMEOUT
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, lambda: super(CachedListMixin, self).list(request, *args, **kwargs))
+
+    def cached_response(self, request, build):
+        """Serves build()'s response from the cache, or a 304, for this query string and catalogue generation."""
+        generation = catalogue_generation()
+        # Paginated responses embed absolute next/previous links, hence the host
+        params = json.dumps([request.get_host(), request.path, sorted(request.query_params.lists())])
+        digest = hashlib.sha1(params.encode()).hexdigest()
+        etag = f'"{generation}-{digest[:20]}"'
+
+        # Weak comparison: CompressionMiddleware marks the ETag of compressed responses weak
+        if etag in {tag.removeprefix('W/') for tag in parse_etags(request.headers.get('If-None-Match', ''))}:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            key = f'{self.cache_prefix}:{generation}:{digest}'
+            data = cache.get(key)
+            if data is not None:
+                response = Response(data)
+            else:
+                response = build()
+                if response.status_code == status.HTTP_200_OK:
+                    cache.set(key, response.data, self.cache_timeout)
+        response['ETag'] = etag
+        # Let browsers keep the body but revalidate before reusing it
+        response['Cache-Control'] = 'no-cache'
+        return response
+
+
+@receiver(post_save, sender=Skill)
+@receiver(post_delete, sender=Skill)
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_on_catalogue_change(sender, raw=False, **kwargs):
+    if not raw:
+        invalidate_catalogue()
+
+
+@receiver(post_save, sender=CustomUser)
+def invalidate_on_username_change(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    # Listings show mentor usernames; new users and last_login updates cannot change them
+    if raw or created or (update_fields is not None and 'username' not in update_fields):
+        return
+    invalidate_catalogue()
@@ -0,0 +1,39 @@
+# skills/facets.py
+"""
+Facet counts (tags, categories, levels) for a filtered public catalogue. The
+three GROUP BYs are sent as one UNION ALL query; tag counts come from the
+SkillTag links rather than from the Skill.tags JSON.
+"""
+from django.db.models import CharField, Count, F, Value
+
+from .models import SkillTag
+
+FACETS = ('tags', 'categories', 'levels')
+# Tags beyond this many (by count) are left out of the response
+MAX_TAG_FACETS = 100
+
+
+def skill_facets(skills):
+    """{'tags': [{'name', 'count'}], 'categories': [...], 'levels': [...]} for the skills queryset."""
+    skills = skills.order_by()
+    facet = lambda name: Value(name, output_field=CharField())  # noqa: E731
+    tags = (
+        SkillTag.objects.filter(skill__in=skills.values('id'))
+        .values(facet=facet('tags'), value=F('tag__name')).annotate(count=Count('skill_id')).order_by()
+    )
+    categories = (
+        skills.filter(category__gt='')
+        .values(facet=facet('categories'), value=F('category')).annotate(count=Count('id')).order_by()
+    )
+    levels = (
+        skills.filter(level__gt='')
+        .values(facet=facet('levels'), value=F('level')).annotate(count=Count('id')).order_by()
+    )
+
+    result = {name: [] for name in FACETS}
+    for row in tags.union(categories, levels, all=True):
+        result[row['facet']].append({'name': row['value'], 'count': row['count']})
+    for name, rows in result.items():
+        rows.sort(key=lambda row: (-row['count'], row['name']))
+    result['tags'] = result['tags'][:MAX_TAG_FACETS]
+    return result
@@ -0,0 +1,90 @@
+# skills/filters.py
+from decimal import Decimal, InvalidOperation
+
+from rest_framework.exceptions import ValidationError as DRFValidationError
+
+from .models import SkillTag
+
+# Integer query parameters beyond a 64-bit column cannot match anything and overflow in the database
+MAX_INT = 2 ** 63 - 1
+
+
+def _parse_decimal(params, name):
+    value = params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        number = Decimal(value)
+    except (InvalidOperation, ValueError):
+        number = None
+    # Decimal() also accepts NaN and Infinity, which no price column can compare with
+    if number is None or not number.is_finite():
+        raise DRFValidationError({name: "Must be a number."})
+    return number
+
+
+def _parse_int(params, name):
+    value = params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        number = int(value)
+    except ValueError:
+        raise DRFValidationError({name: "Must be an integer."})
+    if not -MAX_INT - 1 <= number <= MAX_INT:
+        raise DRFValidationError({name: "Out of range."})
+    return number
+
+
+# ?ordering= values for the public catalogue, each served by a partial index on active skills
+PUBLIC_ORDERINGS = {
+    'newest': ('-id',),
+    'best_match': ('-rank_score', '-id'),
+    'price': ('price', '-id'),
+}
+
+
+def public_ordering(params):
+    value = params.get('ordering') or 'newest'
+    if value not in PUBLIC_ORDERINGS:
+        raise DRFValidationError({'ordering': f"Use one of: {', '.join(PUBLIC_ORDERINGS)}."})
+    return PUBLIC_ORDERINGS[value]
+
+
+def filter_by_tag(queryset, tag):
+    # Tag name (unique index) -> its SkillTag links (skill_tag_unique leads with tag)
+    return queryset.filter(pk__in=SkillTag.objects.filter(tag__name=tag).values('skill_id'))
+
+
+def filter_public_skills(queryset, params):
+    """
+    Applies the public catalogue filters from the query string:
+    ?category=&level=&min_price=&max_price=&tags=a,b&mentor=<user id>
+    Every filter maps onto a column covered by one of the Skill indexes.
+    """
+    category = params.get('category')
+    if category:
+        queryset = queryset.filter(category=category)
+
+    level = params.get('level')
+    if level:
+        queryset = queryset.filter(level=level)
+
+    min_price = _parse_decimal(params, 'min_price')
+    if min_price is not None:
+        queryset = queryset.filter(price__gte=min_price)
+
+    max_price = _parse_decimal(params, 'max_price')
+    if max_price is not None:
+        queryset = queryset.filter(price__lte=max_price)
+
+    tags = params.get('tags')
+    if tags:
+        for tag in [t.strip() for t in tags.split(',') if t.strip()]:
+            queryset = filter_by_tag(queryset, tag)
+
+    mentor = _parse_int(params, 'mentor')
+    if mentor is not None:
+        queryset = queryset.filter(profile__user_id=mentor)
+
+    return queryset
@@ -0,0 +1,94 @@
+# skills/management/commands/benchmark_skill_import.py
+import statistics
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from profiles.models import CustomUser, UserProfile
+from skills.models import Skill
+from skills.views import SkillViewSet
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares importing skills one POST /api/skills/ at a time with one "
+        "POST /api/skills/bulk/, for a fresh insert and a re-import that updates "
+        "every row. Everything runs in one transaction that is rolled back at the end."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--skills', type=int, default=500)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        count, repeat = options['skills'], options['repeat']
+        if count < 1 or repeat < 1:
+            raise CommandError("--skills and --repeat must be positive.")
+        try:
+            with transaction.atomic():
+                self.run(count, repeat)
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def run(self, count, repeat):
+        mentor = CustomUser.objects.create(username='bench-skill-mentor', password=make_password(None))
+        UserProfile.objects.filter(user=mentor).update(role='mentor')
+        mentor = CustomUser.objects.select_related('profile').get(pk=mentor.pk)
+        factory = APIRequestFactory()
+        create_view = SkillViewSet.as_view({'post': 'create'})
+        bulk_view = SkillViewSet.as_view({'post': 'bulk'})
+
+        def rows(round_number):
+            return [
+                {'name': f'Bench skill {i}', 'price': f'{10 + round_number}.00', 'category': 'Benchmark',
+                 'level': 'Beginner', 'tags': ['bench', f'tag{i % 10}']}
+                for i in range(count)
+            ]
+
+        def one_by_one(round_number):
+            for row in rows(round_number):
+                request = factory.post('/api/skills/', row, format='json')
+                force_authenticate(request, user=mentor)
+                response = create_view(request)
+                if response.status_code != 201:
+                    raise CommandError(f"Create failed: {response.status_code} {response.data}")
+
+        def bulk(round_number):
+            request = factory.post('/api/skills/bulk/', rows(round_number), format='json')
+            force_authenticate(request, user=mentor)
+            response = bulk_view(request)
+            if response.status_code != 200 or response.data['errors']:
+                raise CommandError(f"Bulk import failed: {response.status_code} {response.data}")
+
+        single_times, insert_times, update_times = [], [], []
+        for round_number in range(repeat):
+            Skill.objects.filter(profile__user=mentor).delete()
+            single_times.append(self.timed(one_by_one, round_number))
+            Skill.objects.filter(profile__user=mentor).delete()
+            insert_times.append(self.timed(bulk, round_number))
+            # Every row now exists, so this run is all ON CONFLICT updates
+            update_times.append(self.timed(bulk, round_number + 1))
+
+        self.report('one by one', single_times, count)
+        self.report('bulk insert', insert_times, count)
+        self.report('bulk update', update_times, count)
+
+    def timed(self, func, *args):
+        started = time.perf_counter()
+        func(*args)
+        return time.perf_counter() - started
+
+    def report(self, name, timings, rows):
+        median = statistics.median(timings)
+        self.stdout.write(
+            f"{name}: {rows} skills, median {median * 1000:.1f} ms, best {min(timings) * 1000:.1f} ms "
+            f"over {len(timings)} run(s), {rows / median:,.0f} skills/s"
+        )
@@ -0,0 +1,23 @@
+# skills/management/commands/update_rank_scores.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from skills.ranking import update_rank_scores
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes every skill's best-match rank score as of now, so recency bonuses age and "
+        "recent bookings count. Run it periodically (e.g. daily from cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be positive.")
+        started = time.perf_counter()
+        count = update_rank_scores(options['batch_size'])
+        self.stdout.write(f"Updated the rank score of {count} skill(s) in {(time.perf_counter() - started) * 1000:.0f} ms.")
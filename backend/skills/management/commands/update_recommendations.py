@@ -0,0 +1,29 @@
+# skills/management/commands/update_recommendations.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from skills.recommendations import rebuild_neighbours, update_stale_neighbours
+
+
+class Command(BaseCommand):
+    help = (
+        "Refreshes the precomputed similar-skill lists behind /api/skills/recommended/ for skills "
+        "changed since the last run. Run it periodically (e.g. from cron), with --full now and then."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--full', action='store_true', help="Recompute every skill's list from scratch.")
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be positive.")
+        started = time.perf_counter()
+        if options['full']:
+            count = rebuild_neighbours()
+            summary = f"Rebuilt the neighbour lists of {count} skill(s)"
+        else:
+            count = update_stale_neighbours(options['batch_size'])
+            summary = f"Refreshed {count} changed skill(s)"
+        self.stdout.write(f"{summary} in {(time.perf_counter() - started) * 1000:.0f} ms.")
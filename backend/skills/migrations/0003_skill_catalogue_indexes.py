@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:02
+
+from django.db import migrations, models
+
+
+def create_tags_gin_index(apps, schema_editor):
+    # jsonb containment (`tags @> '["Hooks"]'`) can only use a GIN index on Postgres.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS skill_tags_gin_idx ON skills_skill USING gin (tags jsonb_path_ops) WHERE active'
+    )
+
+
+def drop_tags_gin_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS skill_tags_gin_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0001_initial'),
+        ('skills', '0002_alter_skill_unique_together_skill_active_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='skill',
+            index=models.Index(condition=models.Q(('active', True)), fields=['-id'], name='skill_active_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='skill',
+            index=models.Index(condition=models.Q(('active', True)), fields=['category', 'price'], name='skill_active_cat_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='skill',
+            index=models.Index(condition=models.Q(('active', True)), fields=['category', 'level', '-id'], name='skill_active_cat_level_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='skill',
+            index=models.Index(condition=models.Q(('active', True)), fields=['price', '-id'], name='skill_active_price_idx'),
+        ),
+        migrations.RunPython(create_tags_gin_index, drop_tags_gin_index),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:04
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+def create_search_indexes(apps, schema_editor):
+    # Full-text and trigram search are Postgres-only; SQLite runs use the
+    # in-memory index in skills.search instead.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS skill_search_vector_idx ON skills_skill USING gin (search_vector)'
+    )
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS skill_name_trgm_idx ON skills_skill USING gin (name gin_trgm_ops)'
+    )
+    schema_editor.execute("""
+        UPDATE skills_skill s SET search_vector =
+            setweight(to_tsvector('english', coalesce(s.name, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(s.tags::text, '')), 'B') ||
+            setweight(to_tsvector('english', coalesce(u.username, '')), 'B') ||
+            setweight(to_tsvector('english', coalesce(s.description, '')), 'C')
+        FROM profiles_userprofile p JOIN profiles_customuser u ON u.id = p.user_id
+        WHERE p.id = s.profile_id
+    """)
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS skill_name_trgm_idx')
+    schema_editor.execute('DROP INDEX IF EXISTS skill_search_vector_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0001_initial'),
+        ('skills', '0003_skill_catalogue_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='skill',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
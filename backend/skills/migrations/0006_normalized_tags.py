@@ -0,0 +1,85 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_tags(apps, schema_editor):
+    # Same normalization as skills.tags.clean_tags, which migrations cannot import
+    Skill = apps.get_model('skills', 'Skill')
+    Tag = apps.get_model('skills', 'Tag')
+    SkillTag = apps.get_model('skills', 'SkillTag')
+    tag_ids = {}
+    batch = []
+
+    def flush():
+        names = {name for _, names in batch for name in names} - tag_ids.keys()
+        if names:
+            Tag.objects.bulk_create([Tag(name=name) for name in names], ignore_conflicts=True)
+            tag_ids.update(Tag.objects.filter(name__in=names).values_list('name', 'id'))
+        SkillTag.objects.bulk_create(
+            [SkillTag(skill_id=skill_id, tag_id=tag_ids[name]) for skill_id, names in batch for name in names],
+            batch_size=1000, ignore_conflicts=True,
+        )
+        batch.clear()
+
+    for skill_id, tags in Skill.objects.values_list('id', 'tags').iterator(chunk_size=2000):
+        if not isinstance(tags, list):
+            continue
+        names = {str(tag).strip()[:100] for tag in tags if tag is not None} - {''}
+        if names:
+            batch.append((skill_id, names))
+        if len(batch) >= 2000:
+            flush()
+    flush()
+
+
+def drop_tags_gin_index(apps, schema_editor):
+    # Tag filters now go through SkillTag, so 0003's jsonb GIN index only slows writes
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS skill_tags_gin_idx')
+
+
+def create_tags_gin_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS skill_tags_gin_idx ON skills_skill USING gin (tags jsonb_path_ops) WHERE active'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('skills', '0005_rating_session_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SkillTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('skill', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='skills.skill')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='skills.tag')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='skill',
+            name='normalized_tags',
+            field=models.ManyToManyField(blank=True, related_name='skills', through='skills.SkillTag', to='skills.tag'),
+        ),
+        migrations.AddConstraint(
+            model_name='skilltag',
+            constraint=models.UniqueConstraint(fields=('tag', 'skill'), name='skill_tag_unique'),
+        ),
+        migrations.RunPython(backfill_tags, migrations.RunPython.noop),
+        migrations.RunPython(drop_tags_gin_index, create_tags_gin_index),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('profiles', '0004_userprofile_token_version'),
+        ('skills', '0006_normalized_tags'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SkillNeighbour',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('rank', models.PositiveSmallIntegerField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='skill',
+            name='neighbours_stale',
+            field=models.BooleanField(default=True, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='skill',
+            index=models.Index(condition=models.Q(('neighbours_stale', True)), fields=['id'], name='skill_neighbours_stale_idx'),
+        ),
+        migrations.AddField(
+            model_name='skillneighbour',
+            name='neighbour',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='skills.skill'),
+        ),
+        migrations.AddField(
+            model_name='skillneighbour',
+            name='skill',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='skills.skill'),
+        ),
+        migrations.AddConstraint(
+            model_name='skillneighbour',
+            constraint=models.UniqueConstraint(fields=('skill', 'rank'), name='skill_neighbour_rank_unique'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:55
+
+import math
+from datetime import datetime, timezone
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def backfill_rank_scores(apps, schema_editor):
+    # Same formula and constants as skills.ranking.rank_score, which migrations cannot import
+    Skill = apps.get_model('skills', 'Skill')
+    SessionBooking = apps.get_model('bookings', 'SessionBooking')
+    now = datetime.now(timezone.utc)
+    last_booked = dict(
+        SessionBooking.objects.values('skill_id').annotate(last=Max('created_at')).values_list('skill_id', 'last').order_by()
+    )
+    batch = []
+    for skill in Skill.objects.only('id', 'rating_sum', 'rating_count', 'sessions_completed', 'price', 'active_at').iterator(chunk_size=2000):
+        if skill.id in last_booked:
+            skill.active_at = last_booked[skill.id]
+        rating = (4.0 * 5 + skill.rating_sum) / (5 + skill.rating_count)
+        age_days = max((now - skill.active_at).total_seconds() / 86400, 0)
+        skill.rank_score = (
+            rating + 0.5 * math.log1p(skill.sessions_completed) - 0.25 * math.log1p(float(skill.price or 0))
+            + 0.5 * max(1 - age_days / 90, 0)
+        )
+        batch.append(skill)
+        if len(batch) >= 2000:
+            Skill.objects.bulk_update(batch, ['active_at', 'rank_score'])
+            batch.clear()
+    Skill.objects.bulk_update(batch, ['active_at', 'rank_score'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0007_created_at_indexes'),
+        ('profiles', '0004_userprofile_token_version'),
+        ('skills', '0007_skill_neighbours'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='skill',
+            name='active_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.AddField(
+            model_name='skill',
+            name='rank_score',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='skill',
+            index=models.Index(condition=models.Q(('active', True)), fields=['-rank_score', '-id'], name='skill_active_rank_idx'),
+        ),
+        migrations.RunPython(backfill_rank_scores, migrations.RunPython.noop),
+    ]
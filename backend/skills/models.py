@@ -1,6 +1,8 @@
 from django.db import models
+from django.contrib.postgres.search import SearchVectorField
 from profiles.models import CustomUser, UserProfile
 from django.core.validators import MinValueValidator
+from django.utils import timezone
 
 class Skill(models.Model):
     profile = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name='offered_skills', limit_choices_to={'role': 'mentor'})
@@ -13,18 +15,85 @@ class Skill(models.Model):
     description = models.TextField(blank=True, null=True)              # e.g., "State management, performance..."
     # For tags, JSONField is often convenient for a simple list, or ManyToManyField for reusable tags
     tags = models.JSONField(default=list, blank=True)                  # e.g., ["Hooks", "Context API"]
+    # Indexed copy of `tags`, kept in sync by skills.tags on save; used for tag filters and facets
+    normalized_tags = models.ManyToManyField('Tag', through='SkillTag', related_name='skills', blank=True)
     active = models.BooleanField(default=True)                         # e.g., true/false
     # sessions_completed and avg_rating are often calculated, but can be stored if you need to manually set them
     sessions_completed = models.PositiveIntegerField(default=0)        # Total sessions mentored for this skill
     avg_rating = models.DecimalField(max_digits=3, decimal_places=2, null=True, blank=True) # Average rating for this skill
+    # Running totals behind avg_rating, maintained incrementally by bookings.counters
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
+    rating_count = models.PositiveIntegerField(default=0, editable=False)
+    # Weighted tsvector over name/tags/mentor/description, maintained by skills.search on save
+    search_vector = SearchVectorField(null=True, blank=True, editable=False)
+    # Set when bookings or tags change; `manage.py update_recommendations` recomputes these skills' neighbours
+    neighbours_stale = models.BooleanField(default=True, editable=False)
+    # Creation or latest booking; with the rating and session counters and price it feeds
+    # rank_score, the "best match" sort key (see skills.ranking)
+    active_at = models.DateTimeField(default=timezone.now, editable=False)
+    rank_score = models.FloatField(default=0, editable=False)
 
     class Meta:
         unique_together = ('profile', 'name')
+        # Partial indexes covering the public catalogue (active skills only).
+        # The GIN indexes on `tags`, `search_vector` and `name` (trigram) are
+        # Postgres-specific and are created from migrations 0003 and 0004.
+        indexes = [
+            models.Index(fields=['-id'], condition=models.Q(active=True), name='skill_active_id_idx'),
+            models.Index(fields=['category', 'price'], condition=models.Q(active=True), name='skill_active_cat_price_idx'),
+            models.Index(fields=['category', 'level', '-id'], condition=models.Q(active=True), name='skill_active_cat_level_idx'),
+            models.Index(fields=['price', '-id'], condition=models.Q(active=True), name='skill_active_price_idx'),
+            models.Index(fields=['id'], condition=models.Q(neighbours_stale=True), name='skill_neighbours_stale_idx'),
+            models.Index(fields=['-rank_score', '-id'], condition=models.Q(active=True), name='skill_active_rank_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        from .ranking import RANK_FIELDS, skill_rank_score
+
+        self.rank_score = skill_rank_score(self)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and set(RANK_FIELDS) & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'rank_score'}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         mentor_username = self.profile.user.username if self.profile and hasattr(self.profile, 'user') else 'N/A'
         return f"{self.name} (${self.price}/hr) for {mentor_username}"
 
+class Tag(models.Model):
+    name = models.CharField(max_length=100, unique=True)
+
+    def __str__(self):
+        return self.name
+
+class SkillTag(models.Model):
+    skill = models.ForeignKey(Skill, on_delete=models.CASCADE)
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE)
+
+    class Meta:
+        # Leads with tag, so "skills tagged X" is a range scan
+        constraints = [
+            models.UniqueConstraint(fields=['tag', 'skill'], name='skill_tag_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.skill_id} #{self.tag_id}"
+
+class SkillNeighbour(models.Model):
+    """Precomputed "learners who booked this also liked" entry; see skills.recommendations."""
+    skill = models.ForeignKey(Skill, on_delete=models.CASCADE, related_name='+')
+    neighbour = models.ForeignKey(Skill, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['skill', 'rank'], name='skill_neighbour_rank_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.skill_id} -> {self.neighbour_id} ({self.score:.3f})"
+
 class Availability(models.Model):
     mentor = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name='availabilities')
     day_of_week = models.CharField(max_length=20)  # e.g., "Monday", "Tuesday", etc.
@@ -0,0 +1,28 @@
+# skills/pagination.py
+from rest_framework.pagination import CursorPagination
+
+from .filters import public_ordering
+
+
+class SkillCursorPagination(CursorPagination):
+    """
+    Keyset pagination for the public catalogue. Pages are addressed by an
+    opaque cursor over the ?ordering= sort key (the primary key by default),
+    so fetching page N costs the same index range scan as fetching page 1.
+
+    Pagination is opt-in: requests that send neither `cursor` nor `page_size`
+    still get the plain list response the existing frontend expects.
+    """
+    page_size = 24
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = '-id'
+
+    def get_ordering(self, request, queryset, view):
+        return public_ordering(request.query_params)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+        return super().paginate_queryset(queryset, request, view)
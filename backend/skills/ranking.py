@@ -0,0 +1,92 @@
+# skills/ranking.py
+"""
+"Best match" ranking for the public catalogue. Each skill stores a rank_score
+that combines four terms:
+- a Bayesian-smoothed average rating, where every skill starts with
+  PRIOR_REVIEWS imaginary reviews of PRIOR_RATING;
+- log-scaled completed sessions;
+- log-scaled price, as a small penalty;
+- recency of the last booking (or of creation).
+
+?ordering=best_match is then a scan of skill_active_rank_idx.
+
+Recency is bounded. A skill booked just now gets RECENCY_WEIGHT (half a star).
+The bonus shrinks linearly to nothing over RECENCY_DAYS, so activity can
+break ties between comparable skills but never outweighs ratings and
+sessions. The trade-off is that scores depend on when they were computed.
+`manage.py update_rank_scores` must run periodically (e.g. daily) to age
+them; between runs, recency is up to one period stale, which moves a score
+by at most RECENCY_WEIGHT / RECENCY_DAYS per day. Rating, session and price
+changes still refresh the score at once (Skill.save(), bookings.counters).
+New bookings only record active_at and leave the score to the next run, so
+they do not invalidate every cached listing.
+"""
+import math
+
+from django.utils import timezone
+
+from .caching import invalidate_catalogue
+from .models import Skill
+
+PRIOR_RATING = 4.0
+PRIOR_REVIEWS = 5
+SESSIONS_WEIGHT = 0.5
+PRICE_WEIGHT = 0.25
+RECENCY_WEIGHT = 0.5
+RECENCY_DAYS = 90
+# Skill columns rank_score is computed from
+RANK_FIELDS = ('rating_sum', 'rating_count', 'sessions_completed', 'price', 'active_at')
+# Stored scores this close to a fresh computation count as current (about a week of recency drift)
+RANK_SCORE_TOLERANCE = 0.05
+
+
+def rank_score(rating_sum, rating_count, sessions_completed, price, active_at, now=None):
+    rating = (PRIOR_RATING * PRIOR_REVIEWS + rating_sum) / (PRIOR_REVIEWS + rating_count)
+    age_days = max(((now or timezone.now()) - active_at).total_seconds() / 86400, 0)
+    return (
+        rating
+        + SESSIONS_WEIGHT * math.log1p(sessions_completed)
+        - PRICE_WEIGHT * math.log1p(float(price or 0))
+        + RECENCY_WEIGHT * max(1 - age_days / RECENCY_DAYS, 0)
+    )
+
+
+def skill_rank_score(skill, now=None):
+    return rank_score(*(getattr(skill, field) for field in RANK_FIELDS), now=now)
+
+
+def refresh_rank_scores(skill_ids):
+    """Recomputes the stored score of the given skills from their current columns. Two queries."""
+    skills = list(Skill.objects.filter(pk__in=skill_ids).only('pk', *RANK_FIELDS))
+    for skill in skills:
+        skill.rank_score = skill_rank_score(skill)
+    if skills:
+        Skill.objects.bulk_update(skills, ['rank_score'])
+
+
+def update_rank_scores(batch_size=1000):
+    """
+    Recomputes every skill's score as of now, for `manage.py
+    update_rank_scores`; returns how many changed. Cached listings are
+    invalidated once, if any did.
+    """
+    now = timezone.now()
+    changed = 0
+    last_pk = 0
+    while True:
+        batch = list(Skill.objects.filter(pk__gt=last_pk).order_by('pk').only('pk', 'rank_score', *RANK_FIELDS)[:batch_size])
+        if not batch:
+            break
+        last_pk = batch[-1].pk
+        stale = []
+        for skill in batch:
+            score = skill_rank_score(skill, now)
+            if score != skill.rank_score:
+                skill.rank_score = score
+                stale.append(skill)
+        if stale:
+            Skill.objects.bulk_update(stale, ['rank_score'])
+            changed += len(stale)
+    if changed:
+        invalidate_catalogue()
+    return changed
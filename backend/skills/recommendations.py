@@ -0,0 +1,217 @@
+# skills/recommendations.py
+"""
+"Skills you may like": item-to-item recommendations precomputed into
+SkillNeighbour, so serving a learner is two indexed reads over at most
+SEED_SKILLS x TOP_NEIGHBOURS rows.
+
+Two skills are similar when the same learners book them and when they share
+tags. Each signal is a cosine similarity over a sparse incidence matrix,
+learner x skill from SessionBooking and tag x skill from SkillTag. The
+matrices are held as inverted lists (learner -> skills, tag -> skills) and
+multiplied by counting co-occurring pairs in each list, so only non-zero
+pairs are ever materialized. The scores are blended with BOOKING_WEIGHT and
+TAG_WEIGHT.
+
+`manage.py update_recommendations` refreshes skills flagged neighbours_stale
+(new bookings, tag edits, new skills). Similarity is symmetric, so the fresh
+scores are also merged into the lists of the skills they pair with. `--full`
+recomputes every list and also lets previously trimmed candidates back in.
+"""
+import heapq
+import math
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from bookings.models import SessionBooking
+from .models import Skill, SkillNeighbour, SkillTag
+
+BOOKING_WEIGHT = 0.7
+TAG_WEIGHT = 0.3
+TOP_NEIGHBOURS = 20
+# A learner's most recent skills seed their recommendations
+SEED_SKILLS = 20
+# Learners with more distinct skills only contribute their newest ones, which bounds the pair count
+MAX_SKILLS_PER_LEARNER = 100
+# Tags on more skills than this say little about similarity and are skipped
+MAX_TAG_FANOUT = 1000
+IGNORED_STATUSES = ('declined',)
+
+
+def _bookings():
+    return SessionBooking.objects.exclude(status__in=IGNORED_STATUSES)
+
+
+def _co_occurrence(lists, sources):
+    """{s: {o: lists containing both}} for every s in sources (None for all)."""
+    pairs = defaultdict(lambda: defaultdict(int))
+    for members in lists:
+        for skill_id in members:
+            if sources is not None and skill_id not in sources:
+                continue
+            row = pairs[skill_id]
+            for other_id in members:
+                if other_id != skill_id:
+                    row[other_id] += 1
+    return pairs
+
+
+def _cosine(pairs, sizes):
+    return {
+        skill_id: {other_id: count / math.sqrt(sizes[skill_id] * sizes[other_id]) for other_id, count in row.items()}
+        for skill_id, row in pairs.items()
+    }
+
+
+def _booking_similarity(sources):
+    bookings = _bookings()
+    if sources is not None:
+        bookings = bookings.filter(learner_id__in=_bookings().filter(skill_id__in=sources).values('learner_id'))
+    lists = defaultdict(list)
+    for learner_id, skill_id in bookings.order_by('learner_id', '-skill_id').values_list('learner_id', 'skill_id').distinct():
+        if len(lists[learner_id]) < MAX_SKILLS_PER_LEARNER:
+            lists[learner_id].append(skill_id)
+    pairs = _co_occurrence(lists.values(), sources)
+    involved = set(pairs).union(*pairs.values()) if pairs else set()
+    sizes = dict(
+        _bookings().filter(skill_id__in=involved).values('skill_id')
+        .annotate(learners=Count('learner_id', distinct=True)).values_list('skill_id', 'learners').order_by()
+    ) if involved else {}
+    return _cosine(pairs, sizes)
+
+
+def _tag_similarity(sources):
+    links = SkillTag.objects.all()
+    if sources is not None:
+        links = links.filter(tag_id__in=SkillTag.objects.filter(skill_id__in=sources).values('tag_id'))
+    lists = defaultdict(list)
+    for tag_id, skill_id in links.values_list('tag_id', 'skill_id').order_by():
+        lists[tag_id].append(skill_id)
+    lists = [members for members in lists.values() if len(members) <= MAX_TAG_FANOUT]
+    pairs = _co_occurrence(lists, sources)
+    involved = set(pairs).union(*pairs.values()) if pairs else set()
+    if not involved:
+        return {}
+    common_tags = (
+        SkillTag.objects.values('tag_id').annotate(skills=Count('id'))
+        .filter(skills__lte=MAX_TAG_FANOUT).values('tag_id').order_by()
+    )
+    sizes = dict(
+        SkillTag.objects.filter(skill_id__in=involved, tag_id__in=common_tags).values('skill_id')
+        .annotate(tags=Count('id')).values_list('skill_id', 'tags').order_by()
+    )
+    return _cosine(pairs, sizes)
+
+
+def similarities(sources=None):
+    """Blended {skill_id: {other_id: score}} for the source skills (None for all), active skills only."""
+    by_bookings = _booking_similarity(sources)
+    by_tags = _tag_similarity(sources)
+    scores = defaultdict(dict)
+    for weight, table in ((BOOKING_WEIGHT, by_bookings), (TAG_WEIGHT, by_tags)):
+        for skill_id, row in table.items():
+            target = scores[skill_id]
+            for other_id, score in row.items():
+                target[other_id] = target.get(other_id, 0.0) + weight * score
+    involved = set(scores).union(*scores.values()) if scores else set()
+    active = set(Skill.objects.filter(id__in=involved, active=True).values_list('id', flat=True)) if involved else set()
+    return {
+        skill_id: {other_id: score for other_id, score in row.items() if other_id in active}
+        for skill_id, row in scores.items() if skill_id in active
+    }
+
+
+def _top(row, limit=TOP_NEIGHBOURS):
+    return heapq.nlargest(limit, row.items(), key=lambda item: (item[1], -item[0]))
+
+
+def _write(lists):
+    """Replaces the stored neighbour lists of the given skills."""
+    SkillNeighbour.objects.filter(skill_id__in=list(lists)).delete()
+    SkillNeighbour.objects.bulk_create([
+        SkillNeighbour(skill_id=skill_id, neighbour_id=other_id, score=score, rank=rank)
+        for skill_id, row in lists.items() for rank, (other_id, score) in enumerate(row)
+    ], batch_size=1000)
+
+
+def refresh_neighbours(skill_ids=None):
+    """
+    Recomputes the neighbour lists of skill_ids (all skills when None) and
+    merges their new scores into the lists of the skills they pair with.
+    Returns the number of lists written.
+    """
+    sources = None if skill_ids is None else set(skill_ids)
+    scores = similarities(sources)
+    lists = {skill_id: _top(scores.get(skill_id, {})) for skill_id in (sources if sources is not None else scores)}
+    with transaction.atomic():
+        if sources is None:
+            SkillNeighbour.objects.all().delete()
+        else:
+            # Partner lists that mention a source, or that a source now scores against
+            partners = set().union(*(row.keys() for row in scores.values())) if scores else set()
+            partners.update(SkillNeighbour.objects.filter(neighbour_id__in=sources).values_list('skill_id', flat=True))
+            partners -= sources
+            stored = defaultdict(dict)
+            for skill_id, other_id, score in SkillNeighbour.objects.filter(skill_id__in=partners).values_list(
+                'skill_id', 'neighbour_id', 'score',
+            ):
+                stored[skill_id][other_id] = score
+            for partner_id in partners:
+                row = {other_id: score for other_id, score in stored[partner_id].items() if other_id not in sources}
+                row.update(
+                    (source_id, scores[source_id][partner_id])
+                    for source_id in sources if partner_id in scores.get(source_id, {})
+                )
+                lists[partner_id] = _top(row)
+        _write(lists)
+    return len(lists)
+
+
+def update_stale_neighbours(batch_size=500):
+    """Refreshes skills flagged neighbours_stale, batch by batch; returns how many were refreshed."""
+    refreshed = 0
+    while True:
+        with transaction.atomic():
+            ids = list(
+                Skill.objects.filter(neighbours_stale=True).order_by('id')
+                .select_for_update(skip_locked=True).values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                return refreshed
+            # Cleared before reading, so a change made while this batch runs flags the skill again
+            Skill.objects.filter(id__in=ids).update(neighbours_stale=False)
+        refresh_neighbours(ids)
+        refreshed += len(ids)
+
+
+def rebuild_neighbours():
+    """Recomputes every neighbour list; returns how many were written."""
+    Skill.objects.filter(neighbours_stale=True).update(neighbours_stale=False)
+    return refresh_neighbours()
+
+
+def recommend_skill_ids(user_id, limit):
+    """Ranked ids of skills the learner has not booked, or [] if they have no usable history."""
+    recent = _bookings().filter(learner_id=user_id).order_by('-created_at').values_list('skill_id', flat=True)
+    seeds = list(dict.fromkeys(recent[:SEED_SKILLS * 5]))[:SEED_SKILLS]
+    if not seeds:
+        return []
+    totals = defaultdict(float)
+    for neighbour_id, score in SkillNeighbour.objects.filter(skill_id__in=seeds).values_list('neighbour_id', 'score'):
+        totals[neighbour_id] += score
+    for skill_id in seeds:
+        totals.pop(skill_id, None)
+    return [skill_id for skill_id, _ in _top(totals, limit)]
+
+
+def mark_stale(skill_ids):
+    Skill.objects.filter(id__in=skill_ids, neighbours_stale=False).update(neighbours_stale=True)
+
+
+@receiver(post_save, sender=SessionBooking)
+def flag_booked_skill(sender, instance, created, raw=False, **kwargs):
+    if created and not raw and instance.status not in IGNORED_STATUSES:
+        mark_stale([instance.skill_id])
@@ -0,0 +1,260 @@
+# skills/search.py
+import bisect
+import re
+import threading
+from collections import defaultdict
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramWordSimilarity
+from django.db import connection, models
+from django.db.models import F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Cast, Coalesce
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from profiles.models import CustomUser
+from .models import Skill
+
+SEARCH_CONFIG = 'english'
+# Minimum trigram similarity for a misspelt term to still count as a match.
+TRIGRAM_THRESHOLD = 0.3
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# Mirrors Postgres' default ts_rank weights for the A/B/C labels used below,
+# so both backends rank results the same way.
+FIELD_WEIGHTS = {
+    'name': 1.0,         # A
+    'tags': 0.4,         # B
+    'mentor': 0.4,       # B
+    'description': 0.2,  # C
+}
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower()) if text else []
+
+
+def skill_search_vector():
+    """Expression for the weighted tsvector stored on Skill.search_vector."""
+    mentor_username = Subquery(
+        CustomUser.objects.filter(profile__id=OuterRef('profile_id')).values('username')[:1]
+    )
+    return (
+        SearchVector('name', weight='A', config=SEARCH_CONFIG)
+        + SearchVector(Cast('tags', models.TextField()), weight='B', config=SEARCH_CONFIG)
+        + SearchVector(mentor_username, weight='B', config=SEARCH_CONFIG)
+        + SearchVector('description', weight='C', config=SEARCH_CONFIG)
+    )
+
+
+def refresh_search_vectors(queryset):
+    """Recomputes search_vector for every skill in queryset with a single UPDATE."""
+    if connection.vendor != 'postgresql':
+        return 0
+    return queryset.update(search_vector=skill_search_vector())
+
+
+def _prefix_tsquery(terms):
+    # Every term must match (&), and the last one as a prefix so "reac" finds "React".
+    # Terms come from TOKEN_RE, so they carry no tsquery operators.
+    parts = [f"'{term}'" for term in terms[:-1]] + [f"'{terms[-1]}':*"]
+    return SearchQuery(' & '.join(parts), search_type='raw', config=SEARCH_CONFIG)
+
+
+class InMemorySkillIndex:
+    """
+    Inverted index over active skills used when the database has no full-text
+    search (SQLite dev and test runs). Supports the same weighted ranking,
+    prefix matching on every term and trigram-based typo tolerance as the
+    Postgres path. Built lazily and kept current by the Skill signals below.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._built = False
+        self._postings = defaultdict(dict)  # token -> {skill_id: weight}
+        self._documents = {}                # skill_id -> set of tokens
+        self._vocabulary = []               # sorted tokens, for prefix lookups
+        self._trigrams = defaultdict(set)   # trigram -> tokens, for typo tolerance
+
+    @staticmethod
+    def _trigrams_of(token):
+        padded = f'  {token} '
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+    def invalidate(self):
+        with self._lock:
+            self._built = False
+            self._postings.clear()
+            self._documents.clear()
+            self._vocabulary = []
+            self._trigrams.clear()
+
+    def _rows(self, queryset):
+        return queryset.values_list('id', 'name', 'description', 'tags', 'profile__user__username')
+
+    def _ensure_built(self):
+        if self._built:
+            return
+        with self._lock:
+            if self._built:
+                return
+            for row in self._rows(Skill.objects.filter(active=True)).iterator(chunk_size=2000):
+                self._add(*row)
+            self._built = True
+
+    def _add(self, skill_id, name, description, tags, mentor):
+        fields = {
+            'name': tokenize(name),
+            'tags': tokenize(' '.join(str(tag) for tag in tags or [])),
+            'mentor': tokenize(mentor),
+            'description': tokenize(description),
+        }
+        tokens = set()
+        for field, field_tokens in fields.items():
+            for token in field_tokens:
+                postings = self._postings[token]
+                postings[skill_id] = postings.get(skill_id, 0.0) + FIELD_WEIGHTS[field]
+                if token not in tokens and len(postings) == 1:
+                    bisect.insort(self._vocabulary, token)
+                    for trigram in self._trigrams_of(token):
+                        self._trigrams[trigram].add(token)
+                tokens.add(token)
+        self._documents[skill_id] = tokens
+
+    def _remove(self, skill_id):
+        for token in self._documents.pop(skill_id, ()):
+            postings = self._postings.get(token)
+            if postings is None:
+                continue
+            postings.pop(skill_id, None)
+            if not postings:
+                del self._postings[token]
+                index = bisect.bisect_left(self._vocabulary, token)
+                if index < len(self._vocabulary) and self._vocabulary[index] == token:
+                    del self._vocabulary[index]
+                for trigram in self._trigrams_of(token):
+                    self._trigrams[trigram].discard(token)
+
+    def update(self, skill_ids):
+        with self._lock:
+            if not self._built:
+                return
+            for skill_id in skill_ids:
+                self._remove(skill_id)
+            for row in self._rows(Skill.objects.filter(id__in=skill_ids, active=True)):
+                self._add(*row)
+
+    def remove(self, skill_id):
+        with self._lock:
+            if self._built:
+                self._remove(skill_id)
+
+    def _expand(self, term):
+        """Index tokens matching term, with a similarity factor in (0, 1]."""
+        matches = {}
+        start = bisect.bisect_left(self._vocabulary, term)
+        for token in self._vocabulary[start:]:
+            if not token.startswith(term):
+                break
+            matches[token] = 1.0
+        if matches:
+            return matches
+        term_trigrams = self._trigrams_of(term)
+        candidates = set()
+        for trigram in term_trigrams:
+            candidates |= self._trigrams.get(trigram, set())
+        for token in candidates:
+            token_trigrams = self._trigrams_of(token)
+            similarity = len(term_trigrams & token_trigrams) / len(term_trigrams | token_trigrams)
+            if similarity >= TRIGRAM_THRESHOLD:
+                matches[token] = similarity
+        return matches
+
+    def search(self, query, limit=None):
+        """Returns [(skill_id, score)] best first; every query term must match."""
+        terms = tokenize(query)
+        if not terms:
+            return []
+        self._ensure_built()
+        with self._lock:
+            scores = None
+            for term in terms:
+                term_scores = defaultdict(float)
+                for token, similarity in self._expand(term).items():
+                    for skill_id, weight in self._postings[token].items():
+                        term_scores[skill_id] = max(term_scores[skill_id], weight * similarity)
+                if scores is None:
+                    scores = dict(term_scores)
+                else:
+                    scores = {
+                        skill_id: score + term_scores[skill_id]
+                        for skill_id, score in scores.items() if skill_id in term_scores
+                    }
+                if not scores:
+                    return []
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], -item[0]))
+        return ranked[:limit] if limit else ranked
+
+
+skill_index = InMemorySkillIndex()
+
+
+def search_skills(queryset, query, limit):
+    """
+    Returns up to `limit` skills from queryset matching query, best first.
+    Uses the stored tsvector (plus trigram word similarity on the name for typos)
+    on Postgres and the in-memory inverted index everywhere else.
+    """
+    terms = tokenize(query)
+    if not terms:
+        return []
+
+    if connection.vendor == 'postgresql':
+        tsquery = _prefix_tsquery(terms)
+        return list(
+            queryset.annotate(
+                rank=Coalesce(SearchRank(F('search_vector'), tsquery), Value(0.0)),
+                similarity=TrigramWordSimilarity(query, 'name'),
+                score=F('rank') + F('similarity') * Value(TRIGRAM_THRESHOLD),
+            )
+            .filter(Q(search_vector=tsquery) | Q(name__trigram_word_similar=query))
+            .order_by('-score', '-id')[:limit]
+        )
+
+    ranked = skill_index.search(query)
+    ids = [skill_id for skill_id, _ in ranked]
+    # Re-apply the caller's filters; keep scanning the ranking until limit survive.
+    skills = {}
+    for start in range(0, len(ids), 500):
+        chunk = ids[start:start + 500]
+        skills.update(queryset.in_bulk(chunk))
+        if len(skills) >= limit:
+            break
+    return [skills[skill_id] for skill_id in ids if skill_id in skills][:limit]
+
+
+@receiver(post_save, sender=Skill)
+def update_skill_search_entry(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    if connection.vendor == 'postgresql':
+        refresh_search_vectors(Skill.objects.filter(pk=instance.pk))
+    else:
+        skill_index.update([instance.pk])
+
+
+@receiver(post_delete, sender=Skill)
+def remove_skill_search_entry(sender, instance, **kwargs):
+    skill_index.remove(instance.pk)
+
+
+@receiver(post_save, sender=CustomUser)
+def update_mentor_search_entries(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    # The mentor username is part of every skill document; skip saves that cannot change it
+    if raw or created or (update_fields is not None and 'username' not in update_fields):
+        return
+    skills = Skill.objects.filter(profile__user=instance)
+    if connection.vendor == 'postgresql':
+        refresh_search_vectors(skills)
+    else:
+        skill_index.update(list(skills.values_list('id', flat=True)))
@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from .models import Skill, Availability # Ensure both Skill and Availability are imported
 from profiles.models import UserProfile, CustomUser # Ensure CustomUser and UserProfile are imported
+from config.serialization import ValuesSerializer
 
 # --- Serializer for Mentor's Own Skill Management (used by MySkills.jsx) ---
 class SkillSerializer(serializers.ModelSerializer):
@@ -45,6 +46,9 @@ class PublicSkillSerializer(serializers.ModelSerializer):
             'level', 'rating', 'sessions', 'mentor', 'mentorId', 'tags' # Include tags here too
         ]
 
+# Same output as PublicSkillSerializer, built from .values() rows for the list endpoints
+public_skill_rows = ValuesSerializer(PublicSkillSerializer)
+
 # --- Serializer for Mentor's Availability Management ---
 class AvailabilitySerializer(serializers.ModelSerializer):
     # mentor_username = serializers.CharField(source='mentor.user.username', read_only=True) # Optional: if you want to display mentor username
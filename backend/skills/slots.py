@@ -0,0 +1,212 @@
+# skills/slots.py
+"""
+Per-mentor open-slot index. Each mentor's schedule is materialized in memory
+as merged weekly availability windows plus a start-sorted array of confirmed
+booking intervals, so free time over several weeks is computed by a linear
+merge instead of expanding Availability and subtracting SessionBooking rows in
+SQL on every request.
+
+Entries are validated against a per-mentor generation counter kept in the
+Django cache. Every committed Availability or booking change bumps the
+counter; the process that made the change patches its own entry in place and
+every other process rebuilds on its next read.
+"""
+import bisect
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from datetime import datetime, timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from bookings.models import BLOCKING_STATUSES, MAX_SESSION_MINUTES, SessionBooking
+from .models import Availability
+
+WEEKDAYS = {name: index for index, name in enumerate(
+    ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+)}
+# Mentor schedules kept per process; least recently used entries are evicted first.
+MAX_CACHED_MENTORS = 5000
+# Upper bound on staleness when the cache backend is not shared between processes
+MAX_ENTRY_AGE = 60
+
+
+def _generation_key(mentor_id):
+    return f'slots:generation:{mentor_id}'
+
+
+def current_generation(mentor_id):
+    return cache.get(_generation_key(mentor_id), 0)
+
+
+def bump_generation(mentor_id):
+    key = _generation_key(mentor_id)
+    cache.add(key, 0, timeout=None)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Evicted between add() and incr(); readers will rebuild either way
+        cache.set(key, 1, timeout=None)
+        return 1
+
+
+def _merge(intervals):
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class MentorSchedule:
+    __slots__ = ('generation', 'loaded_at', 'windows', 'busy', 'busy_by_id')
+
+    def __init__(self, generation, windows, bookings):
+        self.generation = generation
+        self.loaded_at = time.monotonic()
+        self.windows = windows                       # weekday -> merged [(start_time, end_time)]
+        self.busy = sorted(bookings)                 # [(session_start, session_end, booking_id)]
+        self.busy_by_id = {row[2]: row for row in self.busy}
+
+    def add_busy(self, booking_id, start, end):
+        row = (start, end, booking_id)
+        bisect.insort(self.busy, row)
+        self.busy_by_id[booking_id] = row
+
+    def remove_busy(self, booking_id):
+        row = self.busy_by_id.pop(booking_id, None)
+        if row is not None:
+            index = bisect.bisect_left(self.busy, row)
+            if index < len(self.busy) and self.busy[index] == row:
+                del self.busy[index]
+
+    def free_intervals(self, range_start, range_end, min_minutes=0):
+        """Free [start, end) intervals within the range, at least min_minutes long."""
+        min_length = timedelta(minutes=min_minutes)
+        free = []
+        day = range_start.date()
+        while day <= range_end.date():
+            for window_start, window_end in self.windows.get(day.weekday(), ()):
+                start = max(range_start, timezone.make_aware(datetime.combine(day, window_start)))
+                end = min(range_end, timezone.make_aware(datetime.combine(day, window_end)))
+                if start < end:
+                    self._subtract_busy(start, end, min_length, free)
+            day += timedelta(days=1)
+        return free
+
+    def _subtract_busy(self, start, end, min_length, free):
+        # No session is longer than MAX_SESSION_MINUTES, so anything that can
+        # overlap [start, end) begins after start - MAX_SESSION_MINUTES.
+        index = bisect.bisect_left(self.busy, (start - timedelta(minutes=MAX_SESSION_MINUTES),))
+        cursor = start
+        while index < len(self.busy) and self.busy[index][0] < end:
+            busy_start, busy_end, _ = self.busy[index]
+            if busy_end > cursor:
+                if busy_start - cursor >= min_length and busy_start > cursor:
+                    free.append((cursor, busy_start))
+                cursor = max(cursor, busy_end)
+            index += 1
+        if end - cursor >= min_length and end > cursor:
+            free.append((cursor, end))
+
+
+class SlotIndex:
+    def __init__(self, max_mentors=MAX_CACHED_MENTORS):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._max_mentors = max_mentors
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def discard(self, mentor_id):
+        with self._lock:
+            self._entries.pop(mentor_id, None)
+
+    def _load(self, mentor_id):
+        # Read the generation before the rows: a change committed while loading
+        # bumps it again and the entry is rebuilt on the next read.
+        generation = current_generation(mentor_id)
+        windows = defaultdict(list)
+        rows = Availability.objects.filter(mentor_id=mentor_id, is_available=True).values_list(
+            'day_of_week', 'start_time', 'end_time',
+        )
+        for day_of_week, start_time, end_time in rows:
+            weekday = WEEKDAYS.get(day_of_week.strip().lower())
+            if weekday is not None and start_time < end_time:
+                windows[weekday].append((start_time, end_time))
+        bookings = SessionBooking.objects.filter(
+            mentor_id=mentor_id, status__in=BLOCKING_STATUSES, session_end__gt=timezone.now(),
+        ).values_list('session_start', 'session_end', 'id')
+        return MentorSchedule(generation, {day: _merge(spans) for day, spans in windows.items()}, bookings)
+
+    def get(self, mentor_id):
+        with self._lock:
+            entry = self._entries.get(mentor_id)
+            if entry is not None:
+                self._entries.move_to_end(mentor_id)
+        if (entry is None or entry.generation != current_generation(mentor_id)
+                or time.monotonic() - entry.loaded_at > MAX_ENTRY_AGE):
+            entry = self._load(mentor_id)
+            with self._lock:
+                self._entries[mentor_id] = entry
+                while len(self._entries) > self._max_mentors:
+                    self._entries.popitem(last=False)
+        return entry
+
+    def apply_booking_change(self, mentor_id, booking_id, interval):
+        """Patches the local entry after a committed booking change; interval is None if it no longer blocks."""
+        generation = bump_generation(mentor_id)
+        with self._lock:
+            entry = self._entries.get(mentor_id)
+            if entry is None:
+                return
+            if entry.generation != generation - 1:
+                # Someone else changed this mentor since the entry was built
+                del self._entries[mentor_id]
+                return
+            entry.remove_busy(booking_id)
+            if interval is not None:
+                entry.add_busy(booking_id, *interval)
+            entry.generation = generation
+
+    def free_slots(self, mentor_id, range_start, range_end, min_minutes=0):
+        return self.get(mentor_id).free_intervals(range_start, range_end, min_minutes)
+
+
+slot_index = SlotIndex()
+
+
+@receiver(post_save, sender=SessionBooking)
+@receiver(post_delete, sender=SessionBooking)
+def update_booking_slots(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    deleted = kwargs['signal'] is post_delete
+    if (created or deleted) and instance.status not in BLOCKING_STATUSES:
+        return  # new or deleted pending/declined requests never occupied a slot
+    blocking = not deleted and instance.status in BLOCKING_STATUSES
+    interval = (instance.session_start, instance.session_end) if blocking else None
+    mentor_id, booking_id = instance.mentor_id, instance.pk
+    transaction.on_commit(lambda: slot_index.apply_booking_change(mentor_id, booking_id, interval))
+
+
+@receiver(post_save, sender=Availability)
+@receiver(post_delete, sender=Availability)
+def update_availability_slots(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    mentor_id = instance.mentor_id
+
+    def invalidate():
+        bump_generation(mentor_id)
+        slot_index.discard(mentor_id)
+
+    transaction.on_commit(invalidate)
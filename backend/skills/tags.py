@@ -0,0 +1,69 @@
+# skills/tags.py
+"""
+Keeps the normalized Tag/SkillTag tables in step with the free-form
+`Skill.tags` JSON list, which stays the editable source (serializers, search
+documents). Tag filters and facet counts read the normalized tables, so
+"skills tagged X" is an index lookup instead of decoding every row's JSON.
+"""
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import Skill, SkillTag, Tag
+
+MAX_TAG_LENGTH = Tag._meta.get_field('name').max_length
+
+
+def clean_tags(tags):
+    """Distinct, stripped, non-empty tag names from a Skill.tags value."""
+    if not isinstance(tags, (list, tuple)):
+        return set()
+    names = (str(tag).strip()[:MAX_TAG_LENGTH] for tag in tags if tag is not None)
+    return {name for name in names if name}
+
+
+def sync_skill_tags(tags_by_skill, created=False):
+    """
+    Makes the SkillTag links of each skill match {skill_id: Skill.tags}. Costs
+    a fixed number of queries however many skills are passed; created=True
+    skips looking for existing links.
+    """
+    if not tags_by_skill:
+        return
+    wanted = {skill_id: clean_tags(tags) for skill_id, tags in tags_by_skill.items()}
+    names = set().union(*wanted.values())
+    tag_ids = {}
+    if names:
+        Tag.objects.bulk_create([Tag(name=name) for name in names], ignore_conflicts=True)
+        tag_ids = dict(Tag.objects.filter(name__in=names).values_list('name', 'id'))
+
+    current = {}
+    if not created:
+        for link_id, skill_id, tag_id in SkillTag.objects.filter(skill_id__in=wanted).values_list('id', 'skill_id', 'tag_id'):
+            current.setdefault(skill_id, {})[tag_id] = link_id
+
+    stale, missing, changed = [], [], []
+    for skill_id, skill_names in wanted.items():
+        wanted_ids = {tag_ids[name] for name in skill_names}
+        links = current.get(skill_id, {})
+        removed = [link_id for tag_id, link_id in links.items() if tag_id not in wanted_ids]
+        added = [SkillTag(skill_id=skill_id, tag_id=tag_id) for tag_id in wanted_ids - links.keys()]
+        if removed or added:
+            changed.append(skill_id)
+        stale.extend(removed)
+        missing.extend(added)
+    if stale:
+        SkillTag.objects.filter(id__in=stale).delete()
+    if missing:
+        SkillTag.objects.bulk_create(missing, batch_size=1000, ignore_conflicts=True)
+    if changed and not created:
+        # Tag similarity moved; new skills are already flagged (see skills.recommendations)
+        Skill.objects.filter(id__in=changed, neighbours_stale=False).update(neighbours_stale=True)
+
+
+@receiver(post_save, sender=Skill)
+def update_skill_tags(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and 'tags' not in update_fields):
+        return
+    if created and not clean_tags(instance.tags):
+        return
+    sync_skill_tags({instance.pk: instance.tags}, created=created)
@@ -1,3 +1,562 @@
+import gzip
+import json
+from datetime import date, time, timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from config.testing import QueryBudgetMixin, seed_marketplace
+from bookings.models import Review, SessionBooking
+from profiles.models import CustomUser
+from .caching import catalogue_generation
+from .models import Availability, Skill, SkillNeighbour
+from .recommendations import rebuild_neighbours, update_stale_neighbours
+from .ranking import RECENCY_WEIGHT, refresh_rank_scores
+from .search import skill_index
+from .serializers import PublicSkillSerializer
+from .slots import slot_index
+
+
+def make_mentor(username):
+    user = CustomUser.objects.create_user(username=username, password='pass12345')
+    user.profile.role = 'mentor'
+    user.profile.save()
+    return user
+
+
+class PublicSkillListTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = make_mentor('alice')
+        cls.bob = make_mentor('bob')
+        for i in range(30):
+            Skill.objects.create(
+                profile=(cls.alice if i % 2 else cls.bob).profile,
+                name=f'Skill {i}',
+                price=10 + i,
+                category='Frontend' if i % 3 else 'Backend',
+                level='Expert' if i % 5 == 0 else 'Intermediate',
+                tags=['Hooks', 'React'] if i % 4 == 0 else ['Django'],
+            )
+        Skill.objects.create(profile=cls.alice.profile, name='Hidden', active=False)
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+
+    def test_unpaginated_list_is_unchanged(self):
+        response = self.client.get('/api/skills/public/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(response.data, list)
+        self.assertEqual(len(response.data), 30)
+
+    def test_cursor_pages_cover_catalogue_once(self):
+        seen = []
+        url = '/api/skills/public/?page_size=7'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(len(seen), 30)
+        self.assertEqual(seen, sorted(seen, reverse=True))
+
+    def test_filters(self):
+        response = self.client.get('/api/skills/public/', {
+            'category': 'Frontend', 'min_price': 15, 'max_price': 30, 'tags': 'Hooks',
+        })
+        expected = Skill.objects.filter(
+            active=True, category='Frontend', price__gte=15, price__lte=30, name__in=[
+                f'Skill {i}' for i in range(30) if i % 4 == 0
+            ],
+        )
+        self.assertEqual({row['id'] for row in response.data}, set(expected.values_list('id', flat=True)))
+
+        response = self.client.get('/api/skills/public/', {'mentor': self.alice.id, 'level': 'Expert'})
+        self.assertTrue(response.data)
+        self.assertTrue(all(row['mentor'] == 'alice' and row['level'] == 'Expert' for row in response.data))
+
+    def test_values_rows_match_serializer(self):
+        skill = Skill.objects.get(name='Skill 3')
+        skill.avg_rating = Decimal('4.5')
+        skill.save()
+        response = self.client.get('/api/skills/public/')
+        expected = PublicSkillSerializer(Skill.objects.filter(active=True).order_by('-id'), many=True).data
+        self.assertEqual(response.data, expected)
+        rows = {row['id']: row for row in response.data}
+        self.assertEqual((rows[skill.id]['rating'], rows[skill.id]['price']), ('4.50', '13.00'))
+        self.assertIsNone(next(row for row in response.data if row['id'] != skill.id)['rating'])
+
+    def test_cursor_pages_by_price(self):
+        seen = []
+        url = '/api/skills/public/?page_size=7&ordering=price'
+        while url:
+            response = self.client.get(url)
+            seen.extend(float(row['price']) for row in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(seen, sorted(float(10 + i) for i in range(30)))
+
+    def test_sparse_fields_and_compact_rows(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get('/api/skills/public/', {'fields': 'title, id,price'})
+        self.assertEqual(response.data[0], {'id': response.data[0]['id'], 'title': 'Skill 29', 'price': '39.00'})
+        sql = captured[0]['sql']
+        self.assertNotIn('description', sql)
+        self.assertNotIn('JOIN', sql)
+
+        response = self.client.get('/api/skills/public/', {'fields': 'id,mentor', 'compact': '1', 'page_size': 2})
+        self.assertEqual(response.data['results']['fields'], ['id', 'mentor'])
+        self.assertEqual(response.data['results']['rows'][0][1], 'alice')
+        # The cursor still works without the sort key among the requested fields
+        response = self.client.get('/api/skills/public/', {'fields': 'title', 'ordering': 'price', 'page_size': 2})
+        self.assertEqual(self.client.get(response.data['next']).data['results'], [{'title': 'Skill 2'}, {'title': 'Skill 3'}])
+
+        for fields in ('id,secret', ''):
+            self.assertEqual(self.client.get('/api/skills/public/', {'fields': fields}).status_code, 400)
+
+    def test_invalid_price_is_rejected(self):
+        for params in ({'min_price': 'cheap'}, {'min_price': 'NaN'}, {'max_price': '-Infinity'}, {'mentor': str(2 ** 63)}):
+            self.assertEqual(self.client.get('/api/skills/public/', params).status_code, 400, params)
+        self.assertEqual(self.client.get('/api/skills/public/', {'min_price': '1e30', 'mentor': str(2 ** 63 - 1)}).status_code, 200)
+
+    def facets(self, **params):
+        data = self.client.get('/api/skills/facets/', params).data
+        return {facet: [(row['name'], row['count']) for row in rows] for facet, rows in data.items()}
+
+    def test_facets_in_one_cached_query(self):
+        with self.assertMaxQueries(1):
+            facets = self.facets()
+        self.assertEqual(facets, {
+            'tags': [('Django', 22), ('Hooks', 8), ('React', 8)],
+            'categories': [('Frontend', 20), ('Backend', 10)],
+            'levels': [('Intermediate', 24), ('Expert', 6)],
+        })
+        with self.assertMaxQueries(0):
+            self.facets()
+
+        self.assertEqual(self.facets(category='Backend', tags='Hooks'), {
+            'tags': [('Hooks', 3), ('React', 3)],
+            'categories': [('Backend', 3)],
+            'levels': [('Intermediate', 2), ('Expert', 1)],
+        })
+
+    def test_tag_links_follow_skill_edits(self):
+        skill = Skill.objects.get(name='Skill 1')
+        skill.tags = ['Hooks', ' Hooks ', '']
+        with self.captureOnCommitCallbacks(execute=True):
+            skill.save()
+        self.assertEqual(list(skill.normalized_tags.values_list('name', flat=True)), ['Hooks'])
+        self.assertEqual(self.facets()['tags'], [('Django', 21), ('Hooks', 9), ('React', 8)])
+        self.assertIn(skill.id, {row['id'] for row in self.client.get('/api/skills/public/', {'tags': 'Hooks'}).data})
+
+
+class PublicSkillCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = make_mentor('alice')
+        cls.skill = Skill.objects.create(profile=cls.alice.profile, name='React', price=20, category='Frontend')
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+
+    def titles(self, **params):
+        return [row['title'] for row in self.client.get('/api/skills/public/', params).data]
+
+    def test_etag_revalidation(self):
+        response = self.client.get('/api/skills/public/')
+        etag = response['ETag']
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/skills/public/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertNotEqual(self.client.get('/api/skills/public/', {'category': 'Frontend'})['ETag'], etag)
+
+    def test_large_responses_are_compressed(self):
+        Skill.objects.bulk_create(
+            Skill(profile=self.alice.profile, name=f'Course {i}', description='Lorem ipsum ' * 20) for i in range(20)
+        )
+        response = self.client.get('/api/skills/public/', HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(len(json.loads(gzip.decompress(response.content))), 21)
+        self.assertIn('Accept-Encoding', response['Vary'])
+        # Compressed responses carry a weak ETag, which still revalidates
+        self.assertTrue(response['ETag'].startswith('W/"'))
+        self.assertEqual(self.client.get('/api/skills/public/', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+        self.assertFalse(self.client.get('/api/skills/public/', HTTP_ACCEPT_ENCODING='gzip;q=0').has_header('Content-Encoding'))
+        small = self.client.get('/api/skills/public/', {'fields': 'id', 'page_size': 1}, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(small.has_header('Content-Encoding'))
+
+    def test_committed_changes_invalidate(self):
+        self.assertEqual(self.titles(), ['React'])
+        with self.captureOnCommitCallbacks(execute=True):
+            Skill.objects.filter(pk=self.skill.pk).get().save(update_fields=['price'])
+            Skill.objects.create(profile=self.alice.profile, name='Vue', price=10)
+        self.assertEqual(sorted(self.titles()), ['React', 'Vue'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.alice.username = 'alicia'
+            self.alice.save()
+        self.assertEqual({row['mentor'] for row in self.client.get('/api/skills/public/').data}, {'alicia'})
+
+        learner = CustomUser.objects.create_user(username='learner', password='pass12345')
+        with self.captureOnCommitCallbacks(execute=True):
+            SessionBooking.objects.create(
+                mentor=self.alice.profile, learner=learner, skill=self.skill,
+                session_date=date(2030, 1, 7), session_time=time(9), status='completed',
+            )
+        sessions = {row['title']: row['sessions'] for row in self.client.get('/api/skills/public/').data}
+        self.assertEqual(sessions['React'], 1)
+
+
+class SkillSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = make_mentor('alice')
+        cls.react = Skill.objects.create(
+            profile=cls.alice.profile, name='React Fundamentals', category='Frontend',
+            description='Components and state', tags=['Hooks'],
+        )
+        cls.django = Skill.objects.create(
+            profile=cls.alice.profile, name='Django REST APIs', category='Backend',
+            description='Build APIs with React frontends in mind', tags=['Python'],
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        skill_index.invalidate()
+
+    def search(self, **params):
+        response = self.client.get('/api/skills/search/', params)
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.data]
+
+    def test_name_match_outranks_description_match(self):
+        self.assertEqual(self.search(q='react'), [self.react.id, self.django.id])
+
+    def test_prefix_typo_and_mentor_matching(self):
+        self.assertEqual(self.search(q='fundam'), [self.react.id])
+        self.assertEqual(self.search(q='fundamentels'), [self.react.id])
+        self.assertEqual(set(self.search(q='alice')), {self.react.id, self.django.id})
+        self.assertEqual(self.search(q='hooks'), [self.react.id])
+
+    def test_index_follows_saves_and_filters(self):
+        self.search(q='react')
+        self.django.active = False
+        self.django.save()
+        self.assertEqual(self.search(q='react'), [self.react.id])
+        Skill.objects.create(profile=self.alice.profile, name='React Native', category='Mobile')
+        self.assertEqual(len(self.search(q='react')), 2)
+        self.assertEqual(len(self.search(q='react', category='Mobile')), 1)
+        self.assertEqual(self.search(q=''), [])
+
+
+class SkillSlotsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = make_mentor('alice')
+        cls.learner = CustomUser.objects.create_user(username='learner', password='pass12345')
+        cls.skill = Skill.objects.create(profile=cls.alice.profile, name='React', price=20)
+        # 2030-01-07 is a Monday
+        Availability.objects.create(mentor=cls.alice.profile, day_of_week='Monday', start_time=time(9), end_time=time(12))
+        Availability.objects.create(mentor=cls.alice.profile, day_of_week='Monday', start_time=time(11), end_time=time(13))
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+        slot_index.clear()
+
+    def slots(self, **params):
+        response = self.client.get(f'/api/skills/{self.skill.id}/slots/', {'from': '2030-01-07', 'to': '2030-01-13', **params})
+        self.assertEqual(response.status_code, 200, response.data)
+        return [(slot['start'].strftime('%d %H:%M'), slot['end'].strftime('%d %H:%M')) for slot in response.data['slots']]
+
+    def book(self, session_time, duration=60, status='accepted'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return SessionBooking.objects.create(
+                mentor=self.alice.profile, learner=self.learner, skill=self.skill,
+                session_date=date(2030, 1, 7), session_time=session_time, duration=duration, status=status,
+            )
+
+    def test_windows_merge_and_bookings_are_subtracted(self):
+        self.assertEqual(self.slots(), [('07 09:00', '07 13:00')])
+        self.book(time(10), duration=90)
+        self.book(time(9, 30), status='pending')
+        self.assertEqual(self.slots(), [('07 09:00', '07 10:00'), ('07 11:30', '07 13:00')])
+        self.assertEqual(self.slots(duration=61), [('07 11:30', '07 13:00')])
+
+    def test_index_is_patched_in_place_and_rebuilt_on_availability_change(self):
+        self.slots()
+        booking = self.book(time(9))
+        with self.assertNumQueries(1):  # the skill lookup only
+            self.assertEqual(self.slots(), [('07 10:00', '07 13:00')])
+
+        booking.status = 'declined'
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.save()
+        self.assertEqual(self.slots(), [('07 09:00', '07 13:00')])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Availability.objects.create(mentor=self.alice.profile, day_of_week='Tuesday', start_time=time(14), end_time=time(15))
+        self.assertEqual(self.slots(), [('07 09:00', '07 13:00'), ('08 14:00', '08 15:00')])
+
+    def test_invalid_ranges(self):
+        url = f'/api/skills/{self.skill.id}/slots/'
+        self.assertEqual(self.client.get(url, {'from': '2030-01-07', 'to': '2030-01-01'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'from': '2030-01-07', 'to': '2030-06-01'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'from': 'monday'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'from': '2030-02-30'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/skills/999999/slots/').status_code, 404)
+
+
+class SkillQueryBudgetTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.mentors, cls.learners = seed_marketplace(mentors=4, learners=5, skills_per_mentor=300, bookings=0, reviews=0, messages=0)
+
+    def setUp(self):
+        skill_index.invalidate()
+        cache.clear()
+
+    def test_public_list_budget(self):
+        self.assertEndpointBudget('/api/skills/public/', 1, min_rows=1200)
+        self.assertEndpointBudget('/api/skills/public/', 1, min_rows=100, page_size=100)
+        # Repeat hits are served from the response cache
+        self.assertEndpointBudget('/api/skills/public/', 0, min_rows=1200)
+
+    def test_search_budget(self):
+        # The first search builds the in-memory index; afterwards only the page of skills is fetched
+        self.assertEndpointBudget('/api/skills/search/', 2, min_rows=1, q='course')
+        self.assertEndpointBudget('/api/skills/search/', 1, min_rows=100, q='course', limit=100)
+
+    def test_mentor_lists_budget(self):
+        self.assertEndpointBudget('/api/skills/', 2, user=self.mentors[0], min_rows=300)
+        self.assertEndpointBudget('/api/skills/availabilities/', 2, user=self.mentors[0], min_rows=5)
+
+
+class BulkSkillImportTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.mentor = make_mentor('mentor')
+        cls.other = make_mentor('other')
+        cls.staff = CustomUser.objects.create_user(username='staff', password='pass12345', is_staff=True)
+        Skill.objects.create(profile=cls.mentor.profile, name='React', price=20, description='Hooks and state')
+
+    def setUp(self):
+        cache.clear()
+        skill_index.invalidate()
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user=type(user).objects.get(pk=user.pk))
+        return client
+
+    def test_upsert_reports_row_errors(self):
+        rows = [{'name': f'Skill {i}', 'price': i, 'tags': ['bulk']} for i in range(200)]
+        rows += [
+            {'name': 'React', 'price': '35.00'},
+            {'name': 'Skill 3', 'price': 1},
+            {'name': 'Broken', 'price': -5},
+            'not a row',
+        ]
+        generation = catalogue_generation()
+        client = self.client_for(self.mentor)
+        with self.captureOnCommitCallbacks(execute=True), self.assertMaxQueries(16):
+            response = client.post('/api/skills/bulk/', rows, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['created'], response.data['updated']), (200, 1))
+        self.assertEqual([error['row'] for error in response.data['errors']], [201, 202, 203])
+        self.assertIn('Duplicate of row 3', response.data['errors'][0]['errors']['name'][0])
+
+        react = Skill.objects.get(profile=self.mentor.profile, name='React')
+        # Only the supplied columns are overwritten
+        self.assertEqual((react.price, react.description), (35, 'Hooks and state'))
+        self.assertEqual(Skill.objects.filter(profile=self.mentor.profile).count(), 201)
+        self.assertGreater(catalogue_generation(), generation)
+        self.assertEqual(len(self.client.get('/api/skills/search/', {'q': 'skill 150'}).data), 1)
+
+    def test_csv_import_and_staff_targets(self):
+        body = 'name,price,tags,mentor\nDocker,15,ops;containers,\nSQL,12,,{}\n'.format(self.other.profile.pk)
+        response = self.client_for(self.mentor).post('/api/skills/bulk/', body, content_type='text/csv')
+        self.assertEqual(response.data['created'], 2)
+        # A mentor's rows always land on their own profile
+        self.assertEqual(Skill.objects.get(name='SQL').profile_id, self.mentor.profile.pk)
+        self.assertEqual(Skill.objects.get(name='Docker').tags, ['ops', 'containers'])
+        self.assertEqual(set(Skill.objects.get(name='Docker').normalized_tags.values_list('name', flat=True)), {'ops', 'containers'})
+
+        response = self.client_for(self.staff).post('/api/skills/bulk/', [
+            {'mentor': self.other.profile.pk, 'name': 'Go', 'price': 30},
+            {'name': 'Rust', 'price': 30},
+        ], format='json')
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual(Skill.objects.get(name='Go').profile_id, self.other.profile.pk)
+        self.assertEqual(response.data['errors'][0]['errors'], {'mentor': ['This field is required.']})
+
+    def test_undecodable_csv_is_rejected(self):
+        client = self.client_for(self.mentor)
+        body = 'name,price\nCaf\xe9,10\n'.encode('latin-1')
+        self.assertEqual(client.post('/api/skills/bulk/', body, content_type='text/csv').status_code, 400)
+        upload = SimpleUploadedFile('skills.csv', body, content_type='text/csv')
+        self.assertEqual(client.post('/api/skills/bulk/', {'file': upload}, format='multipart').status_code, 400)
+        self.assertFalse(Skill.objects.filter(name__startswith='Caf').exists())
+
+    def test_permissions_and_limits(self):
+        learner = CustomUser.objects.create_user(username='learner', password='pass12345')
+        self.assertEqual(self.client_for(learner).post('/api/skills/bulk/', [{'name': 'X'}], format='json').status_code, 403)
+        client = self.client_for(self.mentor)
+        self.assertEqual(client.post('/api/skills/bulk/', [], format='json').status_code, 400)
+        self.assertEqual(client.post('/api/skills/bulk/', [{'name': 'X'}] * 1001, format='json').status_code, 400)
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command('benchmark_skill_import', '--skills', '20', '--repeat', '1', stdout=out)
+        self.assertIn('bulk update: 20 skills', out.getvalue())
+        self.assertEqual(Skill.objects.count(), 1)
+
+
+class RecommendationTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        mentor = make_mentor('mentor')
+        cls.react, cls.redux, cls.django, cls.flask = (
+            Skill.objects.create(profile=mentor.profile, name=name, price=20, tags=tags)
+            for name, tags in (('React', ['js']), ('Redux', ['js']), ('Django', ['python']), ('Flask', ['python']))
+        )
+        cls.learners = [CustomUser.objects.create_user(username=f'learner{i}', password='pass12345') for i in range(4)]
+        for learner, skills in zip(cls.learners, (
+            [cls.react, cls.redux], [cls.react, cls.redux, cls.django], [cls.django, cls.flask], [cls.react],
+        )):
+            for skill in skills:
+                cls.book(learner, skill)
+
+    @staticmethod
+    def book(learner, skill, status='pending'):
+        return SessionBooking.objects.create(
+            mentor=skill.profile, learner=learner, skill=skill, status=status,
+            session_date=date(2030, 1, 7), session_time=time(9 + SessionBooking.objects.count() % 12),
+        )
+
+    def neighbours(self):
+        return [
+            (skill_id, neighbour_id, round(score, 6))
+            for skill_id, neighbour_id, score in SkillNeighbour.objects.order_by('skill_id', 'rank').values_list('skill_id', 'neighbour_id', 'score')
+        ]
+
+    def test_recommends_co_booked_skills_first(self):
+        call_command('update_recommendations', '--full', stdout=StringIO())
+        self.assertFalse(Skill.objects.filter(neighbours_stale=True).exists())
+
+        # Seed bookings, their neighbour lists and the skills themselves
+        response = self.assertEndpointBudget('/api/skills/recommended/', 3, user=self.learners[3])
+        self.assertEqual([skill['title'] for skill in response.data], ['Redux', 'Django'])
+        self.assertEqual(self.client_for(self.learners[3]).get('/api/skills/recommended/', {'limit': 'x'}).status_code, 400)
+
+    def test_incremental_refresh_matches_full_rebuild(self):
+        rebuild_neighbours()
+        self.book(self.learners[2], self.redux)
+        self.redux.tags = ['js', 'python']
+        self.redux.save()
+        self.assertEqual(list(Skill.objects.filter(neighbours_stale=True).values_list('name', flat=True)), ['Redux'])
+
+        self.assertEqual(update_stale_neighbours(), 1)
+        incremental = self.neighbours()
+        rebuild_neighbours()
+        self.assertEqual(incremental, self.neighbours())
+        self.assertIn((self.redux.id, self.flask.id), [(skill, other) for skill, other, _ in incremental])
+
+    def test_learners_without_bookings_get_popular_skills(self):
+        Skill.objects.filter(pk=self.django.pk).update(sessions_completed=5)
+        newcomer = CustomUser.objects.create_user(username='newcomer', password='pass12345')
+        response = self.client_for(newcomer).get('/api/skills/recommended/', {'limit': 2})
+        self.assertEqual([skill['title'] for skill in response.data], ['Django', 'Flask'])
+        self.assertEqual(APIClient().get('/api/skills/recommended/').status_code, 401)
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user=user)
+        return client
+
+
+class BestMatchRankingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.mentor = make_mentor('mentor')
+        cls.learner = CustomUser.objects.create_user(username='learner', password='pass12345')
+        cls.react = Skill.objects.create(profile=cls.mentor.profile, name='React', price=20)
+        cls.django = Skill.objects.create(profile=cls.mentor.profile, name='Django', price=20)
+        cls.rust = Skill.objects.create(profile=cls.mentor.profile, name='Rust', price=200)
+        # Skills created together tie on recency; React was last booked nine days ago
+        Skill.objects.filter(pk=cls.react.pk).update(active_at=timezone.now() - timedelta(days=9))
+        refresh_rank_scores([cls.react.pk])
+
+    def setUp(self):
+        self.client = APIClient()
+        cache.clear()
+
+    def best_match(self, **params):
+        response = self.client.get('/api/skills/public/', {'ordering': 'best_match', **params})
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def test_reviews_and_price_drive_the_order(self):
+        self.assertEqual([row['title'] for row in self.best_match()], ['Django', 'React', 'Rust'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            review = Review.objects.create(
+                mentor_profile=self.mentor.profile, student=self.learner, skill=self.react, rating=5, comment='',
+            )
+        self.assertEqual([row['title'] for row in self.best_match()], ['React', 'Django', 'Rust'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            review.rating = 1
+            review.save()
+        self.assertEqual([row['title'] for row in self.best_match()], ['Django', 'React', 'Rust'])
+
+        out = StringIO()
+        call_command('rebuild_counters', '--verify', stdout=out)
+        self.assertIn('Found 0 skill(s)', out.getvalue())
+
+    def test_recency_is_bounded_and_refreshed_in_batches(self):
+        # A year-old skill with top reviews still beats an unreviewed one active today
+        Skill.objects.filter(pk__in=[self.django.pk, self.rust.pk]).update(active_at=timezone.now() - timedelta(days=365))
+        for learner in [CustomUser.objects.create_user(username=f'fan{i}') for i in range(10)]:
+            Review.objects.create(mentor_profile=self.mentor.profile, student=learner, skill=self.django, rating=5, comment='')
+        call_command('update_rank_scores', stdout=StringIO())
+        self.assertEqual([row['title'] for row in self.best_match()][:2], ['Django', 'React'])
+        rust = Skill.objects.get(pk=self.rust.pk)
+
+        # A booking records the activity without touching the score or the catalogue cache
+        generation = catalogue_generation()
+        with self.captureOnCommitCallbacks(execute=True):
+            SessionBooking.objects.create(
+                mentor=self.mentor.profile, learner=self.learner, skill=self.rust,
+                session_date=date(2030, 1, 7), session_time=time(9),
+            )
+        self.assertEqual(catalogue_generation(), generation)
+        self.assertEqual(Skill.objects.get(pk=self.rust.pk).rank_score, rust.rank_score)
+
+        out = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('update_rank_scores', stdout=out)
+        self.assertIn('Updated the rank score of', out.getvalue())
+        self.assertAlmostEqual(Skill.objects.get(pk=self.rust.pk).rank_score - rust.rank_score, RECENCY_WEIGHT, places=3)
+        self.assertGreater(catalogue_generation(), generation)
 
-# Create your tests here.
+    def test_cursor_pages_follow_the_ranking(self):
+        Review.objects.create(mentor_profile=self.mentor.profile, student=self.learner, skill=self.rust, rating=5, comment='')
+        expected = [row['id'] for row in self.best_match()]
+        seen = []
+        url = '/api/skills/public/?ordering=best_match&page_size=1'
+        while url:
+            data = self.client.get(url).data
+            seen.extend(row['id'] for row in data['results'])
+            url = data['next']
+        self.assertEqual(seen, expected)
+        self.assertEqual(self.client.get('/api/skills/public/', {'ordering': 'rating'}).status_code, 400)
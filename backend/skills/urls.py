@@ -1,20 +1,24 @@
 # skills/urls.py
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import SkillViewSet, AvailabilityViewSet, PublicSkillListView # <-- All three views must be imported
+from .views import SkillViewSet, AvailabilityViewSet, PublicSkillListView, RecommendedSkillsView, SkillFacetView, SkillSearchView, SkillSlotsView
 
 router = DefaultRouter()
+# This registers the URLs for mentor's availability
+# Registered before the root prefix so the skill detail route doesn't treat 'availabilities' as a pk
+router.register(r'availabilities', AvailabilityViewSet, basename='availability')
 # This registers the URLs for mentor management at the root of /api/skills/
 # Correctly registers the ViewSet
 router.register(r'', SkillViewSet, basename='skill')
-# This registers the URLs for mentor's availability
-# Correctly registers the ViewSet
-router.register(r'availabilities', AvailabilityViewSet, basename='availability')
 
 
 urlpatterns = [
     # ⭐ This is the correct way to add the ListAPIView URL - must come BEFORE router
     path('public/', PublicSkillListView.as_view(), name='public-skill-list'),
+    path('search/', SkillSearchView.as_view(), name='skill-search'),
+    path('facets/', SkillFacetView.as_view(), name='skill-facets'),
+    path('recommended/', RecommendedSkillsView.as_view(), name='skill-recommended'),
+    path('<int:pk>/slots/', SkillSlotsView.as_view(), name='skill-slots'),
     
     # Include all the URLs generated by the router
     path('', include(router.urls)),
@@ -1,10 +1,28 @@
 # skills/views.py
 from rest_framework import viewsets, status, generics
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.decorators import action
+from rest_framework.parsers import JSONParser, MultiPartParser
+from rest_framework.permissions import IsAdminUser, IsAuthenticated, AllowAny, SAFE_METHODS
 from rest_framework.response import Response
+from rest_framework.views import APIView
+from django.db import IntegrityError, transaction
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from datetime import datetime, timedelta
+from .bulk import MAX_BULK_SKILLS, CSVTextParser, csv_rows, decode_csv, upsert_skills
 from .models import Skill, Availability
-from .serializers import SkillSerializer, AvailabilitySerializer, PublicSkillSerializer
+from .serializers import SkillSerializer, AvailabilitySerializer, PublicSkillSerializer, public_skill_rows
+from .facets import skill_facets
+from .filters import filter_public_skills, public_ordering
+from .pagination import SkillCursorPagination
+from .caching import CachedListMixin
+from .recommendations import recommend_skill_ids
+from .search import search_skills
+from .slots import slot_index
+from config.dates import query_date
+from config.serialization import ValuesListMixin
 from profiles.models import UserProfile
+from profiles.permissions import IsMentor, request_profile_id, request_role
 from rest_framework.exceptions import ValidationError as DRFValidationError
 
 
@@ -13,31 +31,53 @@ class SkillViewSet(viewsets.ModelViewSet):
     serializer_class = SkillSerializer
     permission_classes = [IsAuthenticated]
 
-    def get_queryset(self):
-        if not self.request.user.is_authenticated or not hasattr(self.request.user, 'profile'):
-            return Skill.objects.none()
+    def get_permissions(self):
+        # Staff may also import skills on behalf of mentors
+        if self.action == 'bulk':
+            return [IsAuthenticated(), (IsMentor | IsAdminUser)()]
+        # Anyone signed in may list (learners just get nothing back); only mentors may write
+        if self.request.method not in SAFE_METHODS:
+            return [IsAuthenticated(), IsMentor()]
+        return super().get_permissions()
 
-        if self.request.user.profile.role == 'mentor':
-            return Skill.objects.filter(profile__user=self.request.user)
+    def get_queryset(self):
+        # Role and profile come from the token claims, so listing does not load the profile
+        if request_role(self.request) == 'mentor':
+            return Skill.objects.filter(profile_id=request_profile_id(self.request))
         
         return Skill.objects.none()
 
     def perform_create(self, serializer):
-        request_user = self.request.user
-        if not hasattr(request_user, 'profile') or request_user.profile.role != 'mentor':
-            raise DRFValidationError("Only mentors can add skills.")
-        
         try:
-            serializer.save()
-        except Exception as e:
-            raise DRFValidationError({'detail': str(e)})
+            with transaction.atomic():
+                serializer.save()
+        except IntegrityError:
+            raise DRFValidationError({'detail': "You already offer a skill with this name."})
+
+    @action(detail=False, methods=['post'], parser_classes=[JSONParser, CSVTextParser, MultiPartParser])
+    def bulk(self, request):
+        # Upsert up to MAX_BULK_SKILLS skills from a JSON list, a text/csv body or an uploaded CSV 'file'
+        rows = request.data
+        if 'file' in getattr(request, 'FILES', {}):
+            rows = csv_rows(decode_csv(request.FILES['file'].read(), 'utf-8-sig'))
+        elif isinstance(rows, dict):
+            rows = rows.get('skills')
+        if not isinstance(rows, list) or not rows:
+            raise DRFValidationError({'skills': "Send a non-empty list of skills."})
+        if len(rows) > MAX_BULK_SKILLS:
+            raise DRFValidationError({'skills': f"At most {MAX_BULK_SKILLS} skills can be imported at once."})
+
+        # Mentors always import into their own profile; staff name the mentor per row
+        profile_id = request_profile_id(request) if request_role(request) == 'mentor' else None
+        results, errors = upsert_skills(rows, profile_id, allow_mentor_field=request.user.is_staff)
+        created = sum(result['created'] for result in results)
+        return Response(
+            {'created': created, 'updated': len(results) - created, 'results': results, 'errors': errors},
+            status=status.HTTP_200_OK if results else status.HTTP_400_BAD_REQUEST,
+        )
 
     def perform_update(self, serializer):
-        request_user = self.request.user
-        if not hasattr(request_user, 'profile') or request_user.profile.role != 'mentor':
-            raise DRFValidationError("Only mentors can update their skills.")
-
-        if serializer.instance.profile.user != request_user:
+        if serializer.instance.profile_id != request_profile_id(self.request):
             raise DRFValidationError("You do not have permission to update this skill.")
 
         try:
@@ -46,11 +86,7 @@ class SkillViewSet(viewsets.ModelViewSet):
             raise DRFValidationError({'detail': str(e)})
 
     def perform_destroy(self, instance):
-        request_user = self.request.user
-        if not hasattr(request_user, 'profile') or request_user.profile.role != 'mentor':
-            raise DRFValidationError("Only mentors can delete their skills.")
-
-        if instance.profile.user != request_user:
+        if instance.profile_id != request_profile_id(self.request):
             raise DRFValidationError("You do not have permission to delete this skill.")
 
         instance.delete()
@@ -61,31 +97,26 @@ class AvailabilityViewSet(viewsets.ModelViewSet):
     serializer_class = AvailabilitySerializer
     permission_classes = [IsAuthenticated]
 
-    def get_queryset(self):
-        if not self.request.user.is_authenticated or not hasattr(self.request.user, 'profile'):
-            return Availability.objects.none()
+    def get_permissions(self):
+        if self.request.method not in SAFE_METHODS:
+            return [IsAuthenticated(), IsMentor()]
+        return super().get_permissions()
 
-        if self.request.user.profile.role == 'mentor':
-            return Availability.objects.filter(mentor=self.request.user.profile)
+    def get_queryset(self):
+        if request_role(self.request) == 'mentor':
+            return Availability.objects.filter(mentor_id=request_profile_id(self.request))
 
         return Availability.objects.none()
 
     def perform_create(self, serializer):
-        request_user = self.request.user
-        if not hasattr(request_user, 'profile') or request_user.profile.role != 'mentor':
-            raise DRFValidationError("Only mentors can add availability.")
-        
         try:
-            serializer.save(mentor=request_user.profile)
+            # AvailabilitySerializer.create links the mentor's profile itself
+            serializer.save()
         except Exception as e:
             raise DRFValidationError({'detail': str(e)})
 
     def perform_update(self, serializer):
-        request_user = self.request.user
-        if not hasattr(request_user, 'profile') or request_user.profile.role != 'mentor':
-            raise DRFValidationError("Only mentors can update their availability.")
-        
-        if serializer.instance.mentor.user != request_user:
+        if serializer.instance.mentor_id != request_profile_id(self.request):
             raise DRFValidationError("You do not have permission to update this availability.")
 
         try:
@@ -94,20 +125,125 @@ class AvailabilityViewSet(viewsets.ModelViewSet):
             raise DRFValidationError({'detail': str(e)})
 
     def perform_destroy(self, instance):
-        request_user = self.request.user
-        if not hasattr(request_user, 'profile') or request_user.profile.role != 'mentor':
-            raise DRFValidationError("Only mentors can delete their availability.")
-            
-        if instance.mentor.user != request_user:
+        if instance.mentor_id != request_profile_id(self.request):
             raise DRFValidationError("You do not have permission to delete this availability.")
         
         instance.delete()
 
 
 # --- View for Public Skill List (/api/skills/public/) ---
-class PublicSkillListView(generics.ListAPIView):
-    # This view is for learners and public users to browse skills
-    queryset = Skill.objects.filter(active=True).select_related('profile__user')
+class PublicSkillListView(CachedListMixin, ValuesListMixin, generics.ListAPIView):
+    # This view is for learners and public users to browse skills; responses are cached per query string.
+    # Rows are read with .values() (public_skill_rows) rather than as Skill instances
+    queryset = Skill.objects.filter(active=True)
     serializer_class = PublicSkillSerializer
+    values_serializer = public_skill_rows
+    # Sort keys of the ?ordering= choices, for the pagination cursor
+    values_extra = ('id', 'price', 'rank_score')
     permission_classes = [AllowAny]
-    authentication_classes = []  # No authentication required for public endpoint
\ No newline at end of file
+    authentication_classes = []  # No authentication required for public endpoint
+    # ?ordering=newest (default), best_match or price.
+    # Cursor pagination kicks in when the client sends ?page_size= or ?cursor=
+    pagination_class = SkillCursorPagination
+
+    def get_queryset(self):
+        params = self.request.query_params
+        return filter_public_skills(super().get_queryset(), params).order_by(*public_ordering(params))
+
+
+# --- View for Public Skill Facets (/api/skills/facets/) ---
+class SkillFacetView(CachedListMixin, APIView):
+    # Tag, category and level counts for the same filters as the public list, cached per query string
+    permission_classes = [AllowAny]
+    authentication_classes = []
+    cache_prefix = 'skills:facets'
+
+    def get(self, request):
+        def build():
+            skills = filter_public_skills(Skill.objects.filter(active=True), request.query_params)
+            return Response(skill_facets(skills))
+        return self.cached_response(request, build)
+
+
+# --- View for Public Skill Search (/api/skills/search/?q=) ---
+class SkillSearchView(generics.ListAPIView):
+    # Ranked full-text search over name, tags, mentor and description
+    serializer_class = PublicSkillSerializer
+    permission_classes = [AllowAny]
+    authentication_classes = []
+    default_limit = 20
+    max_limit = 100
+
+    def get_limit(self):
+        try:
+            limit = int(self.request.query_params.get('limit', self.default_limit))
+        except ValueError:
+            raise DRFValidationError({'limit': "Must be an integer."})
+        return max(1, min(limit, self.max_limit))
+
+    def get_queryset(self):
+        queryset = Skill.objects.filter(active=True).select_related('profile__user')
+        queryset = filter_public_skills(queryset, self.request.query_params)
+        return search_skills(queryset, self.request.query_params.get('q', ''), self.get_limit())
+
+
+# --- View for a Learner's Recommended Skills (/api/skills/recommended/) ---
+class RecommendedSkillsView(generics.ListAPIView):
+    # Skills similar to the ones the learner booked, from the precomputed SkillNeighbour lists;
+    # learners without bookings get the most booked skills instead
+    serializer_class = PublicSkillSerializer
+    permission_classes = [IsAuthenticated]
+    default_limit = 10
+    max_limit = 50
+
+    def get_limit(self):
+        try:
+            limit = int(self.request.query_params.get('limit', self.default_limit))
+        except ValueError:
+            raise DRFValidationError({'limit': "Must be an integer."})
+        return max(1, min(limit, self.max_limit))
+
+    def get_queryset(self):
+        limit = self.get_limit()
+        queryset = Skill.objects.filter(active=True).select_related('profile__user')
+        skill_ids = recommend_skill_ids(self.request.user.id, limit)
+        if not skill_ids:
+            return list(queryset.order_by('-sessions_completed', '-id')[:limit])
+        skills = queryset.in_bulk(skill_ids)
+        return [skills[skill_id] for skill_id in skill_ids if skill_id in skills]
+
+
+# --- View for a Skill's Open Slots (/api/skills/<id>/slots/?from=&to=) ---
+class SkillSlotsView(APIView):
+    # Free time in the mentor's weekly availability, minus confirmed bookings
+    permission_classes = [AllowAny]
+    authentication_classes = []
+    default_days = 14
+    max_days = 62
+
+    def get(self, request, pk):
+        skill = get_object_or_404(Skill.objects.filter(active=True).only('id', 'profile_id', 'profile__user_id').select_related('profile'), pk=pk)
+
+        from_day = query_date(request.query_params, 'from', timezone.localdate())
+        to_day = query_date(request.query_params, 'to', from_day + timedelta(days=self.default_days - 1))
+        if to_day < from_day:
+            raise DRFValidationError({'to': "Must not be before 'from'."})
+        if (to_day - from_day).days >= self.max_days:
+            raise DRFValidationError({'to': f"At most {self.max_days} days can be requested at once."})
+        try:
+            duration = int(request.query_params.get('duration', 0))
+        except ValueError:
+            raise DRFValidationError({'duration': "Must be an integer."})
+
+        # Past time is never bookable
+        range_start = max(timezone.make_aware(datetime.combine(from_day, datetime.min.time())), timezone.now())
+        range_end = timezone.make_aware(datetime.combine(to_day + timedelta(days=1), datetime.min.time()))
+        slots = slot_index.free_slots(skill.profile_id, range_start, range_end, duration) if range_start < range_end else []
+
+        return Response({
+            'skill': skill.id,
+            'mentorId': skill.profile.user_id,
+            'from': from_day,
+            'to': to_day,
+            'slots': [{'start': start, 'end': end} for start, end in slots],
+        })